@@ -278,15 +278,35 @@ public class BookController(MindMendDbContext context, IWebHostEnvironment envir
     //     };
     // }
 
-    // GET: api/Book/cover/{title}
+    // Pre-generated cover variants (see generate_cover_variants.py) and their file extensions
+    private static readonly Dictionary<string, string> CoverVariants = new()
+    {
+        ["list"] = ".jpg",
+        ["list_webp"] = ".webp",
+        ["detail"] = ".jpg",
+        ["detail_webp"] = ".webp"
+    };
+
+    // GET: api/Book/cover/{title}?variant=list
     [HttpGet("cover/{title}")]
-    public async Task<IActionResult> GetCoverByTitle(string title)
+    public async Task<IActionResult> GetCoverByTitle(string title, [FromQuery] string? variant = null)
     {
         try
         {
             // Sanitize the title
             var sanitizedTitle = SanitizeFilename(title);
 
+            // Serve the requested variant when it has been generated
+            if (variant != null && CoverVariants.TryGetValue(variant, out var extension))
+            {
+                var variantPath = Path.Combine(_environment.ContentRootPath, "cover_variants", variant, $"{sanitizedTitle}{extension}");
+                if (System.IO.File.Exists(variantPath))
+                {
+                    var variantBytes = await System.IO.File.ReadAllBytesAsync(variantPath);
+                    return File(variantBytes, extension == ".webp" ? "image/webp" : "image/jpeg");
+                }
+            }
+
             // First, try to find the image in covers directory
             var coversPath = Path.Combine(_environment.ContentRootPath, "covers", $"{sanitizedTitle}.jpg");
 
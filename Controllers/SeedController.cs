@@ -1,4 +1,5 @@
 using Microsoft.AspNetCore.Mvc;
+using Mind_Mend.DTOs;
 using Mind_Mend.Services;
 
 namespace Mind_Mend.Controllers;
@@ -109,6 +110,36 @@ public class SeedController : ControllerBase
         }
     }
 
+    /// <summary>
+    /// Applies a batch of added/changed/removed books without re-seeding the rest
+    /// </summary>
+    [HttpPost("books/batch")]
+    public async Task<IActionResult> ApplyBookBatch([FromBody] SeedBatchDto batch)
+    {
+        try
+        {
+            _logger.LogInformation("Book batch requested: {UpsertCount} upserts, {RemoveCount} removals",
+                batch.Upsert.Count, batch.Remove.Count);
+            var result = await _bookSeederService.ApplyBookBatchAsync(batch.Upsert, batch.Remove);
+
+            var count = await _bookSeederService.GetBooksCountAsync();
+            return Ok(new
+            {
+                message = "Book batch applied successfully",
+                added = result.Added,
+                updated = result.Updated,
+                removed = result.Removed,
+                skipped = result.Skipped,
+                totalBooks = count
+            });
+        }
+        catch (Exception ex)
+        {
+            _logger.LogError(ex, "Error applying book batch");
+            return StatusCode(500, new { message = "Error applying book batch", error = ex.Message });
+        }
+    }
+
     /// <summary>
     /// Seeds the database with podcasts from podcast.json
     /// </summary>
@@ -200,4 +231,34 @@ public class SeedController : ControllerBase
             return StatusCode(500, new { message = "Error refreshing podcasts", error = ex.Message });
         }
     }
+
+    /// <summary>
+    /// Applies a batch of added/changed/removed podcasts without re-seeding the rest
+    /// </summary>
+    [HttpPost("podcasts/batch")]
+    public async Task<IActionResult> ApplyPodcastBatch([FromBody] SeedBatchDto batch)
+    {
+        try
+        {
+            _logger.LogInformation("Podcast batch requested: {UpsertCount} upserts, {RemoveCount} removals",
+                batch.Upsert.Count, batch.Remove.Count);
+            var result = await _podcastSeederService.ApplyPodcastBatchAsync(batch.Upsert, batch.Remove);
+
+            var count = await _podcastSeederService.GetPodcastsCountAsync();
+            return Ok(new
+            {
+                message = "Podcast batch applied successfully",
+                added = result.Added,
+                updated = result.Updated,
+                removed = result.Removed,
+                skipped = result.Skipped,
+                totalPodcasts = count
+            });
+        }
+        catch (Exception ex)
+        {
+            _logger.LogError(ex, "Error applying podcast batch");
+            return StatusCode(500, new { message = "Error applying podcast batch", error = ex.Message });
+        }
+    }
 }
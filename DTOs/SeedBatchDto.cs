@@ -0,0 +1,21 @@
+using System.Text.Json;
+
+namespace Mind_Mend.DTOs
+{
+    public class SeedBatchDto
+    {
+        // Records to add or update, in the same shape as the book.json / podcast.json entries
+        public List<JsonElement> Upsert { get; set; } = new();
+
+        // Titles (books) or names (podcasts) to delete
+        public List<string> Remove { get; set; } = new();
+    }
+
+    public class SeedBatchResult
+    {
+        public int Added { get; set; }
+        public int Updated { get; set; }
+        public int Removed { get; set; }
+        public int Skipped { get; set; }
+    }
+}
@@ -1,5 +1,6 @@
 using Microsoft.EntityFrameworkCore;
 using Mind_Mend.Data;
+using Mind_Mend.DTOs;
 using Mind_Mend.Models;
 using System.Text.Json;
 
@@ -42,22 +43,7 @@ public class BookSeederService
             var books = new List<BookJsonModel>();
             foreach (var bookElement in booksArray.EnumerateArray())
             {
-                var book = new BookJsonModel();
-
-                if (bookElement.TryGetProperty("title", out var titleProp))
-                    book.Title = titleProp.GetString();
-
-                if (bookElement.TryGetProperty("author", out var authorProp))
-                    book.Author = authorProp.GetString();
-
-                if (bookElement.TryGetProperty("description", out var descProp))
-                    book.Description = descProp.GetString();
-
-                if (bookElement.TryGetProperty("condition", out var condProp))
-                    book.Condition = condProp.GetString();
-
-                if (bookElement.TryGetProperty("url", out var urlProp))
-                    book.Url = urlProp.GetString();
+                var book = ParseBookElement(bookElement);
 
                 // Only add books that have at least title and some basic info
                 if (!string.IsNullOrEmpty(book.Title) && !string.IsNullOrEmpty(book.Author))
@@ -128,6 +114,91 @@ public class BookSeederService
             throw;
         }
     }
+    private static BookJsonModel ParseBookElement(JsonElement bookElement)
+    {
+        var book = new BookJsonModel();
+
+        if (bookElement.TryGetProperty("title", out var titleProp))
+            book.Title = titleProp.GetString();
+
+        if (bookElement.TryGetProperty("author", out var authorProp))
+            book.Author = authorProp.GetString();
+
+        if (bookElement.TryGetProperty("description", out var descProp))
+            book.Description = descProp.GetString();
+
+        if (bookElement.TryGetProperty("condition", out var condProp))
+            book.Condition = condProp.GetString();
+
+        if (bookElement.TryGetProperty("url", out var urlProp))
+            book.Url = urlProp.GetString();
+
+        return book;
+    }
+
+    /// <summary>
+    /// Adds or updates the given book records (matched by title) and removes the given titles,
+    /// without touching any other book. Used by the delta seeding client.
+    /// </summary>
+    public async Task<SeedBatchResult> ApplyBookBatchAsync(List<JsonElement> upserts, List<string> removals)
+    {
+        var result = new SeedBatchResult();
+
+        // Ensure uploads directory exists
+        var uploadsDir = Path.Combine(_environment.WebRootPath, "uploads");
+        Directory.CreateDirectory(uploadsDir);
+
+        var fallbackImagePath = await CreateFallbackImageAsync();
+
+        foreach (var bookElement in upserts)
+        {
+            var book = ParseBookElement(bookElement);
+            if (string.IsNullOrEmpty(book.Title) || string.IsNullOrEmpty(book.Author))
+            {
+                result.Skipped++;
+                continue;
+            }
+
+            var existingBook = await _context.Resources
+                .FirstOrDefaultAsync(r => r.Name == book.Title && r.Type == Type.Book);
+
+            if (existingBook != null)
+            {
+                existingBook.Author = book.Author;
+                existingBook.ContentUrl = book.Url ?? "#";
+                existingBook.Summary = book.Description ?? "كتاب متخصص في الصحة النفسية";
+                result.Updated++;
+                continue;
+            }
+
+            _context.Resources.Add(new Resource
+            {
+                Name = book.Title,
+                Author = book.Author,
+                ContentUrl = book.Url ?? "#",
+                Summary = book.Description ?? "كتاب متخصص في الصحة النفسية",
+                FilePathUuid = ProcessBookCover(book.Title, fallbackImagePath),
+                Type = Type.Book
+            });
+            result.Added++;
+        }
+
+        if (removals.Count > 0)
+        {
+            var removedBooks = await _context.Resources
+                .Where(r => r.Type == Type.Book && removals.Contains(r.Name))
+                .ToListAsync();
+            _context.Resources.RemoveRange(removedBooks);
+            result.Removed = removedBooks.Count;
+        }
+
+        await _context.SaveChangesAsync();
+
+        _logger.LogInformation("Book batch applied. Added: {Added}, Updated: {Updated}, Removed: {Removed}, Skipped: {Skipped}",
+            result.Added, result.Updated, result.Removed, result.Skipped);
+        return result;
+    }
+
     private string ProcessBookCover(string bookTitle, string fallbackImagePath)
     {
         try
@@ -1,5 +1,6 @@
 using Microsoft.EntityFrameworkCore;
 using Mind_Mend.Data;
+using Mind_Mend.DTOs;
 using System.Text.Json;
 using System.Text.RegularExpressions;
 using HtmlAgilityPack;
@@ -12,6 +13,7 @@ public class PodcastSeederService
     private readonly IWebHostEnvironment _environment;
     private readonly ILogger<PodcastSeederService> _logger;
     private readonly HttpClient _httpClient;
+    private Dictionary<string, JsonElement>? _prefetchedCovers;
 
     public PodcastSeederService(
         MindMendDbContext context,
@@ -134,6 +136,71 @@ public class PodcastSeederService
         }
     }
 
+    /// <summary>
+    /// Adds or updates the given podcast.json records (matched by name) and removes the given names,
+    /// without touching any other podcast. Used by the delta seeding client.
+    /// </summary>
+    public async Task<SeedBatchResult> ApplyPodcastBatchAsync(List<JsonElement> upserts, List<string> removals)
+    {
+        var result = new SeedBatchResult();
+
+        // Ensure uploads directory exists
+        var uploadsDir = Path.Combine(_environment.WebRootPath, "uploads");
+        Directory.CreateDirectory(uploadsDir);
+
+        var fallbackImagePath = await CreateFallbackImageAsync();
+
+        foreach (var podcastElement in upserts)
+        {
+            // Entries from the "books" array of podcast.json use title/author instead of name/host
+            var isPodcast = podcastElement.TryGetProperty("name", out _);
+            var podcast = ParsePodcastElement(podcastElement, isPodcast);
+            if (podcast == null)
+            {
+                result.Skipped++;
+                continue;
+            }
+
+            var existingPodcast = await _context.Resources
+                .FirstOrDefaultAsync(r => r.Name == podcast.Name && r.Type == Type.Podcast);
+
+            if (existingPodcast != null)
+            {
+                existingPodcast.Author = podcast.Host ?? "Unknown Host";
+                existingPodcast.ContentUrl = podcast.Url ?? "#";
+                existingPodcast.Summary = podcast.Description ?? "Mental health podcast";
+                result.Updated++;
+                continue;
+            }
+
+            _context.Resources.Add(new Resource
+            {
+                Name = podcast.Name,
+                Author = podcast.Host ?? "Unknown Host",
+                ContentUrl = podcast.Url ?? "#",
+                Summary = podcast.Description ?? "Mental health podcast",
+                FilePathUuid = await ProcessPodcastCoverAsync(podcast, fallbackImagePath),
+                Type = Type.Podcast
+            });
+            result.Added++;
+        }
+
+        if (removals.Count > 0)
+        {
+            var removedPodcasts = await _context.Resources
+                .Where(r => r.Type == Type.Podcast && removals.Contains(r.Name))
+                .ToListAsync();
+            _context.Resources.RemoveRange(removedPodcasts);
+            result.Removed = removedPodcasts.Count;
+        }
+
+        await _context.SaveChangesAsync();
+
+        _logger.LogInformation("Podcast batch applied. Added: {Added}, Updated: {Updated}, Removed: {Removed}, Skipped: {Skipped}",
+            result.Added, result.Updated, result.Removed, result.Skipped);
+        return result;
+    }
+
     private PodcastJsonModel? ParsePodcastElement(JsonElement element, bool isPodcast)
     {
         var podcast = new PodcastJsonModel { IsPodcast = isPodcast };
@@ -191,6 +258,14 @@ public class PodcastSeederService
     {
         try
         {
+            // Covers fetched ahead of time by podcast_prefetch.py are copied, not scraped
+            var prefetchedImagePath = await CopyPrefetchedCoverAsync(podcast);
+            if (!string.IsNullOrEmpty(prefetchedImagePath))
+            {
+                _logger.LogDebug("Using prefetched image for: {Name}", podcast.Name);
+                return prefetchedImagePath;
+            }
+
             string? imageUrl = null;
 
             // Try to extract image based on URL type
@@ -393,6 +468,43 @@ public class PodcastSeederService
         }
     }
 
+    private async Task<string?> CopyPrefetchedCoverAsync(PodcastJsonModel podcast)
+    {
+        try
+        {
+            var cacheDir = Path.Combine(_environment.ContentRootPath, "podcast_covers");
+            if (_prefetchedCovers == null)
+            {
+                var manifestPath = Path.Combine(cacheDir, "manifest.json");
+                _prefetchedCovers = File.Exists(manifestPath)
+                    ? JsonSerializer.Deserialize<Dictionary<string, JsonElement>>(await File.ReadAllTextAsync(manifestPath)) ?? new()
+                    : new();
+            }
+
+            if (string.IsNullOrEmpty(podcast.Name) || !_prefetchedCovers.TryGetValue(podcast.Name, out var entry))
+                return null;
+
+            // Only use the cached cover if it was fetched for the URL the podcast has now
+            if (entry.GetProperty("status").GetString() != "ok" || entry.GetProperty("url").GetString() != podcast.Url)
+                return null;
+
+            var fileName = entry.GetProperty("file").GetString();
+            var sourcePath = Path.Combine(cacheDir, fileName ?? string.Empty);
+            if (string.IsNullOrEmpty(fileName) || !File.Exists(sourcePath))
+                return null;
+
+            var uuid = Guid.NewGuid().ToString() + Path.GetExtension(fileName);
+            var destinationPath = Path.Combine(_environment.WebRootPath, "uploads", uuid);
+            File.Copy(sourcePath, destinationPath);
+            return uuid;
+        }
+        catch (Exception ex)
+        {
+            _logger.LogWarning(ex, "Failed to use prefetched image for: {Name}", podcast.Name);
+            return null;
+        }
+    }
+
     private async Task<string> CopyFallbackImageAsync(string fallbackImagePath)
     {
         try
@@ -2,29 +2,236 @@
 """
 Amazon Book Cover Scraper
 
-This script reads books from book.json and searches Amazon for each book
-to extract and download their cover images.
+This script reads books from book.json and finds a cover image for each
+book, from the page its URL points at, an Amazon search or other catalogs
+(see cover_sources.py), and downloads it.
 """
 
-import json
+import argparse
+import hashlib
 import os
 import requests
 from urllib.parse import urlencode, quote_plus
+import tempfile
 import time
-import re
-from bs4 import BeautifulSoup
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
 import urllib.request
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from catalog_io import iter_records, open_writer
+from cover_extractors import ChainedExtractor
+from cover_sources import (STATS_FILE, AmazonSearchSource, BookUrlSource, CoverResolver, GoogleBooksSource,
+                           OpenLibrarySource)
+from host_throttle import AdaptiveThrottle, ThrottledError, backoff_delay, looks_like_captcha, parse_retry_after
+from http_cache import CACHE_DIR, CachingAdapter, ResponseCache, classify_url
+from pipeline_metrics import METRICS, exporting
+from results_journal import JOURNAL_FILE, ResultsJournal
+from seed_sync import record_hash
+
+AMAZON_BASE_URL = "https://www.amazon.com"
+RESULTS_FILE = 'cover_extraction_results.json'
+SOURCE_NAMES = ('book_url', 'amazon_search', 'openlibrary', 'googlebooks')
+
+
+class StoredImageIndex:
+    """Finds covers already on disk with the same bytes as a new download.
+
+    Only file sizes are collected up front (one directory scan); existing
+    files are hashed lazily, and only when a new download has the same size.
+    """
+
+    def __init__(self, covers_dir):
+        self.covers_dir = covers_dir
+        self._lock = threading.Lock()
+        self._by_size = None
+        self._hashes = {}
+
+    def _scan(self):
+        self._by_size = {}
+        if not self.covers_dir.exists():
+            return
+        with os.scandir(self.covers_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith('.jpg'):
+                    self._by_size.setdefault(entry.stat().st_size, []).append(Path(entry.path))
+
+    def _hash_file(self, path):
+        if path not in self._hashes:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b''):
+                    digest.update(chunk)
+            self._hashes[path] = digest.hexdigest()
+        return self._hashes[path]
+
+    def store(self, tmp_path, filepath, size, sha256):
+        """Move a finished download into place; return the duplicate it was linked to, if any"""
+        with self._lock:
+            if self._by_size is None:
+                self._scan()
+            duplicate = None
+            for candidate in self._by_size.get(size, []):
+                if candidate != filepath and candidate.exists() and self._hash_file(candidate) == sha256:
+                    duplicate = candidate
+                    break
+            
+            if duplicate:
+                link_path = f"{tmp_path}.link"
+                try:
+                    os.link(duplicate, link_path)
+                    os.replace(link_path, filepath)
+                    os.remove(tmp_path)
+                except OSError:
+                    # No hard links on this filesystem: keep our own copy
+                    if os.path.exists(link_path):
+                        os.remove(link_path)
+                    duplicate = None
+                    os.replace(tmp_path, filepath)
+            else:
+                os.replace(tmp_path, filepath)
+            
+            self._hashes[filepath] = sha256
+            paths = self._by_size.setdefault(size, [])
+            if filepath not in paths:
+                paths.append(filepath)
+            return duplicate
+
 
 class AmazonBookCoverScraper:
-    def __init__(self):
+    def __init__(self, base_url=AMAZON_BASE_URL, max_per_host=2, requests_per_second=1.0,
+                 cache_dir=CACHE_DIR, metrics=None, max_rate=None, adaptive=True, max_attempts=4,
+                 sources=SOURCE_NAMES, source_urls=None, hedge=True, stats_path=STATS_FILE):
+        self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
+        # Stage timings and counters, exported at the end of a run
+        self.metrics = metrics or METRICS
+        # Search and product pages are served from the on-disk cache when possible
+        self.response_cache = ResponseCache(cache_dir) if cache_dir else None
+        if self.response_cache:
+            self.metrics.register_collector('http_cache', self._cache_metrics)
+        self._mount_adapters(pool_size=10)
+        self.extractor = ChainedExtractor()
+        self.max_image_bytes = 10 * 1024 * 1024
+        self.stored_images = StoredImageIndex(Path("covers"))
         # Set a user agent to avoid being blocked
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
-        self.delay = 2  # Delay between requests to be respectful
-        
+        # Per-host cap and request rate, adapted to throttling signals (host_throttle.py)
+        self.limiter = AdaptiveThrottle(max_per_host, requests_per_second, max_rate=max_rate,
+                                        adaptive=adaptive, on_event=self._throttle_event)
+        self.max_attempts = max_attempts
+        self.timeout = 30
+        # Where covers come from (cover_sources.py), queried concurrently with hedging
+        self.resolver = CoverResolver(self._create_sources(sources, source_urls or {}), stats_path,
+                                      hedge=hedge, metrics=self.metrics)
+
+    def _create_sources(self, names, urls):
+        fetch = lambda url: self._get(url)
+        sources = []
+        for name in names:
+            if name == 'book_url':
+                sources.append(BookUrlSource(fetch, self.extractor, self._rebase_amazon_url))
+            elif name == 'amazon_search':
+                # Methods looked up on every call, so instrumented ones (benchmarks) are used
+                sources.append(AmazonSearchSource(
+                    lambda title, author: self._staged('search', self.search_amazon_book, title, author),
+                    lambda url: self._staged('extract', self.extract_cover_image_url, url)))
+            elif name == 'openlibrary':
+                base_url = urls.get('openlibrary')
+                sources.append(OpenLibrarySource(fetch, base_url, base_url) if base_url else OpenLibrarySource(fetch))
+            elif name == 'googlebooks':
+                base_url = urls.get('googlebooks')
+                sources.append(GoogleBooksSource(fetch, base_url) if base_url else GoogleBooksSource(fetch))
+            else:
+                raise ValueError(f"unknown cover source '{name}'")
+        return sources
+
+    def _staged(self, stage, method, *args):
+        with self.metrics.span('cover_stage', stage=stage):
+            return method(*args)
+
+    def _mount_adapters(self, pool_size):
+        """Mount the (caching) transport adapter with the given pool size"""
+        if self.response_cache:
+            adapter = CachingAdapter(self.response_cache, pool_connections=pool_size, pool_maxsize=pool_size)
+        else:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _cache_metrics(self):
+        return [('cover_http_cache_events_total', {'event': event}, count)
+                for event, count in self.response_cache.stats.items()]
+
+    def _throttle_event(self, host, event):
+        self.metrics.increment('cover_throttle_events_total', host=host, event=event)
+
+    def _get(self, url, **kwargs):
+        """GET a URL through the per-host throttle, retrying throttled and failed requests
+
+        429/503 and captcha pages slow the host down (honoring Retry-After),
+        5xx and connection errors count towards its circuit breaker; both are
+        retried with jittered exponential backoff. Raises ThrottledError when
+        every attempt was refused, so callers don't mistake it for "not found".
+        """
+        url_class = classify_url(url)
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.max_attempts):
+            queued = time.perf_counter()
+            with self.limiter.acquire(url):
+                self.metrics.observe('cover_rate_limit_wait_seconds', time.perf_counter() - queued,
+                                     url_class=url_class)
+                started = time.perf_counter()
+                try:
+                    with self.metrics.span('cover_http_request', url_class=url_class):
+                        response = self.session.get(url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    self.limiter.failure(url)
+                    reason, detail = 'connection', str(e)
+                else:
+                    self.metrics.increment('cover_http_responses_total', code=str(response.status_code))
+                    reason = self._refusal(url, response, kwargs.get('stream'))
+                    if reason is None:
+                        self.limiter.success(url, time.perf_counter() - started)
+                        return response
+                    detail = f"HTTP {response.status_code}" if reason != 'captcha' else "captcha page"
+                    response.close()
+                    if reason == 'server_error':
+                        self.limiter.failure(url)
+                    else:
+                        self.limiter.throttled(url, parse_retry_after(response.headers.get('Retry-After')))
+            if attempt + 1 < self.max_attempts:
+                self.metrics.increment('cover_http_retries_total', reason=reason)
+                # A Retry-After pause is enforced by the throttle on top of this
+                time.sleep(backoff_delay(attempt))
+        raise ThrottledError(f"{urlsplit(url).netloc} refused {url} ({detail}) after {self.max_attempts} attempts")
+
+    def _refusal(self, url, response, stream=False):
+        """Why a response is not a real answer: 'throttled', 'captcha', 'server_error' or None"""
+        if response.status_code in (429, 503):
+            return 'throttled'
+        if response.status_code >= 500:
+            return 'server_error'
+        if (not stream and response.status_code == 200
+                and 'html' in response.headers.get('Content-Type', '') and looks_like_captcha(response.content)):
+            # Served with 200, so the caching adapter may have stored it
+            if self.response_cache:
+                self.response_cache.forget(url)
+            return 'captcha'
+        return None
+
+    def _rebase_amazon_url(self, url):
+        """Point an existing amazon.com URL at the configured base URL"""
+        if self.base_url == AMAZON_BASE_URL:
+            return url
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else '')
+        return f"{self.base_url}{path}"
+
     def search_amazon_book(self, title, author=None):
         """Search for a book on Amazon and return the first result URL"""
         try:
@@ -34,75 +241,53 @@ class AmazonBookCoverScraper:
                 query += f" {author}"
             
             # Amazon search URL
-            search_url = f"https://www.amazon.com/s?{urlencode({'k': query, 'i': 'stripbooks'})}"
+            search_url = f"{self.base_url}/s?{urlencode({'k': query, 'i': 'stripbooks'})}"
             
             print(f"Searching for: {query}")
             
-            response = self.session.get(search_url)
+            response = self._get(search_url)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find the first book result
-            book_links = soup.find_all('a', {'class': 's-link-style'})
-            
-            if not book_links:
-                # Try alternative selector
-                book_links = soup.find_all('h2', {'class': 's-result-item'})
-                if book_links:
-                    link = book_links[0].find('a')
-                    if link:
-                        return f"https://www.amazon.com{link['href']}"
-            else:
-                return f"https://www.amazon.com{book_links[0]['href']}"
+            with self.metrics.span('cover_parse', page='search'):
+                href = self.extractor.extract_result_href(response.content)
+            if href:
+                return f"{self.base_url}{href}"
                 
             return None
             
+        except ThrottledError:
+            raise
         except Exception as e:
+            self.metrics.increment('cover_stage_errors_total', stage='search')
             print(f"Error searching for book '{title}': {e}")
             return None
     
     def extract_cover_image_url(self, book_url):
         """Extract the cover image URL from an Amazon book page"""
         try:
-            response = self.session.get(book_url)
+            response = self._get(book_url)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Try multiple selectors for cover images
-            selectors = [
-                '#landingImage',
-                '#ebooksImgBlkFront',
-                '.a-dynamic-image',
-                '[data-a-image-name="landingImage"]',
-                'img[alt*="cover"]',
-                'img[alt*="Cover"]'
-            ]
-            
-            for selector in selectors:
-                img = soup.select_one(selector)
-                if img and img.get('src'):
-                    # Get the highest resolution version
-                    src = img['src']
-                    # Replace size parameters to get larger image
-                    if '_SX' in src or '_SY' in src:
-                        src = re.sub(r'_S[XY]\d+_', '_SX500_', src)
-                    return src
-                elif img and img.get('data-src'):
-                    src = img['data-src']
-                    if '_SX' in src or '_SY' in src:
-                        src = re.sub(r'_S[XY]\d+_', '_SX500_', src)
-                    return src
-            
-            return None
+            # Raw-bytes pre-scan first, targeted parse only when that fails
+            with self.metrics.span('cover_parse', page='product'):
+                return self.extractor.extract_cover_url(response.content)
             
+        except ThrottledError:
+            raise
         except Exception as e:
+            self.metrics.increment('cover_stage_errors_total', stage='extract')
             print(f"Error extracting cover image from {book_url}: {e}")
             return None
     
     def download_image(self, image_url, filename):
-        """Download an image from URL and save it"""
+        """Download an image from URL and save it
+
+        The body is streamed in chunks to a temporary file next to the target,
+        checked against the content type and ``max_image_bytes``, and renamed into
+        place atomically, so a crash never leaves a truncated cover behind. Bytes
+        already stored under another title are hard-linked instead of stored twice.
+        """
+        tmp_path = None
         try:
             # Create covers directory if it doesn't exist
             covers_dir = Path("covers")
@@ -110,18 +295,51 @@ class AmazonBookCoverScraper:
             
             filepath = covers_dir / filename
             
-            response = self.session.get(image_url)
-            response.raise_for_status()
+            with self._get(image_url, stream=True) as response:
+                response.raise_for_status()
+                
+                content_type = response.headers.get('Content-Type', '')
+                if content_type and not content_type.startswith('image/'):
+                    raise ValueError(f"unexpected content type '{content_type}'")
+                declared_size = int(response.headers.get('Content-Length') or 0)
+                if declared_size > self.max_image_bytes:
+                    raise ValueError(f"image is {declared_size} bytes (limit {self.max_image_bytes})")
+                
+                digest = hashlib.sha256()
+                size = 0
+                fd, tmp_path = tempfile.mkstemp(dir=covers_dir, prefix='.download-', suffix='.part')
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        size += len(chunk)
+                        if size > self.max_image_bytes:
+                            raise ValueError(f"image exceeds {self.max_image_bytes} bytes")
+                        digest.update(chunk)
+                        f.write(chunk)
+            
+            if size == 0:
+                raise ValueError("empty response body")
             
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            with self.metrics.span('cover_disk_write', op='store'):
+                duplicate = self.stored_images.store(tmp_path, filepath, size, digest.hexdigest())
+            tmp_path = None
+            self.metrics.increment('cover_download_bytes_total', size)
             
-            print(f"Downloaded: {filepath}")
+            if duplicate:
+                self.metrics.increment('cover_downloads_deduplicated_total')
+                print(f"Downloaded: {filepath} (same image as {duplicate.name}, linked)")
+            else:
+                print(f"Downloaded: {filepath}")
             return str(filepath)
             
+        except ThrottledError:
+            raise
         except Exception as e:
+            self.metrics.increment('cover_stage_errors_total', stage='download')
             print(f"Error downloading image {image_url}: {e}")
             return None
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def sanitize_filename(self, filename):
         """Sanitize filename for saving"""
@@ -131,104 +349,215 @@ class AmazonBookCoverScraper:
             filename = filename.replace(char, '_')
         return filename[:100]  # Limit length
     
-    def process_books(self, json_file='book.json'):
-        """Process all books from the JSON file"""
+    def process_book(self, book):
+        """Run search, cover extraction and download for a single book"""
+        try:
+            return self._process_book(book)
+        except ThrottledError as e:
+            # Not an answer about the book: left unresolved, so --resume retries it
+            print(f"Throttled while processing '{book['title']}': {e}")
+            return {
+                'title': book['title'],
+                'author': book.get('author', ''),
+                'status': 'throttled',
+                'amazon_url': None,
+                'cover_image': None,
+                'error': str(e)
+            }
+
+    def _process_book(self, book):
+        filename = f"{self.sanitize_filename(book['title'])}.jpg"
+
+        def accept(source, result):
+            print(f"Cover from {source}: {result.cover_url}")
+            with self.metrics.span('cover_stage', stage='download'):
+                return self.download_image(result.cover_url, filename)
+
+        with self.metrics.span('cover_stage', stage='resolve'):
+            resolution = self.resolver.resolve(book, accept)
+        result = {
+            'title': book['title'],
+            'author': book.get('author', ''),
+            'status': {'rejected': 'download_failed'}.get(resolution['outcome'], resolution['outcome']),
+            'source': resolution['source'],
+            'page_url': resolution['page_url'],
+            'amazon_url': resolution['page_url'] if 'amazon.' in (resolution['page_url'] or '') else None,
+            'cover_image': resolution['accepted']
+        }
+        if resolution['cover_url']:
+            result['cover_url'] = resolution['cover_url']
+        if result['status'] == 'not_found':
+            print(f"Could not find any page for: {book['title']}")
+        elif result['status'] == 'no_cover':
+            print(f"Could not find cover image for: {book['title']}")
+        elif result['status'] == 'throttled':
+            print(f"No answer from some sources for: {book['title']} (retry with --resume)")
+        elif result['status'] == 'error':
+            print(f"Every source failed for: {book['title']} (retry with --resume)")
+        return result
+
+    def process_books(self, json_file='book.json', workers=1, resume=False, journal_path=JOURNAL_FILE,
+                      results_file=RESULTS_FILE):
+        """Process all books from the catalog file
+
+        The catalog (book.json layout or JSONL) is streamed one record at a time
+        and results are streamed to ``results_file`` in catalog order, so memory
+        does not grow with the number of books.
+
+        With ``workers > 1`` books are handled by a bounded thread pool, so the
+        search, extract and download stages of different books overlap. In both
+        modes requests are paced by the adaptive per-host throttle.
+
+        Each outcome is appended to the results journal as soon as it is known.
+        With ``resume=True`` books the journal already resolved (same title and
+        record) are skipped and their earlier results are read back from the
+        journal.
+
+        Returns a Counter of result statuses, or None when the run failed.
+        """
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            journal = ResultsJournal(journal_path)
+            resolved = journal.resolved_offsets() if resume else {}
+            if resume:
+                print(f"Resuming from {journal_path}: {len(resolved)} titles already resolved")
             
-            books = data.get('books', [])
-            print(f"Found {len(books)} books to process")
+            books = self.metrics.timed_iter(iter_records(json_file, key='books'),
+                                            'cover_json_io', op='read', file=os.path.basename(json_file))
+            statuses = Counter()
+            with journal.open(resume=resume), open_writer(results_file) as results_out:
+                for result in self._process_stream(books, resolved, journal, workers):
+                    results_out.write(result)
+                    statuses[result['status']] += 1
+            self.metrics.observe('cover_json_io_seconds', results_out.seconds, op='write',
+                                 file=os.path.basename(results_file))
             
-            results = []
+            self.resolver.save()
+            self._print_summary(statuses, results_file)
             
-            for i, book in enumerate(books, 1):
-                print(f"\n[{i}/{len(books)}] Processing: {book['title']}")
-                
-                # Check if we already have the URL (for books that already have Amazon URLs)
-                if 'amazon.com' in book.get('url', ''):
-                    book_url = book['url']
-                    print(f"Using existing Amazon URL: {book_url}")
-                else:
-                    # Search for the book on Amazon
-                    book_url = self.search_amazon_book(book['title'], book.get('author'))
-                    if not book_url:
-                        print(f"Could not find Amazon page for: {book['title']}")
-                        results.append({
-                            'title': book['title'],
-                            'author': book.get('author', ''),
-                            'status': 'not_found',
-                            'amazon_url': None,
-                            'cover_image': None
-                        })
-                        continue
-                
-                # Extract cover image URL
-                cover_url = self.extract_cover_image_url(book_url)
-                if not cover_url:
-                    print(f"Could not find cover image for: {book['title']}")
-                    results.append({
-                        'title': book['title'],
-                        'author': book.get('author', ''),
-                        'status': 'no_cover',
-                        'amazon_url': book_url,
-                        'cover_image': None
-                    })
-                    continue
-                
-                # Download the cover image
-                filename = f"{self.sanitize_filename(book['title'])}.jpg"
-                local_path = self.download_image(cover_url, filename)
-                
-                if local_path:
-                    results.append({
-                        'title': book['title'],
-                        'author': book.get('author', ''),
-                        'status': 'success',
-                        'amazon_url': book_url,
-                        'cover_image': local_path,
-                        'cover_url': cover_url
-                    })
-                else:
-                    results.append({
-                        'title': book['title'],
-                        'author': book.get('author', ''),
-                        'status': 'download_failed',
-                        'amazon_url': book_url,
-                        'cover_image': None,
-                        'cover_url': cover_url
-                    })
-                
-                # Be respectful to Amazon's servers
-                time.sleep(self.delay)
-            
-            # Save results
-            with open('cover_extraction_results.json', 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
-            
-            # Print summary
-            success_count = sum(1 for r in results if r['status'] == 'success')
-            print(f"\n=== SUMMARY ===")
-            print(f"Total books processed: {len(books)}")
-            print(f"Successfully downloaded covers: {success_count}")
-            print(f"Failed to find: {sum(1 for r in results if r['status'] == 'not_found')}")
-            print(f"No cover found: {sum(1 for r in results if r['status'] == 'no_cover')}")
-            print(f"Download failed: {sum(1 for r in results if r['status'] == 'download_failed')}")
-            print(f"Results saved to: cover_extraction_results.json")
-            print(f"Cover images saved to: covers/ directory")
-            
-            return results
+            return statuses
             
         except Exception as e:
             print(f"Error processing books: {e}")
-            return []
+            return None
+
+    def _process_stream(self, books, resolved, journal, workers):
+        """Yield one result per book, in catalog order
+
+        Books resolved in the journal for the same record come from the journal;
+        the rest are processed sequentially or on a worker pool with a bounded
+        number of books in flight, so the catalog is never materialized.
+        """
+        def journaled(book):
+            """Offset of the book's resolved entry, unless the record was edited since"""
+            offset, digest = resolved.get(book['title'], (None, None))
+            # Entries from before record hashes were kept only know the title
+            return offset if digest in (None, record_hash(book)) else None
+
+        def run(i, book):
+            print(f"\n[{i}] Processing: {book['title']}")
+            result = self.process_book(book)
+            journal.append(result, record_hash(book))
+            self.metrics.increment('cover_books_total', status=result['status'])
+            return result
+        
+        if workers <= 1:
+            for i, book in enumerate(books, 1):
+                offset = journaled(book)
+                yield journal.read_at(offset) if offset is not None else run(i, book)
+            return
+        
+        # Let every worker keep its own pooled connection per host
+        self._mount_adapters(pool_size=workers)
+        print(f"Processing with {workers} workers "
+              f"(max {self.limiter.max_per_host} concurrent requests per host)")
+        
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for i, book in enumerate(books, 1):
+                offset = journaled(book)
+                in_flight.append(offset if offset is not None else executor.submit(run, i, book))
+                # Enough queued work to keep every worker busy, in order
+                while len(in_flight) > workers * 4 or (in_flight and not isinstance(in_flight[0], Future)):
+                    yield self._collect(in_flight.popleft(), journal)
+            while in_flight:
+                yield self._collect(in_flight.popleft(), journal)
+
+    @staticmethod
+    def _collect(entry, journal):
+        return entry.result() if isinstance(entry, Future) else journal.read_at(entry)
+
+    def _print_summary(self, statuses, results_file=RESULTS_FILE):
+        """Print the per-status summary for a run"""
+        print(f"\n=== SUMMARY ===")
+        print(f"Total books processed: {sum(statuses.values())}")
+        print(f"Successfully downloaded covers: {statuses['success']}")
+        print(f"Failed to find: {statuses['not_found']}")
+        print(f"No cover found: {statuses['no_cover']}")
+        print(f"Download failed: {statuses['download_failed']}")
+        if statuses['throttled']:
+            print(f"Throttled (retry with --resume): {statuses['throttled']}")
+        if statuses['error']:
+            print(f"Source errors (retry with --resume): {statuses['error']}")
+        print("Sources (attempts / covers found / used / timeouts / p50):")
+        for name, attempts, successes, wins, timeouts, p50 in self.resolver.summary():
+            latency = f"{p50:.2f}s" if p50 is not None else "-"
+            print(f"  {name:<14} {attempts:>5} / {successes:>5} / {wins:>5} / {timeouts:>4} / {latency}")
+        for host, state in self.limiter.snapshot().items():
+            print(f"Host {host}: {state['rate']:.2f} req/s at the end, circuit {state['circuit']}")
+        print(f"Results saved to: {results_file}")
+        print(f"Cover images saved to: covers/ directory")
+        if self.response_cache:
+            stats = self.response_cache.stats
+            print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['revalidated']} revalidated")
 
 def main():
-    scraper = AmazonBookCoverScraper()
+    parser = argparse.ArgumentParser(description="Download Amazon cover images for book.json")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of books processed concurrently (default: 1, sequential)")
+    parser.add_argument('--max-per-host', type=int, default=2,
+                        help="maximum concurrent requests per host")
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="starting requests per second per host")
+    parser.add_argument('--max-rate', type=float, default=5.0,
+                        help="highest requests per second per host the throttle may reach")
+    parser.add_argument('--fixed-rate', action='store_true',
+                        help="keep --rate instead of adapting it (Retry-After, retries and the circuit breaker still apply)")
+    parser.add_argument('--base-url', default=AMAZON_BASE_URL,
+                        help="Amazon base URL (point at a local stand-in for testing)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR,
+                        help="directory of the on-disk response cache")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always fetch search and product pages from the network")
+    parser.add_argument('--resume', action='store_true',
+                        help=f"skip titles already resolved in {JOURNAL_FILE}")
+    parser.add_argument('--books', default='book.json',
+                        help="catalog to read: book.json layout or JSONL (default: book.json)")
+    parser.add_argument('--results', default=RESULTS_FILE,
+                        help=f"where to write the results, JSON or JSONL (default: {RESULTS_FILE})")
+    parser.add_argument('--metrics-prefix', default='cover_metrics',
+                        help="write metrics to <prefix>.prom and <prefix>.json")
+    parser.add_argument('--metrics-interval', type=float, default=None,
+                        help="also rewrite the metric files every N seconds during the run")
+    parser.add_argument('--no-metrics', action='store_true', help="do not write metric files")
+    parser.add_argument('--sources', nargs='+', choices=SOURCE_NAMES, default=list(SOURCE_NAMES),
+                        help="cover sources to query (their order is only the tie-breaker; past results decide)")
+    parser.add_argument('--no-hedge', action='store_true',
+                        help="start the next source only when the previous one failed or ran out of time")
+    parser.add_argument('--openlibrary-url', help="Open Library base URL (point at a local stand-in for testing)")
+    parser.add_argument('--googlebooks-url', help="Google Books API base URL (point at a local stand-in for testing)")
+    args = parser.parse_args()
+    
+    scraper = AmazonBookCoverScraper(args.base_url, args.max_per_host, args.rate,
+                                     cache_dir=None if args.no_cache else args.cache_dir,
+                                     max_rate=args.max_rate, adaptive=not args.fixed_rate,
+                                     sources=args.sources, hedge=not args.no_hedge,
+                                     source_urls={'openlibrary': args.openlibrary_url,
+                                                  'googlebooks': args.googlebooks_url})
     
     # Check if book.json exists
-    if not os.path.exists('book.json'):
-        print("Error: book.json file not found!")
+    if not os.path.exists(args.books):
+        print(f"Error: {args.books} file not found!")
         print("Please make sure the book.json file is in the same directory as this script.")
         return
     
@@ -236,15 +565,17 @@ def main():
     print("=" * 40)
     print("This script will:")
     print("1. Read books from book.json")
-    print("2. Search for each book on Amazon (if not already an Amazon URL)")
-    print("3. Extract and download cover images")
+    print("2. Find each cover on the book's own page, Amazon, Open Library and Google Books (concurrently)")
+    print("3. Download the first cover found")
     print("4. Save results to cover_extraction_results.json")
     print("5. Save cover images to covers/ directory")
-    print("\nNote: This process may take a while due to respectful delays between requests.")
+    print("\nNote: Requests are paced per host and slow down automatically when Amazon throttles.")
     
     input("\nPress Enter to continue...")
     
-    results = scraper.process_books()
+    with exporting(scraper.metrics, None if args.no_metrics else args.metrics_prefix, args.metrics_interval):
+        results = scraper.process_books(args.books, workers=args.workers, resume=args.resume,
+                                        results_file=args.results)
 
 if __name__ == "__main__":
     main()
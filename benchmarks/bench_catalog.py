@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Catalog Memory and Lookup Benchmark
+
+Compares the list of dicts that json.load gives for book.json with the
+compact Catalog (catalog.py) on a synthetic catalog:
+
+    python benchmarks/bench_catalog.py                 # 1,000,000 books
+    python benchmarks/bench_catalog.py --count 200000 --repeat 10
+
+Memory is measured with tracemalloc while each representation is loaded from
+the same temporary book.json: the bytes still allocated afterwards (per
+record) and the peak during loading. Lookups compare a scan that splits every
+record's condition string, as code working on the dicts has to, with the
+inverted index: fetching the id list, materializing the records, and a
+two-condition intersection. Each lookup is repeated and the median reported.
+Results are written as JSON to benchmarks/results/ unless --output says
+otherwise.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from catalog import Catalog  # noqa: E402
+from catalog_io import open_writer  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+WORDS = ('mind', 'quiet', 'healing', 'light', 'anxious', 'hope', 'night', 'body', 'keeps',
+         'score', 'lost', 'connections', 'feeling', 'good', 'unquiet', 'reasons', 'stay', 'alive')
+
+
+def write_synthetic_catalog(path, count, seed=7):
+    """book.json with ``count`` books whose condition values are drawn from book.json"""
+    with open(REPO_DIR / 'book.json', 'r', encoding='utf-8') as f:
+        conditions = [book['condition'] for book in json.load(f)['books']]
+    rng = random.Random(seed)
+    with open_writer(path, key='books') as writer:
+        for i in range(count):
+            words = rng.sample(WORDS, 3)
+            writer.write({
+                'title': f"{' '.join(words).title()} {i}",
+                'author': f"Author {rng.randrange(count // 20 or 1)}",
+                'description': ' '.join(rng.choices(WORDS, k=30)),
+                'condition': rng.choice(conditions),
+                'url': f"https://example.com/books/{i}",
+            })
+
+
+def measure(load):
+    """(result, bytes retained, peak bytes) of building ``load()`` under tracemalloc"""
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = load()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 4)
+
+
+def scan(books, condition):
+    return [book for book in books if condition in (c.strip().lower() for c in book['condition'].split(','))]
+
+
+def scan_all(books, conditions):
+    return [book for book in books
+            if set(conditions) <= {c.strip().lower() for c in book['condition'].split(',')}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact catalog against a list of dicts")
+    parser.add_argument('--count', type=int, default=1_000_000, help="synthetic books to generate")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per lookup (median reported)")
+    parser.add_argument('--condition', default='anxiety', help="condition to look up")
+    parser.add_argument('--and-condition', default='depression', help="second condition for the intersection")
+    parser.add_argument('--output', help="results JSON (default: benchmarks/results/catalog-<time>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench-catalog-') as workdir:
+        path = Path(workdir) / 'book.json'
+        print(f"Generating {args.count} books...")
+        write_synthetic_catalog(path, args.count)
+        file_size = path.stat().st_size
+
+        def load_dicts():
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)['books']
+
+        books, dicts_bytes, dicts_peak = measure(load_dicts)
+        catalog, catalog_bytes, catalog_peak = measure(lambda: Catalog.load_books(path))
+
+    index_bytes = sum(ids.buffer_info()[1] * ids.itemsize for ids in catalog.postings.values())
+    pair = [args.condition, args.and_condition]
+    expected = len(scan(books, args.condition))
+    assert expected == len(catalog.ids(args.condition)), "index and scan disagree"
+
+    lookups = {
+        'scan': median_ms(lambda: scan(books, args.condition), args.repeat),
+        'scan_two_conditions': median_ms(lambda: scan_all(books, pair), args.repeat),
+        'index_ids': median_ms(lambda: catalog.ids(args.condition), args.repeat),
+        'index_records': median_ms(lambda: catalog.with_condition(args.condition), args.repeat),
+        'index_two_conditions': median_ms(lambda: catalog.matching(all_of=pair), args.repeat),
+    }
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'file_bytes': file_size,
+        'matches': expected,
+        'memory': {
+            'dicts_bytes_per_record': round(dicts_bytes / args.count, 1),
+            'dicts_peak_mb': round(dicts_peak / 2**20, 1),
+            'catalog_bytes_per_record': round(catalog_bytes / args.count, 1),
+            'catalog_peak_mb': round(catalog_peak / 2**20, 1),
+            'index_bytes': index_bytes,
+        },
+        'lookup_ms': lookups,
+    }
+
+    memory = report['memory']
+    print(f"\n{args.count} books, {file_size / 2**20:.0f} MB of JSON, {expected} with '{args.condition}'")
+    print(f"  list of dicts   {memory['dicts_bytes_per_record']:>8.1f} B/record"
+          f"   peak {memory['dicts_peak_mb']:>7.1f} MB")
+    print(f"  Catalog         {memory['catalog_bytes_per_record']:>8.1f} B/record"
+          f"   peak {memory['catalog_peak_mb']:>7.1f} MB   (index {index_bytes / 2**20:.1f} MB)")
+    print("  lookups (median ms):")
+    for name, value in lookups.items():
+        print(f"    {name:<22} {value:>10.3f}")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"catalog-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
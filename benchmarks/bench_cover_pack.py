@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Cover Pack Read Benchmark
+
+Compares random-access cover reads from one file per cover (what
+BookController does: File.Exists, then ReadAllBytesAsync) with reads from a
+cover pack (cover_pack.py):
+
+    python benchmarks/bench_cover_pack.py                     # 5000 covers, 50000 reads
+    python benchmarks/bench_cover_pack.py --covers 20000 --reads 100000
+
+Synthetic covers get sizes drawn from the real covers/ (random bytes, so
+every one is distinct) and are written both as files and as a pack in a
+temporary directory. The same random key sequence is then read three ways:
+
+    files      os.path.exists + open/read of <key>.jpg
+    pack_view  CoverPack.get(): a memoryview into the mmap, no copy
+    pack_copy  bytes(CoverPack.get()): the view copied out, touching every byte
+
+All reads hit the page cache (the files were just written); the numbers
+compare per-request overhead, not disk latency. Results are written as JSON
+to benchmarks/results/ unless --output says otherwise.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from cover_pack import CoverPack, PackWriter  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def cover_sizes():
+    sizes = [path.stat().st_size for path in (REPO_DIR / 'covers').glob('*.jpg')]
+    return sizes or [25_000]
+
+
+def summarize_us(samples):
+    values = sorted(samples)
+
+    def at(fraction):
+        return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1e6, 2)
+
+    return {'p50_us': at(0.50), 'p95_us': at(0.95), 'p99_us': at(0.99),
+            'mean_us': round(sum(values) / len(values) * 1e6, 2)}
+
+
+def time_reads(read, keys):
+    samples = []
+    for key in keys:
+        start = time.perf_counter()
+        read(key)
+        samples.append(time.perf_counter() - start)
+    return summarize_us(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cover reads: per-file vs packed")
+    parser.add_argument('--covers', type=int, default=5000, help="synthetic covers to create")
+    parser.add_argument('--reads', type=int, default=50000, help="random reads per method")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help="results JSON (default: benchmarks/results/cover-pack-<time>.json)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sizes = cover_sizes()
+    with tempfile.TemporaryDirectory(prefix='bench-cover-pack-') as workdir:
+        covers_dir = Path(workdir) / 'covers'
+        covers_dir.mkdir()
+        pack_path = str(Path(workdir) / 'covers.pack')
+        keys = [f"Benchmark Cover {i}" for i in range(args.covers)]
+        total_bytes = 0
+        with PackWriter(pack_path) as writer:
+            for key in keys:
+                data = rng.randbytes(rng.choice(sizes))
+                total_bytes += len(data)
+                (covers_dir / f"{key}.jpg").write_bytes(data)
+                writer.add(key, data)
+        reads = [rng.choice(keys) for _ in range(args.reads)]
+
+        def read_file(key):
+            path = os.path.join(covers_dir, f"{key}.jpg")
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return f.read()
+            return None
+
+        with CoverPack(pack_path) as pack:
+            # One untimed pass so every method starts from the same warm cache
+            for key in keys:
+                read_file(key)
+                bytes(pack.get(key))
+            results = {
+                'files': time_reads(read_file, reads),
+                'pack_view': time_reads(pack.get, reads),
+                'pack_copy': time_reads(lambda key: bytes(pack.get(key)), reads),
+            }
+            pack_bytes = os.path.getsize(pack_path)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'cover_bytes': total_bytes,
+        'pack_bytes': pack_bytes,
+        'reads': results,
+    }
+
+    print(f"{args.covers} covers ({total_bytes / 2**20:.1f} MB, pack {pack_bytes / 2**20:.1f} MB), "
+          f"{args.reads} random reads")
+    baseline = results['files']['mean_us']
+    for method, stats in results.items():
+        print(f"  {method:<10} p50 {stats['p50_us']:>8.2f} µs   p95 {stats['p95_us']:>8.2f} µs"
+              f"   p99 {stats['p99_us']:>8.2f} µs   mean {stats['mean_us']:>8.2f} µs"
+              f"   ({baseline / stats['mean_us']:.1f}x)")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"cover-pack-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
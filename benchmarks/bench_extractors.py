@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Extractor Micro-benchmark
+
+Measures pages/sec of each cover-extraction strategy in cover_extractors.py
+over a set of saved pages:
+
+    python benchmarks/bench_extractors.py                   # recorded stand-in fixtures
+    python benchmarks/bench_extractors.py --pages saved/    # your own saved pages
+
+Saved pages are *.html files; names starting with "search" are treated as
+search result pages, everything else as product pages. The stand-in fixtures
+are small, so by default they are padded with filler markup to roughly the
+size of a real Amazon page (--pad-kb).
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cover_extractors import (  # noqa: E402
+    ChainedExtractor, FullSoupExtractor, PrescanExtractor, StrainedSoupExtractor, FAST_PARSER
+)
+from standin_server import FIXTURES_DIR, fake_asin  # noqa: E402
+
+FILLER_BLOCK = (
+    '<div class="a-section a-spacing-small"><span class="a-size-base">Customers also bought</span>'
+    '<a class="a-link-normal" href="/dp/B000000000"><img class="s-image" src="/images/I/x.jpg" alt=""></a>'
+    '<script type="text/javascript">P.when("A").execute(function(A){ A.state("x", {"k": [1, 2, 3]}); });</script>'
+    '</div>\n'
+)
+
+
+def recorded_pages(count, pad_kb):
+    """Render the stand-in fixtures into (kind, bytes) pages padded to pad_kb"""
+    templates = {
+        'search': (FIXTURES_DIR / 'search.html').read_text(encoding='utf-8'),
+        'product': (FIXTURES_DIR / 'product.html').read_text(encoding='utf-8'),
+    }
+    filler = FILLER_BLOCK * max(1, pad_kb * 1024 // len(FILLER_BLOCK))
+    pages = []
+    for i in range(count):
+        asin = fake_asin(f"book {i}")
+        for kind, template in templates.items():
+            page = (template.replace('{{QUERY}}', f"book {i}").replace('{{ASIN}}', asin)
+                    .replace('{{IMAGE_BASE}}', 'https://m.media-amazon.com'))
+            # Real pages carry most of their weight before the parts we look for
+            page = page.replace('<div id="a-page">', '<div id="a-page">' + filler, 1)
+            pages.append((kind, page.encode('utf-8')))
+    return pages
+
+
+def saved_pages(directory):
+    pages = []
+    for path in sorted(Path(directory).glob('*.html')):
+        kind = 'search' if path.name.startswith('search') else 'product'
+        pages.append((kind, path.read_bytes()))
+    return pages
+
+
+def run_strategy(extractor, pages, repeat):
+    outputs = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        outputs = []
+        for kind, content in pages:
+            if kind == 'search':
+                outputs.append(extractor.extract_result_href(content))
+            else:
+                outputs.append(extractor.extract_cover_url(content))
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cover extraction strategies")
+    parser.add_argument('--pages', help="directory of saved *.html pages")
+    parser.add_argument('--count', type=int, default=20, help="recorded pages to render per kind")
+    parser.add_argument('--pad-kb', type=int, default=300, help="filler added to recorded pages")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    pages = saved_pages(args.pages) if args.pages else recorded_pages(args.count, args.pad_kb)
+    total_kb = sum(len(content) for _, content in pages) / 1024
+    print(f"Benchmarking {len(pages)} pages ({total_kb / len(pages):.0f} KB average)")
+
+    strategies = [
+        ('full (html.parser)', FullSoupExtractor()),
+        ('strained (html.parser)', StrainedSoupExtractor(parser='html.parser')),
+        (f"strained ({FAST_PARSER})", StrainedSoupExtractor()),
+        ('prescan', PrescanExtractor()),
+        ('chained', ChainedExtractor()),
+    ]
+
+    results = []
+    baseline = None
+    for name, extractor in strategies:
+        rate, outputs = run_strategy(extractor, pages, args.repeat)
+        if baseline is None:
+            baseline = outputs
+        agree = sum(1 for a, b in zip(outputs, baseline) if a == b)
+        results.append({'strategy': name, 'pages_per_sec': round(rate, 1),
+                        'agreement': f"{agree}/{len(baseline)}"})
+        print(f"  {name:<24} {rate:>10.1f} pages/sec   matches full parse: {agree}/{len(baseline)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
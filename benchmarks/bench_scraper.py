@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Scraper Throughput Benchmark
+
+Runs AmazonBookCoverScraper.process_books end to end against the recorded-page
+stand-in (benchmarks/standin_server.py), so throughput can be measured without
+amazon.com and compared between changes:
+
+    python benchmarks/bench_scraper.py                          # 200 books, 1 and 8 workers
+    python benchmarks/bench_scraper.py --workers 1 4 16 --latency 0.05 --jitter 0.05
+    python benchmarks/bench_scraper.py --error-rate 0.02 --compare benchmarks/results/old.json
+
+Each run happens in a fresh temporary working directory (covers/, journal and
+results stay out of the repo), with the response cache off unless --cache is
+given. The per-host rate limit defaults far above what the stand-in needs, so
+the numbers measure the scraper rather than its politeness settings.
+
+Reported per run: books/sec, p50/p95/p99/mean latency of the search, extract,
+download and whole-book stages, outcome counts and peak RSS (of this process,
+which also hosts the stand-in). Results are written as JSON to
+benchmarks/results/ unless --output says otherwise.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from amazon_book_cover_scraper import AmazonBookCoverScraper  # noqa: E402
+from standin_server import start_standin_server  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+# Stage name: scraper method that implements it
+STAGES = {
+    'search': 'search_amazon_book',
+    'extract': 'extract_cover_image_url',
+    'download': 'download_image',
+    'book': 'process_book',
+}
+
+
+def synthetic_books(count):
+    return {'books': [{'title': f"Benchmark Book {i}", 'author': f"Author {i % 50}",
+                       'description': '', 'condition': 'depression', 'url': ''}
+                      for i in range(count)]}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def summarize(durations):
+    values = sorted(durations)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'mean_ms': round(sum(values) / len(values) * 1000, 2),
+    }
+
+
+def instrument(scraper):
+    """Wrap the stage methods of one scraper instance; return {stage: [seconds]}"""
+    timings = {stage: [] for stage in STAGES}
+    for stage, method_name in STAGES.items():
+        method = getattr(scraper, method_name)
+
+        def timed(*args, _method=method, _samples=timings[stage], **kwargs):
+            start = time.perf_counter()
+            try:
+                return _method(*args, **kwargs)
+            finally:
+                # list.append is atomic, so worker threads can share the list
+                _samples.append(time.perf_counter() - start)
+
+        setattr(scraper, method_name, timed)
+    return timings
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_once(books, workers, server, args):
+    with tempfile.TemporaryDirectory(prefix='bench-scraper-') as workdir:
+        books_file = Path(workdir) / 'book.json'
+        with open(books_file, 'w', encoding='utf-8') as f:
+            json.dump(books, f, ensure_ascii=False)
+
+        previous_dir = os.getcwd()
+        os.chdir(workdir)
+        try:
+            scraper = AmazonBookCoverScraper(server.base_url, args.max_per_host, args.rate,
+                                             cache_dir='.http_cache' if args.cache else None,
+                                             adaptive=False, sources=('amazon_search',), stats_path=None)
+            timings = instrument(scraper)
+            requests_before = server.request_count
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                statuses = scraper.process_books(str(books_file), workers=workers)
+                elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(previous_dir)
+
+    return {
+        'workers': workers,
+        'books': len(books['books']),
+        'elapsed_sec': round(elapsed, 3),
+        'books_per_sec': round(len(books['books']) / elapsed, 2),
+        'requests': server.request_count - requests_before,
+        'statuses': dict(statuses or {}),
+        'stages': {stage: summarize(samples) for stage, samples in timings.items()},
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_run(run, baseline=None):
+    line = (f"  workers={run['workers']:<3} {run['books_per_sec']:>8.2f} books/sec"
+            f"   {run['elapsed_sec']:>7.2f}s   peak RSS {run['peak_rss_kb'] / 1024:.0f} MB")
+    if baseline:
+        change = (run['books_per_sec'] / baseline['books_per_sec'] - 1) * 100
+        line += f"   ({change:+.1f}% vs baseline)"
+    print(line)
+    for stage, stats in run['stages'].items():
+        if stats['count']:
+            print(f"      {stage:<9} p50 {stats['p50_ms']:>8.2f} ms   p95 {stats['p95_ms']:>8.2f} ms"
+                  f"   p99 {stats['p99_ms']:>8.2f} ms   (n={stats['count']})")
+    print(f"      outcomes: {run['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cover scraper against the stand-in")
+    parser.add_argument('--books', help="book.json-style file to use instead of synthetic books")
+    parser.add_argument('--count', type=int, default=200, help="synthetic books to generate")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--max-per-host', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=10000.0, help="per-host requests/sec limit")
+    parser.add_argument('--latency', type=float, default=0.0, help="stand-in delay per response (seconds)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random stand-in delay (seconds)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of stand-in responses that are 503")
+    parser.add_argument('--cache', action='store_true', help="enable the on-disk response cache")
+    parser.add_argument('--output', help="results JSON (default: benchmarks/results/scraper-<time>.json)")
+    parser.add_argument('--compare', help="earlier results JSON to compare books/sec against")
+    args = parser.parse_args()
+
+    if args.books:
+        with open(args.books, 'r', encoding='utf-8') as f:
+            books = json.load(f)
+    else:
+        books = synthetic_books(args.count)
+
+    baseline_runs = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline_runs = {run['workers']: run for run in json.load(f)['runs']}
+
+    server = start_standin_server(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    print(f"Benchmarking {len(books['books'])} books against {server.base_url} "
+          f"(latency {args.latency}s, jitter {args.jitter}s, error rate {args.error_rate})")
+    runs = []
+    try:
+        for workers in args.workers:
+            run = run_once(books, workers, server, args)
+            runs.append(run)
+            print_run(run, baseline_runs.get(workers))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'runs': runs,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"scraper-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
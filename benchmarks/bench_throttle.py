@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Throttling Benchmark
+
+Runs the cover scraper against a stand-in that throttles like Amazon does
+(benchmarks/standin_server.py --rate-limit/--block-after): requests above the
+server's rate get a 503 with Retry-After, and a client that keeps pushing is
+served captcha pages for a while. Each pacing strategy gets a fresh stand-in:
+
+    python benchmarks/bench_throttle.py                              # 200 books, limit 20 req/s
+    python benchmarks/bench_throttle.py --server-rate 10 --fixed-rates 5 20 --count 400
+
+Strategies are the adaptive throttle starting at --start-rate, plus one fixed
+rate per --fixed-rates value (default: half and twice the server's limit).
+Reported per strategy: books/sec, requests sent, 503s and captcha pages the
+stand-in served, outcome counts and the throttle's final rate. Results are
+written as JSON to benchmarks/results/ unless --output says otherwise.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from amazon_book_cover_scraper import AmazonBookCoverScraper  # noqa: E402
+from bench_scraper import synthetic_books  # noqa: E402
+from pipeline_metrics import MetricsRegistry  # noqa: E402
+from standin_server import start_standin_server  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def run_strategy(name, rate, adaptive, books, args):
+    server = start_standin_server(latency=args.latency, rate_limit=args.server_rate,
+                                  block_after=args.block_after, block_seconds=args.block_seconds)
+    metrics = MetricsRegistry()
+    try:
+        with tempfile.TemporaryDirectory(prefix='bench-throttle-') as workdir:
+            books_file = Path(workdir) / 'book.json'
+            with open(books_file, 'w', encoding='utf-8') as f:
+                json.dump(books, f, ensure_ascii=False)
+            previous_dir = os.getcwd()
+            os.chdir(workdir)
+            try:
+                scraper = AmazonBookCoverScraper(server.base_url, args.max_per_host, rate, cache_dir=None,
+                                                 metrics=metrics, max_rate=args.max_rate, adaptive=adaptive,
+                                                 sources=('amazon_search',), stats_path=None)
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    start = time.perf_counter()
+                    statuses = scraper.process_books(str(books_file), workers=args.workers)
+                    elapsed = time.perf_counter() - start
+            finally:
+                os.chdir(previous_dir)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    retries = {dict(labels)['reason']: count for (metric, labels), count in metrics.counters.items()
+               if metric == 'cover_http_retries_total'}
+    final_rate = next(iter(scraper.limiter.snapshot().values()), {}).get('rate')
+    return {
+        'strategy': name,
+        'start_rate': rate,
+        'elapsed_sec': round(elapsed, 3),
+        'books_per_sec': round(len(books['books']) / elapsed, 2),
+        'requests': server.request_count,
+        'server_503s': server.throttled_count,
+        'server_captchas': server.captcha_count,
+        'retries': retries,
+        'statuses': dict(statuses),
+        'final_rate': final_rate,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper pacing against a throttling stand-in")
+    parser.add_argument('--count', type=int, default=200, help="synthetic books to generate")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--max-per-host', type=int, default=8)
+    parser.add_argument('--server-rate', type=float, default=20.0, help="stand-in requests/sec before 503s")
+    parser.add_argument('--block-after', type=int, default=20, help="stand-in 503s within 10s before captchas")
+    parser.add_argument('--block-seconds', type=float, default=10.0, help="how long the stand-in blocks")
+    parser.add_argument('--latency', type=float, default=0.0, help="stand-in delay per response (seconds)")
+    parser.add_argument('--start-rate', type=float, default=1.0, help="adaptive throttle's starting rate")
+    parser.add_argument('--max-rate', type=float, default=100.0, help="adaptive throttle's ceiling")
+    parser.add_argument('--fixed-rates', type=float, nargs='*', default=None,
+                        help="fixed rates to compare (default: half and twice --server-rate)")
+    parser.add_argument('--output', help="results JSON (default: benchmarks/results/throttle-<time>.json)")
+    args = parser.parse_args()
+
+    books = synthetic_books(args.count)
+    fixed_rates = args.fixed_rates if args.fixed_rates is not None else [args.server_rate / 2, args.server_rate * 2]
+    strategies = [('adaptive', args.start_rate, True)] + [(f"fixed {rate:g}/s", rate, False) for rate in fixed_rates]
+
+    print(f"Benchmarking {args.count} books, {args.workers} workers, stand-in limit {args.server_rate:g} req/s "
+          f"(captchas after {args.block_after} rejections, for {args.block_seconds:g}s)")
+    runs = []
+    for name, rate, adaptive in strategies:
+        run = run_strategy(name, rate, adaptive, books, args)
+        runs.append(run)
+        print(f"  {name:<14} {run['books_per_sec']:>6.2f} books/sec   {run['elapsed_sec']:>7.2f}s   "
+              f"{run['requests']} requests, {run['server_503s']} × 503, {run['server_captchas']} captchas   "
+              f"final rate {run['final_rate']:.1f}/s")
+        print(f"      outcomes: {run['statuses']}   retries: {run['retries']}")
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'runs': runs,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"throttle-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Work Queue Benchmark
+
+Scrapes a synthetic catalog through work_queue.py with 1, 2 and 4 worker
+processes against the stand-in server, then checks recovery from a crash:
+one worker is SIGKILLed mid-run and the others must finish every book, with
+only the killed worker's leased jobs attempted twice.
+
+    python benchmarks/bench_work_queue.py                            # 120 books, 50 ms latency
+    python benchmarks/bench_work_queue.py --processes 1 2 4 8 --count 400 --latency 0.1
+
+Each run gets a fresh queue and working directory, and no HTTP cache, so every
+run does the same work. Reported per run: books/sec, speedup over the first
+process count, and result statuses. For the kill test: jobs the killed worker
+held, jobs attempted more than once, and whether every book was resolved.
+Results are written as JSON to benchmarks/results/ unless --output says
+otherwise.
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import signal
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from bench_scraper import synthetic_books  # noqa: E402
+from standin_server import start_standin_server  # noqa: E402
+from work_queue import WorkQueue, run, worker_main  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def queue_options(base_url, args):
+    return {
+        'threads': args.threads, 'batch': 1, 'lease': args.lease, 'poll': 0.2, 'max_attempts': 5,
+        'scraper': {'base_url': base_url, 'max_per_host': args.threads, 'requests_per_second': args.rate,
+                    'max_rate': args.rate, 'adaptive': False, 'cache_dir': None,
+                    'sources': ('amazon_search',), 'stats_path': None},
+    }
+
+
+@contextlib.contextmanager
+def workdir_with(books):
+    with tempfile.TemporaryDirectory(prefix='bench-queue-') as workdir:
+        with open(Path(workdir) / 'book.json', 'w', encoding='utf-8') as f:
+            json.dump(books, f, ensure_ascii=False)
+        previous_dir = os.getcwd()
+        os.chdir(workdir)
+        try:
+            yield Path(workdir)
+        finally:
+            os.chdir(previous_dir)
+
+
+def run_processes(processes, books, base_url, args):
+    with workdir_with(books) as workdir:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            counts = run(str(workdir / 'queue.db'), 'book.json', processes, queue_options(base_url, args),
+                         results_file='results.json', interval=0.2)
+            elapsed = time.perf_counter() - start
+        queue = WorkQueue(str(workdir / 'queue.db'))
+        statuses = dict(queue.conn.execute(
+            "SELECT json_extract(result, '$.status'), COUNT(*) FROM jobs GROUP BY 1"))
+        queue.close()
+    return {
+        'processes': processes,
+        'elapsed_sec': round(elapsed, 3),
+        'books_per_sec': round(len(books['books']) / elapsed, 2),
+        'done': counts['done'],
+        'failed': counts['failed'],
+        'statuses': statuses,
+    }
+
+
+def kill_test(books, base_url, args):
+    """Run 3 workers, SIGKILL one once it holds leases, let the others finish"""
+    options = queue_options(base_url, args)
+    with workdir_with(books) as workdir:
+        path = str(workdir / 'queue.db')
+        queue = WorkQueue(path)
+        queue.load('book.json')
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=worker_main, args=(path, options, None, os.devnull)) for _ in range(3)]
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        victim = workers[0]
+        owner_prefix = f"%:{victim.pid}:%"
+        held = 0
+        while held == 0 or queue.counts()['done'] < len(books['books']) // 4:
+            held = queue.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'leased' AND lease_owner LIKE ?",
+                                      (owner_prefix,)).fetchone()[0]
+            time.sleep(0.01)
+        held_ids = [row[0] for row in queue.conn.execute(
+            "SELECT id FROM jobs WHERE status = 'leased' AND lease_owner LIKE ?", (owner_prefix,))]
+        os.kill(victim.pid, signal.SIGKILL)
+        killed_at = time.perf_counter() - start
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+        counts = queue.counts()
+        retried = queue.conn.execute('SELECT COUNT(*) FROM jobs WHERE attempts > 1').fetchone()[0]
+        recovered = queue.conn.execute(
+            f"SELECT COUNT(*) FROM jobs WHERE status = 'done' AND id IN ({','.join('?' * len(held_ids))})",
+            held_ids).fetchone()[0] if held_ids else 0
+        queue.close()
+    return {
+        'killed_after_sec': round(killed_at, 3),
+        'killed_exitcode': victim.exitcode,
+        'elapsed_sec': round(elapsed, 3),
+        'leased_by_killed_worker': len(held_ids),
+        'recovered': recovered,
+        'attempted_twice': retried,
+        'done': counts['done'],
+        'failed': counts['failed'],
+        'all_resolved': counts['done'] == len(books['books']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-process scraping through the SQLite work queue")
+    parser.add_argument('--count', type=int, default=120, help="synthetic books to generate")
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=1, help="books in flight per process")
+    parser.add_argument('--latency', type=float, default=0.05, help="stand-in delay per response (seconds)")
+    parser.add_argument('--rate', type=float, default=100.0, help="requests/sec per host, per process")
+    parser.add_argument('--lease', type=float, default=3.0, help="lease seconds (short, so the kill test recovers fast)")
+    parser.add_argument('--no-kill-test', action='store_true')
+    parser.add_argument('--output', help="results JSON (default: benchmarks/results/work-queue-<time>.json)")
+    args = parser.parse_args()
+
+    books = synthetic_books(args.count)
+    server = start_standin_server(latency=args.latency)
+    print(f"Benchmarking {args.count} books, {args.threads} thread(s) per process, "
+          f"stand-in latency {args.latency * 1000:.0f} ms, {os.cpu_count()} CPUs")
+    runs = []
+    kill = None
+    try:
+        for processes in args.processes:
+            result = run_processes(processes, books, server.base_url, args)
+            result['speedup'] = round(result['books_per_sec'] / runs[0]['books_per_sec'], 2) if runs else 1.0
+            runs.append(result)
+            print(f"  {processes:>2} processes   {result['books_per_sec']:>6.2f} books/sec   "
+                  f"{result['elapsed_sec']:>7.2f}s   ×{result['speedup']:.2f}   {result['statuses']}")
+        if not args.no_kill_test:
+            kill = kill_test(books, server.base_url, args)
+            print(f"  kill test: worker killed at {kill['killed_after_sec']:.1f}s holding "
+                  f"{kill['leased_by_killed_worker']} lease(s); {kill['recovered']} recovered, "
+                  f"{kill['attempted_twice']} attempted twice, {kill['done']}/{args.count} done "
+                  f"in {kill['elapsed_sec']:.1f}s {'✅' if kill['all_resolved'] else '❌'}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'runs': runs,
+        'kill_test': kill,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"work-queue-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Seed API Stand-in Server
+
+In-memory stand-in for the /api/Seed endpoints of the Mind-Mend API, so the
+seeding clients (seed_books.py, seed_podcasts.py, seed_sync.py) can be run and
+timed without the ASP.NET app and its database:
+
+    python benchmarks/seed_standin.py --port 8766
+    python seed_sync.py --base-url http://127.0.0.1:8766
+
+Records are validated the way BookSeederService / PodcastSeederService do it
+(books need a title and author, podcasts a name and url). --latency adds a
+per-request delay and --failure-rate answers that share of requests with a 503,
+to exercise retries. --write-latency is added to seeding, refresh and batch
+requests only, which hold the catalog lock meanwhile like the database
+transaction does, so concurrent count requests queue behind them.
+
+It also serves GET /api/Book/cover/{title}?variant= like BookController:
+cover_variants/<variant>/, then covers/<title>.jpg under --data-dir, then
+wwwroot/uploads/fallback-book-cover.jpg (a 200, as the API answers unknown
+titles), and 404 only without a fallback image, so seed_load_test.py can be
+run against it:
+
+    python seed_load_test.py --base-url http://127.0.0.1:8766 --rate 200 --duration 30
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+def book_key(record):
+    if record.get('title') and record.get('author'):
+        return record['title']
+    return None
+
+
+def podcast_key(record):
+    # podcast.json "books" entries use title instead of name
+    name = record.get('name') if 'name' in record else record.get('title')
+    if name and record.get('url'):
+        return name
+    return None
+
+
+# catalog: (seed json file, key function, count field)
+CATALOGS = {
+    'books': ('book.json', book_key, 'totalBooks'),
+    'podcasts': ('podcast.json', podcast_key, 'totalPodcasts'),
+}
+
+# BookController.CoverVariants: variant → file extension
+COVER_VARIANTS = {'list': '.jpg', 'list_webp': '.webp', 'detail': '.jpg', 'detail_webp': '.webp'}
+
+
+def sanitize_filename(filename):
+    # BookController.SanitizeFilename (no length limit, unlike the scraper)
+    for char in '<>:"/\\|?*':
+        filename = filename.replace(char, '_')
+    return filename
+
+
+class SeedStandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this every
+    # keep-alive response waits on a delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        with server.stats_lock:
+            server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.failure_rate and random.random() < server.failure_rate:
+            with server.stats_lock:
+                server.failed_count += 1
+            self.send_json(503, {'message': 'Injected failure'})
+            return
+
+        parts = self.path.split('?', 1)[0].strip('/').split('/')
+        if method == 'GET' and len(parts) >= 4 and parts[:3] == ['api', 'Book', 'cover']:
+            self.send_cover(unquote('/'.join(parts[3:])))
+            return
+        if len(parts) < 3 or parts[:2] != ['api', 'Seed'] or parts[2] not in CATALOGS:
+            self.send_json(404, {'message': 'Not Found'})
+            return
+        catalog, action = parts[2], '/'.join(parts[3:])
+        count_field = CATALOGS[catalog][2]
+        if method != 'GET' and server.write_latency:
+            # Seeding runs inside one database transaction; counts wait for it
+            with server.lock:
+                time.sleep(server.write_latency)
+
+        if method == 'GET' and action == 'count':
+            self.send_json(200, {count_field: server.count(catalog)})
+        elif method == 'POST' and action == '':
+            server.seed(catalog)
+            self.send_json(200, {'message': f"{catalog.title()} seeded successfully",
+                                 count_field: server.count(catalog)})
+        elif method == 'POST' and action == 'refresh':
+            server.clear(catalog)
+            server.seed(catalog)
+            self.send_json(200, {'message': f"{catalog.title()} refreshed successfully",
+                                 count_field: server.count(catalog)})
+        elif method == 'DELETE' and action == '':
+            server.clear(catalog)
+            self.send_json(200, {'message': f"All {catalog} cleared successfully"})
+        elif method == 'POST' and action == 'batch':
+            try:
+                batch = json.loads(body or b'{}')
+            except ValueError:
+                self.send_json(400, {'message': 'Invalid JSON'})
+                return
+            result = server.apply_batch(catalog, batch.get('upsert', []), batch.get('remove', []))
+            result.update(message=f"{catalog[:-1].title()} batch applied successfully")
+            result[count_field] = server.count(catalog)
+            self.send_json(200, result)
+        else:
+            self.send_json(404, {'message': 'Not Found'})
+
+    def send_cover(self, title):
+        sanitized = sanitize_filename(title)
+        variant = parse_qs(urlsplit(self.path).query).get('variant', [None])[0]
+        candidates = []
+        if variant in COVER_VARIANTS:
+            candidates.append(self.server.data_dir / 'cover_variants' / variant / f"{sanitized}{COVER_VARIANTS[variant]}")
+        candidates.append(self.server.data_dir / 'covers' / f"{sanitized}.jpg")
+        candidates.append(self.server.data_dir / 'wwwroot' / 'uploads' / 'fallback-book-cover.jpg')
+        for path in candidates:
+            try:
+                body = path.read_bytes()
+            except OSError:
+                continue
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/webp' if path.suffix == '.webp' else 'image/jpeg')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_json(404, {'message': 'Cover image not found'})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SeedStandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, data_dir=REPO_DIR, latency=0.0, failure_rate=0.0, write_latency=0.0):
+        super().__init__(address, SeedStandinHandler)
+        self.data_dir = Path(data_dir)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.write_latency = write_latency
+        self.resources = {catalog: {} for catalog in CATALOGS}
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.failed_count = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, catalog):
+        with self.lock:
+            return len(self.resources[catalog])
+
+    def clear(self, catalog):
+        with self.lock:
+            self.resources[catalog].clear()
+
+    def seed(self, catalog):
+        """Add records from the seed JSON whose key is not stored yet"""
+        json_file, key_fn, _ = CATALOGS[catalog]
+        with open(self.data_dir / json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        records = data.get('books', []) if catalog == 'books' else data.get('podcasts', []) + data.get('books', [])
+        with self.lock:
+            for record in records:
+                key = key_fn(record)
+                if key is not None and key not in self.resources[catalog]:
+                    self.resources[catalog][key] = record
+
+    def apply_batch(self, catalog, upserts, removals):
+        _, key_fn, _ = CATALOGS[catalog]
+        result = {'added': 0, 'updated': 0, 'removed': 0, 'skipped': 0}
+        with self.lock:
+            stored = self.resources[catalog]
+            for record in upserts:
+                key = key_fn(record)
+                if key is None:
+                    result['skipped'] += 1
+                    continue
+                result['updated' if key in stored else 'added'] += 1
+                stored[key] = record
+            for key in removals:
+                if stored.pop(key, None) is not None:
+                    result['removed'] += 1
+        return result
+
+
+def start_seed_standin(host='127.0.0.1', port=0, **kwargs):
+    """Start the stand-in on a background thread and return the server"""
+    server = SeedStandinServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an in-memory stand-in of the Seed API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--data-dir', default=str(REPO_DIR), help="directory with book.json / podcast.json")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument('--write-latency', type=float, default=0.0,
+                        help="seconds added to seed/refresh/batch requests, holding the catalog lock")
+    args = parser.parse_args()
+
+    server = SeedStandinServer((args.host, args.port), args.data_dir, args.latency, args.failure_rate,
+                               args.write_latency)
+    print(f"Seed API stand-in listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Amazon Stand-in Server
+
+Serves the recorded search, product and image responses from
+benchmarks/fixtures/amazon so the cover scraper can be run end to end without
+touching amazon.com:
+
+    python benchmarks/standin_server.py --port 8765
+    python amazon_book_cover_scraper.py --base-url http://127.0.0.1:8765 --workers 8
+
+It also serves the recorded YouTube channel page and avatar from
+benchmarks/fixtures/youtube for /@handle, /channel/, /c/ and /user/ URLs, so
+the podcast cover prefetcher can run against it too:
+
+    python podcast_prefetch.py --youtube-url http://127.0.0.1:8765 --amazon-url http://127.0.0.1:8765
+
+Every query maps to a stable fake ASIN, so repeated runs (sequential or
+concurrent) see exactly the same pages. --latency/--jitter delay every response
+by latency + uniform(0, jitter) seconds and --error-rate answers that share of
+requests with a 503, to approximate a real network.
+
+For the other cover sources it serves catalog review pages (noor-book.com
+layout, /book/review/<slug>) from benchmarks/fixtures/catalog, and the Open
+Library (/search.json) and Google Books (/books/v1/volumes) search APIs:
+
+    python amazon_book_cover_scraper.py --base-url http://127.0.0.1:8765 \
+        --openlibrary-url http://127.0.0.1:8765 --googlebooks-url http://127.0.0.1:8765
+
+--path-latency /s=2 adds latency to one kind of page only, e.g. to watch the
+resolver hedge around a slow source.
+
+--rate-limit simulates Amazon's throttling: requests beyond that many per
+second (token bucket, --burst deep) get a 503 with Retry-After. A client that
+keeps pushing is blocked: after --block-after rejections within ten seconds,
+search and product pages are answered with the robot check page (status 200,
+like Amazon) for --block-seconds.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures' / 'amazon'
+YOUTUBE_FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures' / 'youtube'
+CATALOG_FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures' / 'catalog'
+CHANNEL_PREFIXES = ('/@', '/channel/', '/c/', '/user/')
+IMAGE_PREFIXES = ('/images/', '/publice/', '/b/id/', '/books/content')
+
+
+def fake_asin(query):
+    """Stable 10-character ASIN for a search query"""
+    return 'B0' + hashlib.sha1(query.encode('utf-8')).hexdigest()[:8].upper()
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this every
+    # keep-alive response waits on a delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Keep benchmark and scraper output readable
+        pass
+
+    def do_GET(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        with server.stats_lock:
+            server.request_count += 1
+        extra = next((delay for prefix, delay in server.path_latency.items()
+                      if parts.path == prefix or parts.path.startswith(prefix.rstrip('/') + '/')), 0.0)
+        if server.latency or server.jitter or extra:
+            time.sleep(server.latency + extra + random.uniform(0, server.jitter))
+        throttle = server.check_rate_limit()
+        if throttle == 'captcha' and not parts.path.startswith(IMAGE_PREFIXES + ('/yt3/',)):
+            self.send_body(200, server.render('captcha.html', query=parts.path), 'text/html; charset=utf-8')
+            return
+        if throttle == 'reject':
+            self.send_body(503, b'Service Unavailable', 'text/plain',
+                           {'Retry-After': str(server.retry_after)} if server.retry_after else None)
+            return
+        if server.error_rate and random.random() < server.error_rate:
+            with server.stats_lock:
+                server.error_count += 1
+            self.send_body(503, b'Service Unavailable', 'text/plain')
+            return
+
+        if parts.path == '/s':
+            query = parse_qs(parts.query).get('k', [''])[0]
+            if query in server.missing_queries:
+                body = server.render('search_empty.html', query=query)
+            else:
+                body = server.render('search.html', query=query, asin=fake_asin(query))
+            self.send_body(200, body, 'text/html; charset=utf-8')
+        elif '/dp/' in parts.path:
+            # Both /dp/<asin> and /<slug>/dp/<asin> product URLs
+            asin = parts.path.split('/dp/', 1)[1].strip('/').split('/')[0]
+            self.send_body(200, server.render('product.html', asin=asin), 'text/html; charset=utf-8')
+        elif parts.path.startswith(IMAGE_PREFIXES):
+            self.send_body(200, server.image_bytes, 'image/jpeg')
+        elif parts.path.startswith('/book/review/'):
+            slug = unquote(parts.path[len('/book/review/'):].strip('/'))
+            if slug in server.missing_queries:
+                self.send_body(404, b'Not Found', 'text/plain')
+            else:
+                body = server.render('review.html', query=slug.replace('-', ' '), asin=fake_asin(slug))
+                self.send_body(200, body, 'text/html; charset=utf-8')
+        elif parts.path == '/search.json':
+            title = parse_qs(parts.query).get('title', [''])[0]
+            if title in server.missing_queries:
+                self.send_body(200, b'{"numFound": 0, "start": 0, "docs": []}', 'application/json')
+            else:
+                cover_id = str(int(fake_asin(title)[2:8], 16))
+                body = server.render('openlibrary_search.json', query=json.dumps(title)[1:-1], cover_id=cover_id)
+                self.send_body(200, body, 'application/json')
+        elif parts.path == '/books/v1/volumes':
+            query = parse_qs(parts.query).get('q', [''])[0]
+            title = query.split(' inauthor:')[0].removeprefix('intitle:')
+            if title in server.missing_queries:
+                self.send_body(200, b'{"kind": "books#volumes", "totalItems": 0}', 'application/json')
+            else:
+                body = server.render('googlebooks_volumes.json', query=json.dumps(title)[1:-1], asin=fake_asin(title))
+                self.send_body(200, body, 'application/json')
+        elif parts.path.startswith(CHANNEL_PREFIXES):
+            channel = unquote(parts.path.strip('/').split('/')[-1].lstrip('@'))
+            self.send_body(200, server.render('channel.html', channel=channel), 'text/html; charset=utf-8')
+        elif parts.path.startswith('/yt3/'):
+            self.send_body(200, server.avatar_bytes, 'image/jpeg')
+        else:
+            self.send_body(404, b'Not Found', 'text/plain')
+
+    def send_body(self, status, body, content_type, headers=None):
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures_dir=FIXTURES_DIR, missing_queries=(),
+                 latency=0.0, jitter=0.0, error_rate=0.0, youtube_fixtures_dir=YOUTUBE_FIXTURES_DIR,
+                 rate_limit=0.0, burst=None, retry_after=1, block_after=0, block_seconds=30.0,
+                 catalog_fixtures_dir=CATALOG_FIXTURES_DIR, path_latency=None):
+        super().__init__(address, StandinHandler)
+        fixtures_dir = Path(fixtures_dir)
+        self.templates = {
+            name: (fixtures_dir / name).read_text(encoding='utf-8')
+            for name in ('search.html', 'search_empty.html', 'product.html', 'captcha.html')
+        }
+        self.image_bytes = (fixtures_dir / 'cover.jpg').read_bytes()
+        youtube_fixtures_dir = Path(youtube_fixtures_dir)
+        self.templates['channel.html'] = (youtube_fixtures_dir / 'channel.html').read_text(encoding='utf-8')
+        self.avatar_bytes = (youtube_fixtures_dir / 'avatar.jpg').read_bytes()
+        for name in ('review.html', 'openlibrary_search.json', 'googlebooks_volumes.json'):
+            self.templates[name] = (Path(catalog_fixtures_dir) / name).read_text(encoding='utf-8')
+        self.path_latency = dict(path_latency or {})
+        self.missing_queries = set(missing_queries)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst or max(1.0, rate_limit)
+        self.retry_after = retry_after
+        self.block_after = block_after
+        self.block_seconds = block_seconds
+        self.tokens = self.burst
+        self.tokens_updated = time.monotonic()
+        self.rejections = deque()
+        self.blocked_until = 0.0
+        self.stats_lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.throttled_count = 0
+        self.captcha_count = 0
+
+    def check_rate_limit(self):
+        """None when a request may be served, 'reject' (503) or 'captcha' (blocked)"""
+        if not self.rate_limit:
+            return None
+        with self.stats_lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                self.captcha_count += 1
+                return 'captcha'
+            self.tokens = min(self.burst, self.tokens + (now - self.tokens_updated) * self.rate_limit)
+            self.tokens_updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            self.throttled_count += 1
+            self.rejections.append(now)
+            while self.rejections[0] < now - 10:
+                self.rejections.popleft()
+            if self.block_after and len(self.rejections) >= self.block_after:
+                self.blocked_until = now + self.block_seconds
+                self.rejections.clear()
+            return 'reject'
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def render(self, template, query='', asin='', channel='', cover_id=''):
+        page = self.templates[template]
+        page = page.replace('{{QUERY}}', query).replace('{{ASIN}}', asin).replace('{{CHANNEL}}', channel)
+        page = page.replace('{{COVER_ID}}', cover_id)
+        return page.replace('{{IMAGE_BASE}}', self.base_url).encode('utf-8')
+
+
+def start_standin_server(host='127.0.0.1', port=0, **kwargs):
+    """Start the stand-in on a background thread and return the server"""
+    server = StandinServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded Amazon and YouTube pages for the cover tools")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random delay of up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help="requests per second before answering 503 (default: unlimited)")
+    parser.add_argument('--burst', type=float, default=None, help="token bucket depth (default: --rate-limit)")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds on 503 (0: none)")
+    parser.add_argument('--block-after', type=int, default=0,
+                        help="serve captcha pages after this many 503s within 10s (default: never)")
+    parser.add_argument('--block-seconds', type=float, default=30.0, help="how long a block lasts")
+    parser.add_argument('--path-latency', action='append', default=[], metavar='PREFIX=SECONDS',
+                        help="extra delay for paths starting with PREFIX (repeatable)")
+    args = parser.parse_args()
+    path_latency = {prefix: float(seconds) for prefix, seconds in
+                    (item.rsplit('=', 1) for item in args.path_latency)}
+
+    server = StandinServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, rate_limit=args.rate_limit, burst=args.burst,
+                           retry_after=args.retry_after, block_after=args.block_after,
+                           block_seconds=args.block_seconds, path_latency=path_latency)
+    print(f"Amazon stand-in listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
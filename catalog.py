@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Catalog Model
+
+Compact record types for book.json and podcast.json, and a Catalog that keeps
+a condition → record-id inverted index next to the records:
+
+    books = Catalog.load_books()                     # book.json (or JSONL)
+    books.with_condition('depression')               # [BookRecord, ...]
+    books.matching(all_of=['depression', 'anxiety'])  # record ids
+    podcasts = Catalog.load_podcasts()               # podcast.json, both arrays
+
+Books store ``condition`` as a comma-separated string and podcasts as a list;
+both are parsed once into a tuple of normalized condition names. Records use
+__slots__, authors/hosts and condition names are interned, and identical
+condition tuples are shared, so a record costs little more than its own
+title, description and URL strings. Posting lists are array('I') of record
+ids (4 bytes per posting).
+
+    python catalog.py book.json            # condition counts
+    python catalog.py podcast.json anxiety # podcasts for one condition
+"""
+
+import argparse
+import os
+import sys
+from array import array
+
+import numpy as np
+
+from catalog_io import iter_records, is_jsonl
+
+_CONDITION_SETS = {}
+
+
+def parse_conditions(value):
+    """Normalized, interned tuple of condition names from a string or list"""
+    if not value:
+        return ()
+    parts = value.split(',') if isinstance(value, str) else value
+    names = tuple(dict.fromkeys(sys.intern(_normalize(part)) for part in parts if part and part.strip()))
+    # Records with the same conditions share one tuple
+    return _CONDITION_SETS.setdefault(names, names)
+
+
+def _normalize(condition):
+    return condition.strip().lower()
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+class BookRecord:
+    __slots__ = ('title', 'author', 'description', 'conditions', 'url')
+
+    def __init__(self, title, author=None, description=None, conditions=(), url=None):
+        self.title = title
+        self.author = _intern(author)
+        self.description = description
+        self.conditions = conditions
+        self.url = url
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data.get('title'), data.get('author'), data.get('description'),
+                   parse_conditions(data.get('condition')), data.get('url'))
+
+    def to_json(self):
+        """The record in book.json form"""
+        return {'title': self.title, 'author': self.author, 'description': self.description,
+                'condition': ', '.join(self.conditions), 'url': self.url}
+
+    @property
+    def key(self):
+        return self.title
+
+    def __repr__(self):
+        return f"BookRecord({self.title!r}, conditions={self.conditions!r})"
+
+
+class PodcastRecord:
+    __slots__ = ('name', 'host', 'description', 'conditions', 'url', 'is_podcast')
+
+    def __init__(self, name, host=None, description=None, conditions=(), url=None, is_podcast=True):
+        self.name = name
+        self.host = _intern(host)
+        self.description = description
+        self.conditions = conditions
+        self.url = url
+        self.is_podcast = is_podcast
+
+    @classmethod
+    def from_json(cls, data):
+        # Entries of the "books" array in podcast.json use title/author
+        is_podcast = 'name' in data
+        return cls(data.get('name') if is_podcast else data.get('title'),
+                   data.get('host') if is_podcast else data.get('author'),
+                   data.get('description'), parse_conditions(data.get('condition')),
+                   data.get('url'), is_podcast)
+
+    def to_json(self):
+        """The record in podcast.json form"""
+        if self.is_podcast:
+            return {'name': self.name, 'host': self.host, 'description': self.description,
+                    'condition': list(self.conditions), 'url': self.url}
+        return {'title': self.name, 'author': self.host, 'description': self.description,
+                'condition': list(self.conditions), 'url': self.url}
+
+    @property
+    def key(self):
+        return self.name
+
+    def __repr__(self):
+        return f"PodcastRecord({self.name!r}, conditions={self.conditions!r})"
+
+
+class Catalog:
+    """Records addressed by id (insertion order) with a condition inverted index"""
+
+    def __init__(self, records=()):
+        self.records = []
+        self.postings = {}
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        record_id = len(self.records)
+        self.records.append(record)
+        for condition in record.conditions:
+            postings = self.postings.get(condition)
+            if postings is None:
+                postings = self.postings[condition] = array('I')
+            postings.append(record_id)
+        return record_id
+
+    @classmethod
+    def load_books(cls, path='book.json'):
+        return cls(BookRecord.from_json(data) for data in iter_records(path, key='books'))
+
+    @classmethod
+    def load_podcasts(cls, path='podcast.json'):
+        if is_jsonl(path):
+            return cls(PodcastRecord.from_json(data) for data in iter_records(path))
+        catalog = cls(PodcastRecord.from_json(data) for data in iter_records(path, key='podcasts'))
+        for data in iter_records(path, key='books'):
+            catalog.add(PodcastRecord.from_json(data))
+        return catalog
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, record_id):
+        return self.records[record_id]
+
+    def conditions(self):
+        """{condition: record count}, most common first"""
+        counts = {condition: len(ids) for condition, ids in self.postings.items()}
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    def ids(self, condition):
+        """Record ids (ascending) for one condition"""
+        return self.postings.get(_normalize(condition), array('I'))
+
+    def with_condition(self, condition):
+        records = self.records
+        return [records[record_id] for record_id in self.ids(condition)]
+
+    def matching(self, any_of=(), all_of=()):
+        """Sorted ids of records with any of ``any_of`` and all of ``all_of``"""
+        result = None
+        if any_of:
+            lists = [np.frombuffer(self.ids(c), dtype=np.uint32) for c in any_of]
+            result = np.unique(np.concatenate(lists))
+        for condition in all_of:
+            ids = np.frombuffer(self.ids(condition), dtype=np.uint32)
+            result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+        return result if result is not None else np.arange(len(self.records), dtype=np.uint32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a catalog by condition")
+    parser.add_argument('path', nargs='?', default='book.json')
+    parser.add_argument('condition', nargs='?', help="list the records for this condition")
+    parser.add_argument('--podcasts', action='store_true', help="read the path as podcast.json")
+    args = parser.parse_args()
+
+    is_podcasts = args.podcasts or os.path.basename(args.path).startswith('podcast')
+    catalog = Catalog.load_podcasts(args.path) if is_podcasts else Catalog.load_books(args.path)
+    print(f"{len(catalog)} records in {args.path}")
+    if args.condition:
+        for record in catalog.with_condition(args.condition):
+            print(f"  {record.key}")
+    else:
+        for condition, count in catalog.conditions().items():
+            print(f"  {condition:<24} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Catalog I/O
+
+Streaming readers and writers for catalogs and result files, so scripts can
+process one record at a time instead of loading whole files:
+
+- iter_records() yields the records of either layout:
+    book.json / podcast.json       {"books": [...], "podcasts": [...]}
+    cover_extraction_results.json  [...]
+    *.jsonl / *.ndjson             one JSON record per line
+  The JSON layouts are decoded element by element from a small sliding
+  buffer (json.JSONDecoder.raw_decode), so memory stays flat however long
+  the array is; other top-level keys are skipped the same way.
+- open_writer() returns a writer that appends records one at a time and
+  atomically replaces the target on close (never on error). JSON output is
+  byte-identical to json.dump(..., indent=2, ensure_ascii=False).
+
+    python catalog_io.py convert book.json book.jsonl          # books → JSONL
+    python catalog_io.py convert book.jsonl book.json --key books
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+CHUNK_SIZE = 256 * 1024
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+
+_WHITESPACE = re.compile(r'\s*')
+_DELIMITERS = frozenset(',:]} \t\r\n')
+
+
+def is_jsonl(path):
+    return str(path).lower().endswith(JSONL_SUFFIXES)
+
+
+class _StreamDecoder:
+    """Decodes consecutive JSON values from a text file through a sliding buffer"""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character without consuming it ('' at end of file)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} but found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number cut at the buffer edge ("4." of "4.5") decodes too early,
+                # so only accept a value that is followed by a delimiter
+                if self.eof or (end < len(self.buf) and self.buf[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def array(self):
+        """Yield the elements of the array starting at the current position"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"expected ',' or ']' in array, found {separator or 'end of file'!r}")
+
+
+def _iter_json(f, key):
+    stream = _StreamDecoder(f)
+    first = stream.peek()
+    if first == '[':
+        yield from stream.array()
+        return
+    if first != '{':
+        raise ValueError("expected a JSON array or object")
+    stream.pos += 1
+    if stream.peek() == '}':
+        return
+    while True:
+        name = stream.value()
+        stream.expect(':')
+        if key is None or name == key:
+            if stream.peek() == '[':
+                yield from stream.array()
+            else:
+                yield stream.value()
+        elif stream.peek() == '[':
+            # Skip other arrays element by element too
+            for _ in stream.array():
+                pass
+        else:
+            stream.value()
+        separator = stream.peek()
+        stream.pos += 1
+        if separator == '}':
+            return
+        if separator != ',':
+            raise ValueError(f"expected ',' or '}}' in object, found {separator or 'end of file'!r}")
+
+
+def _iter_jsonl(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_records(path, key=None):
+    """Yield records from a JSONL file, a top-level JSON array, or the array under ``key``"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if is_jsonl(path):
+            yield from _iter_jsonl(f)
+        else:
+            yield from _iter_json(f, key)
+
+
+class _AtomicWriter:
+    """Writes to <path>.tmp and renames it over ``path`` when closed without error"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.tmp_path = f"{self.path}.tmp"
+        self.count = 0
+        self.seconds = 0.0  # time spent serializing and writing, for metrics
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+        self._begin()
+        return self
+
+    def write(self, record):
+        start = time.perf_counter()
+        self._write(record)
+        self.count += 1
+        self.seconds += time.perf_counter() - start
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._file.close()
+            os.remove(self.tmp_path)
+            return False
+        start = time.perf_counter()
+        self._end()
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        self.seconds += time.perf_counter() - start
+        return False
+
+    def _begin(self):
+        pass
+
+    def _end(self):
+        pass
+
+
+class JsonlWriter(_AtomicWriter):
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class JsonArrayWriter(_AtomicWriter):
+    """A JSON array, or ``{key: [...]}`` with key set, formatted like json.dump(indent=2)"""
+
+    def __init__(self, path, key=None):
+        super().__init__(path)
+        self.key = key
+        self.prefix = '    ' if key else '  '
+
+    def _begin(self):
+        if self.key:
+            self._file.write('{\n  ' + json.dumps(self.key, ensure_ascii=False) + ': [')
+        else:
+            self._file.write('[')
+
+    def _write(self, record):
+        text = json.dumps(record, indent=2, ensure_ascii=False).replace('\n', '\n' + self.prefix)
+        self._file.write(('\n' if self.count == 0 else ',\n') + self.prefix + text)
+
+    def _end(self):
+        if self.count:
+            self._file.write('\n' + self.prefix[:-2] + ']')
+        else:
+            self._file.write(']')
+        if self.key:
+            self._file.write('\n}')
+
+
+def open_writer(path, key=None):
+    """Streaming writer for ``path``: JSONL by extension, otherwise a JSON array"""
+    return JsonlWriter(path) if is_jsonl(path) else JsonArrayWriter(path, key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog I/O utilities")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help="convert between the JSON and JSONL layouts")
+    convert.add_argument('source')
+    convert.add_argument('target')
+    convert.add_argument('--key', default='books',
+                         help="array to read from / write under in the JSON layout (default: books)")
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        with open_writer(args.target, key=args.key) as writer:
+            for record in iter_records(args.source, key=args.key):
+                writer.write(record)
+        print(f"Wrote {writer.count} records to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
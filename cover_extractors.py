@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Cover Extractors
+
+Pluggable strategies for pulling the first search result and the cover image
+URL out of Amazon pages without building a full BeautifulSoup tree:
+
+- PrescanExtractor scans the raw response bytes for the landingImage /
+  ebooksImgBlkFront <img> tag and the s-link-style result link.
+- StrainedSoupExtractor parses only the tags the selectors can match
+  (SoupStrainer, lxml when available) and tries the selector that has
+  succeeded most often first.
+- FullSoupExtractor is the original full html.parser tree, kept as the
+  reference the benchmark compares against.
+
+ChainedExtractor runs them cheapest first; it is what the scraper uses.
+"""
+
+import html
+import re
+from collections import Counter
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    FAST_PARSER = 'lxml'
+except ImportError:
+    FAST_PARSER = 'html.parser'
+
+# Selectors tried on product pages, in their default priority order
+COVER_SELECTORS = [
+    '#landingImage',
+    '#ebooksImgBlkFront',
+    '.a-dynamic-image',
+    '[data-a-image-name="landingImage"]',
+    'img[alt*="cover"]',
+    'img[alt*="Cover"]'
+]
+
+_SIZE_PATTERN = re.compile(r'_S[XY]\d+_')
+
+_COVER_IMG_TAGS = [
+    re.compile(rb'<img\b[^>]*?\bid\s*=\s*["\']' + re.escape(tag_id) + rb'["\'][^>]*>', re.IGNORECASE)
+    for tag_id in (b'landingImage', b'ebooksImgBlkFront')
+]
+_RESULT_LINK_TAG = re.compile(
+    rb'<a\b[^>]*?\bclass\s*=\s*["\'](?:[^"\']*\s)?s-link-style(?=[\s"\'])[^"\']*["\'][^>]*>', re.IGNORECASE)
+
+
+def upscale_image_url(src):
+    """Request the 500px rendition of an Amazon image URL"""
+    if '_SX' in src or '_SY' in src:
+        src = _SIZE_PATTERN.sub('_SX500_', src)
+    return src
+
+
+def _attribute(tag, name):
+    """Value of an attribute in a raw tag, or None"""
+    match = re.search(rb'\s' + name + rb'\s*=\s*(["\'])(.*?)\1', tag, re.DOTALL)
+    if match is None:
+        return None
+    return html.unescape(match.group(2).decode('utf-8', 'replace'))
+
+
+class CoverExtractor:
+    """Base class: return a URL (or href) string, or None when unsure"""
+    name = 'base'
+
+    def extract_cover_url(self, content):
+        raise NotImplementedError
+
+    def extract_result_href(self, content):
+        raise NotImplementedError
+
+
+class PrescanExtractor(CoverExtractor):
+    name = 'prescan'
+
+    def extract_cover_url(self, content):
+        for pattern in _COVER_IMG_TAGS:
+            match = pattern.search(content)
+            if match is None:
+                continue
+            tag = match.group(0)
+            src = _attribute(tag, b'src') or _attribute(tag, b'data-src')
+            if src:
+                return upscale_image_url(src)
+        return None
+
+    def extract_result_href(self, content):
+        match = _RESULT_LINK_TAG.search(content)
+        if match is None:
+            return None
+        return _attribute(match.group(0), b'href')
+
+
+class StrainedSoupExtractor(CoverExtractor):
+    name = 'strained'
+
+    def __init__(self, parser=FAST_PARSER):
+        self.parser = parser
+        self.selector_hits = Counter()
+
+    def ordered_selectors(self):
+        """Selectors by past success, ties keeping the default order"""
+        return sorted(COVER_SELECTORS, key=lambda s: -self.selector_hits[s])
+
+    def extract_cover_url(self, content):
+        # Every selector above matches <img> tags on real pages
+        soup = BeautifulSoup(content, self.parser, parse_only=SoupStrainer('img'))
+        return self._select_cover(soup)
+
+    def _select_cover(self, soup):
+        for selector in self.ordered_selectors():
+            img = soup.select_one(selector)
+            if img is None:
+                continue
+            src = img.get('src') or img.get('data-src')
+            if src:
+                self.selector_hits[selector] += 1
+                return upscale_image_url(src)
+        return None
+
+    def extract_result_href(self, content):
+        # Strain on tag names only; class filters on the strainer would have to
+        # match the whole multi-valued class attribute
+        soup = BeautifulSoup(content, self.parser, parse_only=SoupStrainer(['a', 'h2']))
+        link = soup.find('a', class_='s-link-style')
+        if link is None:
+            heading = soup.find('h2', class_='s-result-item')
+            link = heading.find('a') if heading else None
+        return link.get('href') if link else None
+
+
+class FullSoupExtractor(StrainedSoupExtractor):
+    name = 'full'
+
+    def __init__(self):
+        super().__init__(parser='html.parser')
+
+    def extract_cover_url(self, content):
+        return self._select_cover(BeautifulSoup(content, self.parser))
+
+    def extract_result_href(self, content):
+        soup = BeautifulSoup(content, self.parser)
+        book_links = soup.find_all('a', {'class': 's-link-style'})
+        if book_links:
+            return book_links[0].get('href')
+        headings = soup.find_all('h2', {'class': 's-result-item'})
+        link = headings[0].find('a') if headings else None
+        return link.get('href') if link else None
+
+
+class ChainedExtractor(CoverExtractor):
+    """Try each extractor in turn and count which one answered"""
+    name = 'chained'
+
+    def __init__(self, extractors=None):
+        self.extractors = extractors or [PrescanExtractor(), StrainedSoupExtractor()]
+        self.strategy_hits = Counter()
+
+    def _first(self, method, content):
+        for extractor in self.extractors:
+            value = getattr(extractor, method)(content)
+            if value:
+                self.strategy_hits[extractor.name] += 1
+                return value
+        return None
+
+    def extract_cover_url(self, content):
+        return self._first('extract_cover_url', content)
+
+    def extract_result_href(self, content):
+        return self._first('extract_result_href', content)
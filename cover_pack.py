@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Cover Pack
+
+Packs the images in covers/ into one archive file with a compact binary
+index, so a cover is served from a memory map instead of an open, stat and
+full read of its own file:
+
+    covers.pack      header, then every cover at an ALIGNMENT-byte boundary
+    covers.pack.idx  header + one entry per key: offset, length, sha256, key
+
+    python cover_pack.py pack                  # add new/changed covers, drop removed ones
+    python cover_pack.py get "Lost Connections" -o cover.jpg
+    python cover_pack.py verify
+    python cover_pack.py compact               # drop space of replaced and removed covers
+
+    with CoverPack() as pack:
+        data = pack.get('Lost Connections')    # memoryview into the mmap, no copy
+
+Keys are cover file names without .jpg, i.e. sanitize_filename(title), the
+same names BookController looks up in covers/.
+
+Packing only appends. Image bytes are written and flushed first, then index
+entries, then the entry count in the index header; a reader uses only the
+first <count> entries, so an interrupted pack leaves a valid archive. A key
+packed again gets a new entry that replaces the old one (its bytes stay as
+dead space until compact), and images already in the pack under another key
+are stored once. A cover no longer in covers/ (deleted, or renamed by
+rename_covers.py) gets a tombstone entry, an empty entry at offset 0 where no
+cover can start, which removes its key. Readers remap when the archive has
+grown (refresh()).
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+from rename_covers import sanitize_filename
+
+PACK_FILE = 'covers.pack'
+ALIGNMENT = 4096  # page-aligned covers: a read touches the fewest pages
+
+_PACK_HEADER = struct.Struct('<8sI')       # magic, alignment
+_INDEX_HEADER = struct.Struct('<8sI')      # magic, entry count
+_ENTRY = struct.Struct('<QI32sH')          # offset, length, sha256, key length (key bytes follow)
+_PACK_MAGIC = b'MMCPACK1'
+_INDEX_MAGIC = b'MMCIDX01'
+
+
+def index_path(pack_path):
+    return f"{pack_path}.idx"
+
+
+def read_index(pack_path):
+    """{key: (offset, length, sha256 bytes)} from the committed entries, later entries winning
+
+    A tombstone (offset 0, length 0) removes its key.
+    """
+    entries = {}
+    try:
+        with open(index_path(pack_path), 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return entries
+    magic, count = _INDEX_HEADER.unpack_from(data, 0)
+    if magic != _INDEX_MAGIC:
+        raise ValueError(f"{index_path(pack_path)} is not a cover pack index")
+    pos = _INDEX_HEADER.size
+    for _ in range(count):
+        offset, length, digest, key_length = _ENTRY.unpack_from(data, pos)
+        pos += _ENTRY.size
+        key = data[pos:pos + key_length].decode('utf-8')
+        pos += key_length
+        if offset == 0 and length == 0:
+            entries.pop(key, None)
+        else:
+            entries[key] = (offset, length, digest)
+    return entries
+
+
+def cover_keys(covers_dir):
+    """{key: path} of the covers in ``covers_dir``"""
+    if not os.path.isdir(covers_dir):
+        # An empty listing would drop every cover from the pack
+        raise FileNotFoundError(f"covers directory not found: {covers_dir}")
+    return {path.stem: path for path in Path(covers_dir).glob('*.jpg')}
+
+
+class PackWriter:
+    """Appends covers to a pack; nothing is visible to readers until commit()"""
+
+    def __init__(self, pack_path=PACK_FILE, alignment=ALIGNMENT):
+        self.pack_path = pack_path
+        self.entries = read_index(pack_path)
+        self.by_hash = {digest: (offset, length) for offset, length, digest in self.entries.values()}
+        self.pending = []
+        if not os.path.exists(pack_path):
+            with open(pack_path, 'wb') as f:
+                f.write(_PACK_HEADER.pack(_PACK_MAGIC, alignment).ljust(alignment, b'\0'))
+            with open(index_path(pack_path), 'wb') as f:
+                f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, 0))
+            self.entries = {}
+        with open(pack_path, 'rb') as f:
+            magic, self.alignment = _PACK_HEADER.unpack(f.read(_PACK_HEADER.size))
+        if magic != _PACK_MAGIC:
+            raise ValueError(f"{pack_path} is not a cover pack")
+        self._data = open(pack_path, 'r+b')
+        self._data.seek(0, os.SEEK_END)
+
+    def add(self, key, data):
+        """Queue ``data`` under ``key``; return False when the pack already has exactly this"""
+        digest = hashlib.sha256(data).digest()
+        current = self.entries.get(key)
+        if current and current[2] == digest:
+            return False
+        location = self.by_hash.get(digest)
+        if location is None:
+            end = self._data.tell()
+            offset = -(-end // self.alignment) * self.alignment
+            self._data.write(b'\0' * (offset - end))
+            self._data.write(data)
+            location = self.by_hash[digest] = (offset, len(data))
+        self.entries[key] = (*location, digest)
+        self.pending.append((key, *location, digest))
+        return True
+
+    def remove(self, key):
+        """Queue a tombstone for ``key``; return False when the pack does not have it"""
+        if self.entries.pop(key, None) is None:
+            return False
+        self.pending.append((key, 0, 0, bytes(32)))
+        return True
+
+    def commit(self):
+        """Make the queued covers visible: flush the data, then the index entries, then the count"""
+        self._data.flush()
+        os.fsync(self._data.fileno())
+        if not self.pending:
+            return 0
+        with open(index_path(self.pack_path), 'r+b') as f:
+            _, count = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+            f.seek(_INDEX_HEADER.size)
+            # Skip committed entries; anything after them is left over from an interrupted pack
+            for _ in range(count):
+                *_, key_length = _ENTRY.unpack(f.read(_ENTRY.size))
+                f.seek(key_length, os.SEEK_CUR)
+            f.truncate()
+            for key, offset, length, digest in self.pending:
+                encoded = key.encode('utf-8')
+                f.write(_ENTRY.pack(offset, length, digest, len(encoded)) + encoded)
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, count + len(self.pending)))
+            f.flush()
+            os.fsync(f.fileno())
+        added, self.pending = len(self.pending), []
+        return added
+
+    def close(self):
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        self.close()
+
+
+class CoverPack:
+    """Read-only, memory-mapped view of a pack"""
+
+    def __init__(self, pack_path=PACK_FILE):
+        self.pack_path = pack_path
+        self._file = open(pack_path, 'rb')
+        self._map = None
+        self.refresh()
+
+    def refresh(self):
+        """Pick up covers appended since the pack was opened (views from get() must be released first)"""
+        self.entries = read_index(self.pack_path)
+        size = os.fstat(self._file.fileno()).st_size
+        if self._map is None or len(self._map) != size:
+            if self._map is not None:
+                self._view.release()
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+    def get(self, key):
+        """memoryview of the cover for a key or title (None if absent); valid until close()"""
+        entry = self.entries.get(key) or self.entries.get(sanitize_filename(key))
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        return self._view[offset:offset + length]
+
+    def __contains__(self, key):
+        return key in self.entries or sanitize_filename(key) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def keys(self):
+        return self.entries.keys()
+
+    def verify(self):
+        """Keys whose bytes no longer match their stored sha256"""
+        return [key for key, (offset, length, digest) in self.entries.items()
+                if hashlib.sha256(self._view[offset:offset + length]).digest() != digest]
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def pack_directory(covers_dir='covers', pack_path=PACK_FILE, alignment=ALIGNMENT):
+    """Append new or changed covers from ``covers_dir`` and drop the keys of covers no longer
+    there; return (added, unchanged, removed)"""
+    current = cover_keys(covers_dir)
+    added = unchanged = removed = 0
+    with PackWriter(pack_path, alignment) as writer:
+        for key in sorted(current):
+            if writer.add(key, current[key].read_bytes()):
+                added += 1
+            else:
+                unchanged += 1
+        for key in sorted(set(writer.entries) - set(current)):
+            writer.remove(key)
+            removed += 1
+    return added, unchanged, removed
+
+
+def compact(pack_path=PACK_FILE, covers_dir='covers'):
+    """Rewrite the pack with only the current covers (those still in ``covers_dir``, when
+    given); return bytes reclaimed"""
+    current = set(cover_keys(covers_dir)) if covers_dir else None
+    before = os.path.getsize(pack_path)
+    tmp_path = f"{pack_path}.tmp"
+    for path in (tmp_path, index_path(tmp_path)):
+        if os.path.exists(path):
+            os.remove(path)
+    with CoverPack(pack_path) as pack, open(pack_path, 'rb') as f:
+        alignment = _PACK_HEADER.unpack(f.read(_PACK_HEADER.size))[1]
+        with PackWriter(tmp_path, alignment) as writer:
+            for key in sorted(pack.keys()):
+                if current is None or key in current:
+                    writer.add(key, pack.get(key))
+    # The two renames are not atomic together: compact while nothing reads the pack
+    os.replace(tmp_path, pack_path)
+    os.replace(index_path(tmp_path), index_path(pack_path))
+    return before - os.path.getsize(pack_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack covers into a memory-mappable archive")
+    parser.add_argument('--pack', default=PACK_FILE, help="archive path (index: <pack>.idx)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pack = subparsers.add_parser('pack', help="append new or changed covers")
+    pack.add_argument('--covers-dir', default='covers')
+    pack.add_argument('--alignment', type=int, default=ALIGNMENT, help="byte alignment of a new pack")
+    get = subparsers.add_parser('get', help="extract one cover")
+    get.add_argument('key', help="title or cover file name without .jpg")
+    get.add_argument('-o', '--output', help="write here instead of stdout")
+    subparsers.add_parser('list', help="list packed covers")
+    subparsers.add_parser('verify', help="check every cover against its sha256")
+    compact_parser = subparsers.add_parser('compact', help="rewrite without replaced or removed covers")
+    compact_parser.add_argument('--covers-dir', default='covers')
+    args = parser.parse_args()
+
+    if args.command in ('pack', 'compact') and not os.path.isdir(args.covers_dir):
+        print("Error: covers directory not found!")
+        sys.exit(1)
+    if args.command == 'pack':
+        added, unchanged, removed = pack_directory(args.covers_dir, args.pack, args.alignment)
+        print(f"✅ {added} covers added, {unchanged} unchanged, {removed} removed → {args.pack} "
+              f"({os.path.getsize(args.pack) / 1024:.0f} KB)")
+    elif args.command == 'compact':
+        print(f"✅ Reclaimed {compact(args.pack, args.covers_dir) / 1024:.0f} KB")
+    else:
+        with CoverPack(args.pack) as pack:
+            if args.command == 'get':
+                data = pack.get(args.key)
+                if data is None:
+                    print(f"❌ {args.key} not in {args.pack}", file=sys.stderr)
+                    sys.exit(1)
+                if args.output:
+                    with open(args.output, 'wb') as f:
+                        f.write(data)
+                else:
+                    sys.stdout.buffer.write(data)
+                del data
+            elif args.command == 'list':
+                for key, (offset, length, digest) in sorted(pack.entries.items()):
+                    print(f"{offset:>12} {length:>9} {digest.hex()[:12]}  {key}")
+            else:
+                corrupt = pack.verify()
+                print(f"{len(pack) - len(corrupt)}/{len(pack)} covers OK")
+                for key in corrupt:
+                    print(f"❌ {key}")
+                if corrupt:
+                    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Cover Sources
+
+Pluggable places a book's cover can come from, and a resolver that asks them
+concurrently:
+
+- BookUrlSource fetches the page book.json already points at (noor-book.com,
+  4readlib.com, amazon.com, ...) and takes its cover: Amazon's image tags
+  first, then og:image / twitter:image / <link rel="image_src">, then an
+  <img> that calls itself a cover.
+- AmazonSearchSource is the original search → product page → cover path.
+- OpenLibrarySource and GoogleBooksSource query those catalogs' search APIs.
+
+CoverResolver starts the source with the best record first and hedges: when
+it has not answered within its usual (p90) latency, the next source starts
+alongside it, and a source that fails or runs past its latency budget hands
+over immediately. Answers are offered to the caller in arrival order and the
+first cover the caller accepts (i.e. downloads) wins; slower sources are
+abandoned. Per-source attempts, successes and latencies are kept in
+.cover_source_stats.json, so later runs try the source most likely to answer
+quickly first:
+
+    resolver = CoverResolver(sources)
+    resolution = resolver.resolve(book, accept=lambda source, result: download(result.cover_url))
+    resolver.save()
+"""
+
+import contextlib
+import copy
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlencode, urljoin
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+from cover_extractors import FAST_PARSER
+from host_throttle import ThrottledError
+
+STATS_FILE = '.cover_source_stats.json'
+LATENCY_SAMPLES = 100  # per source, most recent first out
+_COUNTERS = ('attempts', 'successes', 'no_cover', 'not_found', 'errors', 'timeouts', 'wins')
+
+# page_url: where the cover was found (None for API sources); cover_url: None when the page had none
+SourceResult = namedtuple('SourceResult', 'page_url cover_url')
+
+_PAGE_TAGS = SoupStrainer(['meta', 'link', 'img'])
+_COVER_HINT = re.compile(r'cover|book-?img|thumbnail', re.IGNORECASE)
+UNKNOWN_AUTHOR = "غير محدد"
+
+
+def page_cover_url(content, page_url, extractor=None):
+    """Cover image URL on a catalog or product page, resolved against the page URL"""
+    src = extractor.extract_cover_url(content) if extractor else None
+    if not src:
+        soup = BeautifulSoup(content, FAST_PARSER, parse_only=_PAGE_TAGS)
+        for attrs, attribute in (({'property': 'og:image'}, 'content'), ({'name': 'twitter:image'}, 'content')):
+            tag = soup.find('meta', attrs=attrs)
+            if tag and tag.get(attribute):
+                src = tag[attribute]
+                break
+        if not src:
+            tag = soup.find('link', rel='image_src')
+            src = tag.get('href') if tag else None
+        if not src:
+            for img in soup.find_all('img'):
+                hint = ' '.join([img.get('id', ''), ' '.join(img.get('class', [])), img.get('alt', '')])
+                if _COVER_HINT.search(hint) and (img.get('src') or img.get('data-src')):
+                    src = img.get('src') or img.get('data-src')
+                    break
+    return urljoin(page_url, src) if src else None
+
+
+class CoverSource:
+    """Base class: resolve(book) returns a SourceResult, or None when the book was not found"""
+    name = 'base'
+    budget = 15.0          # seconds the resolver waits for this source
+    prior_latency = 2.0    # assumed latency until the stats know better
+
+    def applies(self, book):
+        return True
+
+    def resolve(self, book):
+        raise NotImplementedError
+
+
+class BookUrlSource(CoverSource):
+    name = 'book_url'
+    budget = 10.0
+    prior_latency = 1.0
+
+    def __init__(self, fetch, extractor=None, rebase=None):
+        self.fetch = fetch
+        self.extractor = extractor
+        self.rebase = rebase or (lambda url: url)
+
+    def applies(self, book):
+        return book.get('url', '').startswith(('http://', 'https://'))
+
+    def resolve(self, book):
+        page_url = self.rebase(book['url'])
+        response = self.fetch(page_url)
+        response.raise_for_status()
+        return SourceResult(page_url, page_cover_url(response.content, page_url, self.extractor))
+
+
+class AmazonSearchSource(CoverSource):
+    name = 'amazon_search'
+    budget = 20.0
+    prior_latency = 3.0
+
+    def __init__(self, search, extract):
+        self.search = search
+        self.extract = extract
+
+    def resolve(self, book):
+        page_url = self.search(book['title'], book.get('author'))
+        if not page_url:
+            return None
+        return SourceResult(page_url, self.extract(page_url))
+
+
+class OpenLibrarySource(CoverSource):
+    name = 'openlibrary'
+    budget = 10.0
+    prior_latency = 1.5
+
+    def __init__(self, fetch, base_url='https://openlibrary.org', covers_url='https://covers.openlibrary.org'):
+        self.fetch = fetch
+        self.base_url = base_url.rstrip('/')
+        self.covers_url = covers_url.rstrip('/')
+
+    def resolve(self, book):
+        params = {'title': book['title'], 'fields': 'title,cover_i', 'limit': 5}
+        if book.get('author') and book['author'] != UNKNOWN_AUTHOR:
+            params['author'] = book['author']
+        response = self.fetch(f"{self.base_url}/search.json?{urlencode(params)}")
+        response.raise_for_status()
+        docs = response.json().get('docs', [])
+        if not docs:
+            return None
+        cover_id = next((doc['cover_i'] for doc in docs if doc.get('cover_i')), None)
+        return SourceResult(None, f"{self.covers_url}/b/id/{cover_id}-L.jpg" if cover_id else None)
+
+
+class GoogleBooksSource(CoverSource):
+    name = 'googlebooks'
+    budget = 10.0
+    prior_latency = 1.5
+
+    def __init__(self, fetch, base_url='https://www.googleapis.com'):
+        self.fetch = fetch
+        self.base_url = base_url.rstrip('/')
+
+    def resolve(self, book):
+        query = f"intitle:{book['title']}"
+        if book.get('author') and book['author'] != UNKNOWN_AUTHOR:
+            query += f" inauthor:{book['author']}"
+        response = self.fetch(f"{self.base_url}/books/v1/volumes?{urlencode({'q': query, 'maxResults': 5})}")
+        response.raise_for_status()
+        items = response.json().get('items', [])
+        if not items:
+            return None
+        for item in items:
+            links = item.get('volumeInfo', {}).get('imageLinks', {})
+            src = links.get('large') or links.get('medium') or links.get('thumbnail')
+            if src:
+                # The API hands out http:// links to its own image server
+                if src.startswith('http://books.google.'):
+                    src = 'https://' + src[len('http://'):]
+                return SourceResult(None, src)
+        return SourceResult(None, None)
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on ``path`` across processes (not available on Windows)"""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SourceStats:
+    """Per-source outcome counts and recent latencies, persisted between runs
+
+    Several processes may share the file (work_queue.py workers), so save()
+    adds what this process recorded since its last save to what is on disk
+    instead of overwriting it.
+    """
+
+    def __init__(self, path=STATS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.sources = self._read()
+        # The counts as last read from or written to the file, and latencies recorded since
+        self._saved = copy.deepcopy(self.sources)
+        self._new_latencies = {}
+
+    def _read(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('sources', {})
+        return {}
+
+    def _entry(self, name):
+        return self.sources.setdefault(name, {**dict.fromkeys(_COUNTERS, 0), 'latencies': []})
+
+    def record(self, name, outcome, latency=None):
+        """outcome: 'success', 'no_cover', 'not_found', 'error', 'timeout', or 'late' (after a timeout)"""
+        with self._lock:
+            entry = self._entry(name)
+            if outcome == 'timeout':
+                # Counted when the resolver gives up; the late answer is not counted again
+                entry['timeouts'] += 1
+                entry['attempts'] += 1
+                return
+            if outcome != 'late':
+                entry['attempts'] += 1
+            key = {'success': 'successes', 'error': 'errors'}.get(outcome, outcome)
+            if key in entry:
+                entry[key] += 1
+            if outcome == 'success' and latency is not None:
+                entry['latencies'] = (entry['latencies'] + [round(latency, 4)])[-LATENCY_SAMPLES:]
+                self._new_latencies.setdefault(name, []).append(round(latency, 4))
+
+    def win(self, name):
+        with self._lock:
+            self._entry(name)['wins'] += 1
+
+    def latency(self, name, quantile, default):
+        with self._lock:
+            samples = sorted(self.sources.get(name, {}).get('latencies', []))
+        if len(samples) < 5:
+            return default
+        return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+
+    def score(self, source):
+        """Expected covers per second of waiting: smoothed success rate over median latency"""
+        with self._lock:
+            entry = self.sources.get(source.name, {})
+            successes, attempts = entry.get('successes', 0), entry.get('attempts', 0)
+        return (successes + 1) / (attempts + 2) / max(self.latency(source.name, 0.5, source.prior_latency), 0.01)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock, _file_lock(f"{self.path}.lock"):
+            merged = self._read()
+            for name, entry in self.sources.items():
+                saved = self._saved.get(name, {})
+                target = merged.setdefault(name, {**dict.fromkeys(_COUNTERS, 0), 'latencies': []})
+                for key in _COUNTERS:
+                    target[key] = target.get(key, 0) + entry.get(key, 0) - saved.get(key, 0)
+                target['latencies'] = (target.get('latencies', [])
+                                       + self._new_latencies.pop(name, []))[-LATENCY_SAMPLES:]
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'sources': merged}, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self.sources = merged
+            self._saved = copy.deepcopy(merged)
+
+
+class CoverResolver:
+    def __init__(self, sources, stats_path=STATS_FILE, hedge=True, hedge_quantile=0.9, budgets=None,
+                 metrics=None, max_workers=64):
+        self.sources = list(sources)
+        self.stats = SourceStats(stats_path)
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.budgets = budgets or {}
+        self.metrics = metrics
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cover-source')
+
+    def budget(self, source):
+        return self.budgets.get(source.name, source.budget)
+
+    def ordered(self, book):
+        """Sources that apply to ``book``, best record first (ties keep the configured order)"""
+        return sorted((source for source in self.sources if source.applies(book)),
+                      key=lambda source: -self.stats.score(source))
+
+    def hedge_delay(self, source):
+        if not self.hedge:
+            return self.budget(source)
+        return min(self.budget(source), self.stats.latency(source.name, self.hedge_quantile, source.prior_latency))
+
+    def _run(self, source, book, abandoned):
+        started = time.monotonic()
+        result, outcome = None, 'not_found'
+        try:
+            result = source.resolve(book)
+            if result is not None:
+                outcome = 'success' if result.cover_url else 'no_cover'
+        except ThrottledError:
+            outcome = 'throttled'
+        except requests.HTTPError as e:
+            # A 4xx is the site's answer (gone, no such book); 429 and 5xx arrive as ThrottledError
+            status = e.response.status_code if e.response is not None else None
+            outcome = 'not_found' if status and 400 <= status < 500 and status != 429 else 'throttled'
+        except Exception:
+            outcome = 'error'
+        elapsed = time.monotonic() - started
+        if source.name in abandoned:
+            # Timed out already; keep its latency only, so the budget can be judged later
+            self.stats.record(source.name, 'late', elapsed if outcome == 'success' else None)
+        else:
+            self.stats.record(source.name, 'error' if outcome == 'throttled' else outcome, elapsed)
+        if self.metrics:
+            self.metrics.observe('cover_source_seconds', elapsed, source=source.name)
+            self.metrics.increment('cover_source_results_total', source=source.name, outcome=outcome)
+        return result, outcome
+
+    def resolve(self, book, accept):
+        """Query the sources with hedging until ``accept(source_name, result)`` returns a truthy value
+
+        Returns a dict: source, page_url, cover_url and accepted (accept()'s
+        value) for the winner, or None values when nothing was accepted;
+        page_url then falls back to a page that had no usable cover, and
+        'outcome' is 'success', 'rejected' (covers found, none accepted),
+        'no_cover', 'throttled', 'error' (the sources that answered all failed) or 'not_found'.
+        """
+        queue = self.ordered(book)
+        running = {}
+        abandoned = set()
+        outcomes = set()
+        fallback_page = None
+        next_start = time.monotonic()
+        while queue or running:
+            now = time.monotonic()
+            if queue and (not running or now >= next_start):
+                source = queue.pop(0)
+                future = self._pool.submit(self._run, source, book, abandoned)
+                running[future] = (source, now + self.budget(source))
+                next_start = now + self.hedge_delay(source)
+                continue
+            deadline = min(limit for _, limit in running.values())
+            if queue:
+                deadline = min(deadline, next_start)
+            done, _ = wait(list(running), timeout=max(0.0, deadline - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                source, _ = running.pop(future)
+                result, outcome = future.result()
+                outcomes.add(outcome)
+                if result and result.page_url and not fallback_page:
+                    fallback_page = result.page_url
+                if result and result.cover_url:
+                    accepted = accept(source.name, result)
+                    if accepted:
+                        self.stats.win(source.name)
+                        return {'source': source.name, 'page_url': result.page_url,
+                                'cover_url': result.cover_url, 'accepted': accepted, 'outcome': 'success'}
+                # This one is out: the next source need not wait for the hedge delay
+                next_start = time.monotonic()
+            now = time.monotonic()
+            for future, (source, limit) in list(running.items()):
+                if now >= limit:
+                    # Over budget: stop waiting (the thread finishes on its own)
+                    del running[future]
+                    abandoned.add(source.name)
+                    self.stats.record(source.name, 'timeout')
+                    outcomes.add('timeout')
+                    next_start = now
+        if 'success' in outcomes:
+            outcome = 'rejected'
+        elif 'no_cover' in outcomes:
+            outcome = 'no_cover'
+        elif outcomes & {'throttled', 'timeout'}:
+            # Some source was refused or too slow to answer: not a verdict on the book
+            outcome = 'throttled'
+        elif 'error' in outcomes and 'not_found' not in outcomes:
+            # Every source failed on its answer (an HTML error page instead of JSON, ...): retried later
+            outcome = 'error'
+        else:
+            outcome = 'not_found'
+        return {'source': None, 'page_url': fallback_page, 'cover_url': None, 'accepted': None, 'outcome': outcome}
+
+    def summary(self):
+        """(name, attempts, successes, wins, timeouts, p50 latency) per known source"""
+        rows = []
+        for source in self.sources:
+            entry = self.stats.sources.get(source.name, {})
+            rows.append((source.name, entry.get('attempts', 0), entry.get('successes', 0), entry.get('wins', 0),
+                         entry.get('timeouts', 0), self.stats.latency(source.name, 0.5, None)))
+        return rows
+
+    def save(self):
+        self.stats.save()
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
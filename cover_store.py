@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Cover Store
+
+Content-addressed store for the cover images in covers/. Every distinct image
+is kept once under cover_store/blobs/<sha256[:2]>/<sha256>.jpg and described in
+cover_store/manifest.json together with two 64-bit perceptual hashes (aHash and
+dHash, computed with NumPy). The manifest maps book titles to blobs and flags:
+
+- near duplicates: blobs whose dHash is within a small Hamming distance of
+  another blob (e.g. different editions of the same cover);
+- placeholders: tiny or flat images and "no image" covers Amazon serves for
+  many unrelated titles.
+
+Hashing is batched across a process pool, and a rebuild only hashes files
+whose size or mtime changed. Near-duplicate search splits each hash into
+bands (pigeonhole principle), so only hashes sharing a band are compared.
+
+    python cover_store.py build
+    python cover_store.py query covers/some-cover.jpg
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from rename_covers import sanitize_filename
+
+STORE_DIR = 'cover_store'
+MANIFEST_NAME = 'manifest.json'
+
+NEAR_DUPLICATE_DISTANCE = 4      # max dHash Hamming distance for near duplicates
+PLACEHOLDER_MIN_SIDE = 40        # covers smaller than this are not real covers
+PLACEHOLDER_MAX_STDDEV = 6.0     # almost uniform images (blank/grey placeholders)
+PLACEHOLDER_CLUSTER_TITLES = 5   # one image used by this many titles is a placeholder
+
+# Popcount of every byte value, for vectorized Hamming distances
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def perceptual_hashes(image):
+    """Return (ahash, dhash, stddev) of a PIL image as Python ints"""
+    gray = image.convert('L')
+    small = np.asarray(gray.resize((8, 8), Image.Resampling.BILINEAR), dtype=np.float32)
+    wide = np.asarray(gray.resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    ahash_bits = small > small.mean()
+    dhash_bits = wide[:, 1:] > wide[:, :-1]
+    ahash = int.from_bytes(np.packbits(ahash_bits).tobytes(), 'big')
+    dhash = int.from_bytes(np.packbits(dhash_bits).tobytes(), 'big')
+    return ahash, dhash, float(small.std())
+
+
+def hash_file(path):
+    """SHA-256 plus perceptual hashes for one cover file"""
+    data = Path(path).read_bytes()
+    record = {
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'size': len(data),
+    }
+    try:
+        with Image.open(path) as image:
+            image.load()
+            record['width'], record['height'] = image.size
+            ahash, dhash, stddev = perceptual_hashes(image)
+        record.update(ahash=f"{ahash:016x}", dhash=f"{dhash:016x}", stddev=round(stddev, 2))
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+def hash_batch(paths):
+    """Worker entry point: hash a batch of files"""
+    return [(path, hash_file(path)) for path in paths]
+
+
+def hamming_distances(hashes, value):
+    """Hamming distance from value to every uint64 in hashes"""
+    xor = np.bitwise_xor(hashes, np.uint64(value))
+    return _POPCOUNT[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def near_duplicate_pairs(hashes, max_distance=NEAR_DUPLICATE_DISTANCE):
+    """All (i, j, distance) with i < j and Hamming distance <= max_distance.
+
+    The 64 bits are split into max_distance + 1 bands; two hashes within
+    max_distance must agree exactly on at least one band, so only hashes that
+    share a band value are compared.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    bands = max_distance + 1
+    edges = np.linspace(0, 64, bands + 1).astype(int)
+    pairs = {}
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        mask = np.uint64((1 << int(hi - lo)) - 1)
+        keys = (hashes >> np.uint64(lo)) & mask
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # Hashes sharing a band value are adjacent after sorting; compare every
+        # element with the ones `offset` places further on while any still match
+        offset = 1
+        while offset < len(order):
+            same = sorted_keys[:-offset] == sorted_keys[offset:]
+            if not same.any():
+                break
+            first, second = order[:-offset][same], order[offset:][same]
+            xor = np.bitwise_xor(hashes[first], hashes[second])
+            distances = _POPCOUNT[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+            close = distances <= max_distance
+            for i, j, distance in zip(first[close], second[close], distances[close]):
+                pairs[(int(min(i, j)), int(max(i, j)))] = int(distance)
+            offset += 1
+    return [(i, j, d) for (i, j), d in sorted(pairs.items())]
+
+
+class CoverStore:
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.blobs_dir = self.store_dir / 'blobs'
+        self.manifest_path = self.store_dir / MANIFEST_NAME
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'version': 1, 'files': {}, 'blobs': {}, 'titles': {}}
+
+    def blob_path(self, sha256):
+        return self.blobs_dir / sha256[:2] / f"{sha256}.jpg"
+
+    def build(self, covers_dir='covers', json_file='book.json', workers=None, batch_size=256):
+        """Index covers_dir into the store, hashing only new or changed files"""
+        covers_dir = Path(covers_dir)
+        old_files = self.manifest.get('files', {})
+        files = {}
+        to_hash = []
+        with os.scandir(covers_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith('.jpg'):
+                    continue
+                stat = entry.stat()
+                known = old_files.get(entry.name)
+                if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                    files[entry.name] = known
+                else:
+                    files[entry.name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+                    to_hash.append(entry.path)
+
+        blobs = {sha: blob for sha, blob in self.manifest.get('blobs', {}).items()}
+        print(f"Found {len(files)} covers, {len(to_hash)} new or changed")
+
+        batches = [to_hash[i:i + batch_size] for i in range(0, len(to_hash), batch_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for batch in executor.map(hash_batch, batches):
+                for path, record in batch:
+                    name = Path(path).name
+                    sha = record.pop('sha256')
+                    files[name]['sha256'] = sha
+                    blobs.setdefault(sha, {}).update(record)
+                    self._store_blob(path, sha)
+
+        # Drop blobs no file refers to any more
+        live = {info['sha256'] for info in files.values()}
+        for sha in set(blobs) - live:
+            del blobs[sha]
+            try:
+                self.blob_path(sha).unlink()
+            except FileNotFoundError:
+                pass
+
+        self.manifest = {
+            'version': 1,
+            'files': files,
+            'blobs': blobs,
+            'titles': self._map_titles(files, json_file),
+        }
+        self._flag_blobs()
+        self._save_manifest()
+        return self.manifest
+
+    def _store_blob(self, path, sha256):
+        target = self.blob_path(sha256)
+        if target.exists():
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, target)
+        except OSError:
+            shutil.copy2(path, target)
+
+    def _map_titles(self, files, json_file):
+        """Map book.json titles (and any unmatched cover names) to blobs"""
+        titles = {}
+        claimed = set()
+        if json_file and os.path.exists(json_file):
+            with open(json_file, 'r', encoding='utf-8') as f:
+                books = json.load(f).get('books', [])
+            for book in books:
+                filename = f"{sanitize_filename(book['title'])}.jpg"
+                if filename in files:
+                    titles[book['title']] = files[filename]['sha256']
+                    claimed.add(filename)
+        for filename, info in files.items():
+            if filename not in claimed:
+                titles.setdefault(Path(filename).stem, info['sha256'])
+        return titles
+
+    def _flag_blobs(self):
+        blobs = self.manifest['blobs']
+        shas = [sha for sha, blob in blobs.items() if 'dhash' in blob]
+        dhashes = np.array([int(blobs[sha]['dhash'], 16) for sha in shas], dtype=np.uint64)
+
+        # Union-find over near-duplicate pairs
+        parent = list(range(len(shas)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j, _ in near_duplicate_pairs(dhashes):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        clusters = {}
+        for i in range(len(shas)):
+            clusters.setdefault(find(i), []).append(i)
+
+        titles_per_blob = {}
+        for title, sha in self.manifest['titles'].items():
+            titles_per_blob[sha] = titles_per_blob.get(sha, 0) + 1
+
+        for blob in blobs.values():
+            blob['near_duplicate_of'] = None
+            blob['placeholder'] = 'error' in blob or (
+                min(blob['width'], blob['height']) < PLACEHOLDER_MIN_SIDE
+                or blob['stddev'] <= PLACEHOLDER_MAX_STDDEV)
+
+        for members in clusters.values():
+            # Keep the largest image of a cluster as its canonical blob
+            members.sort(key=lambda i: -blobs[shas[i]]['width'] * blobs[shas[i]]['height'])
+            canonical = shas[members[0]]
+            cluster_titles = sum(titles_per_blob.get(shas[i], 0) for i in members)
+            for i in members:
+                blob = blobs[shas[i]]
+                if i != members[0]:
+                    blob['near_duplicate_of'] = canonical
+                if cluster_titles >= PLACEHOLDER_CLUSTER_TITLES:
+                    blob['placeholder'] = True
+
+    def _save_manifest(self):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def blob_for_title(self, title):
+        """Blob path for a book title, or None"""
+        sha = self.manifest['titles'].get(title)
+        return self.blob_path(sha) if sha else None
+
+    def find_similar(self, path, max_distance=NEAR_DUPLICATE_DISTANCE):
+        """Blobs whose dHash is within max_distance of the image at path"""
+        with Image.open(path) as image:
+            _, dhash, _ = perceptual_hashes(image)
+        blobs = self.manifest['blobs']
+        shas = [sha for sha, blob in blobs.items() if 'dhash' in blob]
+        if not shas:
+            return []
+        hashes = np.array([int(blobs[sha]['dhash'], 16) for sha in shas], dtype=np.uint64)
+        distances = hamming_distances(hashes, dhash)
+        matches = np.flatnonzero(distances <= max_distance)
+        return sorted(((shas[i], int(distances[i])) for i in matches), key=lambda m: m[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed cover store with perceptual hashes")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="index covers/ into the store")
+    build.add_argument('--covers', default='covers')
+    build.add_argument('--books', default='book.json')
+    build.add_argument('--workers', type=int, default=None)
+    query = subparsers.add_parser('query', help="find stored covers similar to an image")
+    query.add_argument('image')
+    query.add_argument('--max-distance', type=int, default=NEAR_DUPLICATE_DISTANCE)
+    for sub in (build, query):
+        sub.add_argument('--store', default=STORE_DIR)
+    args = parser.parse_args()
+
+    store = CoverStore(args.store)
+    if args.command == 'build':
+        manifest = store.build(args.covers, args.books, workers=args.workers)
+        blobs = manifest['blobs'].values()
+        print(f"\n=== COVER STORE ===")
+        print(f"Covers indexed: {len(manifest['files'])}")
+        print(f"Distinct images: {len(manifest['blobs'])}")
+        print(f"Near duplicates: {sum(1 for b in blobs if b['near_duplicate_of'])}")
+        print(f"Placeholders: {sum(1 for b in blobs if b['placeholder'])}")
+        print(f"Manifest saved to: {store.manifest_path}")
+    else:
+        matches = store.find_similar(args.image, args.max_distance)
+        titles = {}
+        for title, sha in store.manifest['titles'].items():
+            titles.setdefault(sha, []).append(title)
+        for sha, distance in matches:
+            print(f"{distance:>2}  {sha[:12]}  {', '.join(titles.get(sha, []))}")
+        if not matches:
+            print("No similar covers found")
+
+
+if __name__ == "__main__":
+    main()
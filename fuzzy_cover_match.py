@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Fuzzy Cover Matcher
+
+Matches books to cover images whose names differ from the sanitized title by
+punctuation, a dropped subtitle after ':', the 100-character truncation in
+sanitize_filename, or Arabic spelling variants.
+
+Cover names are indexed by character trigrams of their normalized form
+(rename_covers.normalize_title, punctuation removed). Candidates for a query
+come from the postings of its rarer trigrams only: a trigram found in more than
+COMMON_TRIGRAM_SHARE of the covers (' th', 'the', ' ال') would make nearly
+every cover a candidate, and a cover sharing nothing but such trigrams with a
+title cannot score well anyway. The shared-trigram counts of the candidates
+come from np.unique over those postings, plus a binary search of the common
+trigrams' (sorted) postings for each candidate, and the Dice coefficient over
+the counts is the confidence score. Work per book grows with its candidates,
+never with the number of covers.
+
+Each book is queried with its full title, its main title (before ':') and
+title + author, and keeps the best score per cover. Assignments are then made
+one-to-one, highest confidence first.
+
+    python fuzzy_cover_match.py                  # report for books without a cover
+    python fuzzy_cover_match.py --min-score 0.7
+"""
+
+import argparse
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+from rename_covers import CoverIndex, normalize_title, sanitize_filename
+
+DEFAULT_MIN_SCORE = 0.6
+COMMON_TRIGRAM_SHARE = 0.05   # trigrams in more covers than this do not nominate candidates
+MIN_COMMON_POSTINGS = 50      # ... unless the posting list is this short anyway (small corpora)
+UNKNOWN_AUTHOR = "غير محدد"
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def match_key(text):
+    """Normalized, punctuation-free form used for trigram matching"""
+    return ' '.join(_NON_WORD.sub(' ', normalize_title(text)).split())
+
+
+def trigrams(text):
+    padded = f"  {match_key(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Character-trigram inverted index over a list of strings"""
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+        postings = {}
+        sizes = np.zeros(len(self.texts), dtype=np.int32)
+        for doc_id, text in enumerate(self.texts):
+            grams = trigrams(text)
+            sizes[doc_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc_id)
+        self.sizes = sizes
+        # Doc ids are appended in order, so every posting list is sorted
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.max_postings = max(MIN_COMMON_POSTINGS, int(len(self.texts) * COMMON_TRIGRAM_SHARE))
+
+    def scores(self, query):
+        """(doc_ids, dice scores) for the documents sharing a trigram with query"""
+        grams = trigrams(query)
+        lists = sorted((self.postings[gram] for gram in grams if gram in self.postings), key=len)
+        if not lists:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        # Nominate by the rare trigrams; a query made only of common ones falls back to its rarest
+        split = sum(1 for ids in lists if len(ids) <= self.max_postings) or 1
+        doc_ids, shared = np.unique(np.concatenate(lists[:split]), return_counts=True)
+        for ids in lists[split:]:
+            found = np.searchsorted(ids, doc_ids)
+            shared += ids[np.minimum(found, len(ids) - 1)] == doc_ids
+        dice = 2.0 * shared / (len(grams) + self.sizes[doc_ids])
+        return doc_ids, dice.astype(np.float32)
+
+    def search(self, query, limit=5):
+        """Best matches for query as [(doc_id, score)], highest first"""
+        doc_ids, dice = self.scores(query)
+        if len(doc_ids) > limit:
+            top = np.argpartition(-dice, limit)[:limit]
+            doc_ids, dice = doc_ids[top], dice[top]
+        order = np.argsort(-dice, kind='stable')
+        return [(int(doc_ids[i]), float(dice[i])) for i in order]
+
+
+def book_queries(book):
+    """Query strings for a book: full title, main title, title + author"""
+    title = book['title']
+    queries = [title]
+    for separator in (':', ' - '):
+        if separator in title:
+            queries.append(title.split(separator, 1)[0])
+    author = book.get('author')
+    if author and author != UNKNOWN_AUTHOR:
+        queries.append(f"{title} {author}")
+    return queries
+
+
+class FuzzyCoverMatcher:
+    def __init__(self, cover_filenames):
+        self.filenames = sorted(cover_filenames)
+        self.index = TrigramIndex(Path(name).stem for name in self.filenames)
+
+    def rank(self, book, limit=5):
+        """Ranked [(filename, confidence)] for one book"""
+        results = [self.index.scores(query) for query in book_queries(book)]
+        if len(results) == 1:
+            doc_ids, best = results[0]
+        else:
+            # Best score per cover over the queries: group equal ids, take each group's maximum
+            doc_ids = np.concatenate([ids for ids, _ in results])
+            order = np.argsort(doc_ids, kind='stable')
+            doc_ids = doc_ids[order]
+            dice = np.concatenate([scores for _, scores in results])[order]
+            if not len(doc_ids):
+                return []
+            starts = np.flatnonzero(np.r_[True, doc_ids[1:] != doc_ids[:-1]])
+            doc_ids, best = doc_ids[starts], np.maximum.reduceat(dice, starts)
+        if len(doc_ids) > limit:
+            top = np.argpartition(-best, limit)[:limit]
+            doc_ids, best = doc_ids[top], best[top]
+        ranked = np.lexsort((doc_ids, -best))
+        return [(self.filenames[doc_ids[i]], round(float(best[i]), 3)) for i in ranked]
+
+    def assign(self, books, min_score=DEFAULT_MIN_SCORE):
+        """One-to-one {title: (filename, confidence)}, highest confidence first"""
+        candidates = []
+        for book in books:
+            for filename, score in self.rank(book):
+                if score >= min_score:
+                    candidates.append((score, book['title'], filename))
+        candidates.sort(key=lambda c: -c[0])
+        assignments = {}
+        taken = set()
+        for score, title, filename in candidates:
+            if title in assignments or filename in taken:
+                continue
+            assignments[title] = (filename, score)
+            taken.add(filename)
+        return assignments
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzzy-match books without covers to cover images")
+    parser.add_argument('--books', default='book.json')
+    parser.add_argument('--covers', default='covers')
+    parser.add_argument('--min-score', type=float, default=DEFAULT_MIN_SCORE)
+    parser.add_argument('--output', default='fuzzy_cover_matches.json')
+    args = parser.parse_args()
+
+    with open(args.books, 'r', encoding='utf-8') as f:
+        books = json.load(f).get('books', [])
+    if not os.path.isdir(args.covers):
+        print("Error: covers directory not found!")
+        return
+
+    cover_index = CoverIndex(args.covers)
+    unmatched_books = [book for book in books if cover_index.find(book['title']) is None]
+    claimed = {cover_index.find(book['title']) for book in books} - {None}
+    orphan_covers = sorted(cover_index.filenames - claimed)
+    print(f"{len(unmatched_books)} books without a cover, {len(orphan_covers)} unclaimed cover images")
+
+    matcher = FuzzyCoverMatcher(orphan_covers)
+    assignments = matcher.assign(unmatched_books, args.min_score)
+
+    report = []
+    for book in unmatched_books:
+        assigned = assignments.get(book['title'])
+        report.append({
+            'title': book['title'],
+            'author': book.get('author', ''),
+            'expected_filename': f"{sanitize_filename(book['title'])}.jpg",
+            'match': assigned[0] if assigned else None,
+            'confidence': assigned[1] if assigned else None,
+            'candidates': [{'filename': name, 'confidence': score}
+                           for name, score in matcher.rank(book)],
+        })
+        if assigned:
+            print(f"  ✅ {book['title']} → {assigned[0]} ({assigned[1]:.2f})")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"\n=== FUZZY MATCH SUMMARY ===")
+    print(f"Books without a cover: {len(unmatched_books)}")
+    print(f"Matched with confidence >= {args.min_score}: {len(assignments)}")
+    print(f"Report saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Cover Variant Generator
+
+This script builds resized and recompressed variants of every image in covers/
+(list thumbnails, detail images and WebP versions of both) so clients can fetch
+small images instead of the full originals:
+
+    cover_variants/<variant>/<title>.<ext>
+    cover_variants/manifest.json
+
+Work is spread over a process pool, and the run is incremental: a cover is only
+reprocessed when its size/mtime changed and its content hash differs from the
+one recorded in the manifest, or when one of its variants is missing. A cover
+that cannot be decoded (e.g. an HTML page saved as .jpg) is recorded with its
+error and has no variants; it is tried again only once the file changes.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+VARIANTS_DIR = 'cover_variants'
+MANIFEST_NAME = 'manifest.json'
+
+# name: (max width, format, quality, extension)
+VARIANTS = {
+    'list': (200, 'JPEG', 80, '.jpg'),
+    'list_webp': (200, 'WEBP', 75, '.webp'),
+    'detail': (600, 'JPEG', 85, '.jpg'),
+    'detail_webp': (600, 'WEBP', 80, '.webp'),
+}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_variants(source, output_dir):
+    """Worker entry point: write every variant of one cover, return its manifest entry"""
+    source = Path(source)
+    output_dir = Path(output_dir)
+    entry = {'sha256': file_sha256(source), 'variants': {}}
+    try:
+        with Image.open(source) as image:
+            image.load()
+            image = image.convert('RGB')
+            for name, (max_width, image_format, quality, extension) in VARIANTS.items():
+                variant = image
+                if image.width > max_width:
+                    # Never upscale; keep the aspect ratio
+                    height = round(image.height * max_width / image.width)
+                    variant = image.resize((max_width, height), Image.Resampling.LANCZOS)
+                target = output_dir / name / f"{source.stem}{extension}"
+                target.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = target.with_name(f".{target.name}.tmp")
+                options = {'quality': quality}
+                if image_format == 'JPEG':
+                    options.update(optimize=True, progressive=True)
+                else:
+                    options.update(method=4)
+                variant.save(tmp_path, image_format, **options)
+                if (variant is image and image_format == 'JPEG'
+                        and tmp_path.stat().st_size >= source.stat().st_size):
+                    # Re-encoding at the same size only made it bigger
+                    shutil.copyfile(source, tmp_path)
+                os.replace(tmp_path, target)
+                entry['variants'][name] = {
+                    'path': str(target),
+                    'width': variant.width,
+                    'height': variant.height,
+                    'bytes': target.stat().st_size,
+                }
+    except Exception as e:
+        entry['error'] = str(e)
+    return source.name, entry
+
+
+def load_manifest(output_dir):
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(output_dir, manifest):
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def variant_paths(output_dir, filename):
+    """Every path a cover's variants can have, whether or not they exist"""
+    stem = Path(filename).stem
+    return [Path(output_dir) / name / f"{stem}{extension}" for name, (*_, extension) in VARIANTS.items()]
+
+
+def remove_variants(output_dir, filename):
+    for path in variant_paths(output_dir, filename):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def variants_present(entry):
+    return (set(entry.get('variants', {})) == set(VARIANTS)
+            and all(Path(v['path']).exists() for v in entry['variants'].values()))
+
+
+def generate_cover_variants(covers_dir='covers', output_dir=VARIANTS_DIR, workers=None, force=False):
+    """Generate missing or outdated variants and update the manifest"""
+    covers_dir = Path(covers_dir)
+    if not covers_dir.exists():
+        print("Error: covers directory not found!")
+        return None
+
+    manifest = {} if force else load_manifest(output_dir)
+    sources = {}
+    with os.scandir(covers_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith('.jpg'):
+                stat = entry.stat()
+                sources[entry.name] = (entry.path, stat.st_size, stat.st_mtime_ns)
+
+    pending = []
+    for name, (path, size, mtime_ns) in sources.items():
+        entry = manifest.get(name)
+        # A cover that failed is not retried until it changes
+        if entry and ('error' in entry or variants_present(entry)):
+            unchanged = entry['size'] == size and entry['mtime_ns'] == mtime_ns
+            # Touched but unchanged content (e.g. copied back from a backup)
+            if not unchanged and entry['sha256'] == file_sha256(path):
+                entry['size'], entry['mtime_ns'] = size, mtime_ns
+                unchanged = True
+            if unchanged:
+                if 'error' in entry:
+                    remove_variants(output_dir, name)
+                continue
+        pending.append(path)
+
+    # Forget (and delete the variants of) covers that no longer exist
+    removed = [name for name in manifest if name not in sources]
+    for name in removed:
+        for variant in manifest.pop(name).get('variants', {}).values():
+            try:
+                os.remove(variant['path'])
+            except FileNotFoundError:
+                pass
+
+    print(f"Found {len(sources)} covers: {len(pending)} to process, "
+          f"{len(sources) - len(pending)} up to date, {len(removed)} removed")
+
+    errors = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(render_variants, pending, [output_dir] * len(pending), chunksize=16)
+            for name, entry in results:
+                _, size, mtime_ns = sources[name]
+                entry['size'], entry['mtime_ns'] = size, mtime_ns
+                manifest[name] = entry
+                if 'error' in entry:
+                    errors += 1
+                    print(f"  ❌ {name}: {entry['error']}")
+                    # Variants from before it broke, or written before the error, would be served as current
+                    remove_variants(output_dir, name)
+                    entry['variants'] = {}
+
+    save_manifest(output_dir, manifest)
+
+    # Summary
+    original_bytes = sum(entry['size'] for entry in manifest.values())
+    print(f"\n=== VARIANT SUMMARY ===")
+    print(f"Covers processed: {len(pending)} ({errors} errors)")
+    print(f"Originals: {original_bytes / 1024:.0f} KB")
+    for name in VARIANTS:
+        total = sum(entry['variants'][name]['bytes'] for entry in manifest.values()
+                    if name in entry.get('variants', {}))
+        print(f"{name}: {total / 1024:.0f} KB")
+    print(f"Manifest saved to: {Path(output_dir) / MANIFEST_NAME}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate resized cover variants")
+    parser.add_argument('--covers', default='covers')
+    parser.add_argument('--output', default=VARIANTS_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="regenerate every variant")
+    args = parser.parse_args()
+
+    generate_cover_variants(args.covers, args.output, args.workers, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Adaptive Host Throttle
+
+Per-host request pacing that finds the fastest rate a host tolerates instead
+of relying on a fixed delay:
+
+    throttle = AdaptiveThrottle(max_per_host=2, requests_per_second=1.0, max_rate=5.0)
+    with throttle.acquire(url):
+        response = session.get(url)
+    throttle.success(url, latency)           # or throttled(url, retry_after) / failure(url)
+
+Each host has a token bucket refilled at its current rate. The rate starts
+in slow start, growing by ``slow_start`` req/s per clean response (doubling
+roughly every 2 s at the default), until the first sign of trouble; from then
+on it follows AIMD: every clean response adds ``increase / rate`` (about ``increase`` req/s
+per second of clean traffic), while a 429/503 or a captcha page multiplies it
+by ``decrease`` (at most once per round trip, so one burst of rejections
+counts as one signal). Latency is a signal too: while the smoothed latency is
+more than ``latency_factor`` times the fastest seen (or than
+``latency_floor``, whichever is slower), the host is queueing, so the rate
+stops growing and backs off gently.
+
+A Retry-After from the host pauses all requests to it until then. After
+``failure_threshold`` failures in a row the host's circuit opens: nothing is
+sent for ``cooldown`` seconds (doubling with every consecutive trip, up to
+``max_cooldown``), then one probe request decides whether it closes again.
+Requests wait out a pause of up to ``max_pause`` seconds; beyond that the
+host is treated as blocking us and acquire() fails fast with ThrottledError,
+so a run drains quickly and can be resumed later.
+
+backoff_delay() gives the jittered exponential wait between retries of one
+request; looks_like_captcha() recognizes Amazon's robot check.
+HostRateLimiter is the fixed-rate version without feedback (a concurrency cap
+and evenly spaced request starts per host), used by podcast_prefetch.py.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# Markers of Amazon's robot check page (served with status 200)
+CAPTCHA_MARKERS = (b'/errors/validateCaptcha', b'Type the characters you see in this image',
+                   b'api-services-support@amazon.com')
+
+
+class ThrottledError(RuntimeError):
+    """A host kept refusing a request (throttling, captcha or errors) through every retry"""
+
+
+def looks_like_captcha(content):
+    head = content[:64 * 1024]
+    return any(marker in head for marker in CAPTCHA_MARKERS)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class HostRateLimiter:
+    """Caps concurrent requests and request rate per host.
+
+    Each host gets its own semaphore (max in-flight requests) and a
+    reservation clock that spaces request starts ``1 / requests_per_second``
+    apart, so workers share the budget for a host instead of each sleeping.
+    """
+
+    def __init__(self, max_per_host=2, requests_per_second=1.0):
+        self.max_per_host = max_per_host
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host_state(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = {
+                    'semaphore': threading.BoundedSemaphore(self.max_per_host),
+                    'next_slot': 0.0,
+                }
+                self._hosts[host] = state
+            return state
+
+    def _reserve_slot(self, state):
+        """Reserve the next start time for this host and return the wait"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, state['next_slot'])
+            state['next_slot'] = start + self.interval
+            return start - now
+
+    @contextmanager
+    def acquire(self, url):
+        state = self._host_state(urlsplit(url).netloc)
+        with state['semaphore']:
+            wait = self._reserve_slot(state)
+            if wait > 0:
+                time.sleep(wait)
+            yield
+
+
+class _HostState:
+    __slots__ = ('semaphore', 'rate', 'tokens', 'updated', 'paused_until', 'latency', 'fastest',
+                 'last_decrease', 'slow_start', 'failures', 'circuit', 'open_until', 'trips', 'probing')
+
+    def __init__(self, max_per_host, rate, burst):
+        self.semaphore = threading.BoundedSemaphore(max_per_host)
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.latency = None       # smoothed response time
+        self.fastest = None       # fastest response time seen
+        self.last_decrease = 0.0
+        self.slow_start = True
+        self.failures = 0         # consecutive
+        self.circuit = 'closed'   # closed, open or half_open
+        self.open_until = 0.0
+        self.trips = 0            # consecutive circuit openings
+        self.probing = False
+
+
+class AdaptiveThrottle:
+    def __init__(self, max_per_host=2, requests_per_second=1.0, max_rate=None, min_rate=0.05,
+                 slow_start=0.35, increase=0.25, decrease=0.5, burst=1, latency_factor=3.0, latency_floor=0.1, adaptive=True,
+                 failure_threshold=5, cooldown=30.0, max_cooldown=600.0, max_pause=120.0, on_event=None):
+        self.max_per_host = max_per_host
+        self.initial_rate = requests_per_second
+        self.max_rate = max(max_rate or requests_per_second, requests_per_second)
+        self.min_rate = min(min_rate, requests_per_second)
+        self.slow_start = slow_start
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.latency_factor = latency_factor
+        self.latency_floor = latency_floor
+        self.adaptive = adaptive
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_pause = max_pause
+        # Called as on_event(host, event) for 'throttled', 'rate_decrease', 'circuit_open', ...
+        self.on_event = on_event or (lambda host, event: None)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._hosts = {}
+
+    def _host_state(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(self.max_per_host, self.initial_rate, self.burst)
+            return state
+
+    def _admit(self, host, state):
+        """Wait until the circuit, any Retry-After pause and the token bucket let a request through"""
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                if state.circuit == 'open' and now >= state.open_until:
+                    state.circuit = 'half_open'
+                    state.probing = False
+                if state.circuit == 'open':
+                    if state.open_until - now > self.max_pause:
+                        raise ThrottledError(f"{host} is paused for another {state.open_until - now:.0f}s "
+                                             f"after repeated failures")
+                    self._changed.wait(state.open_until - now)
+                elif state.circuit == 'half_open' and state.probing:
+                    # One probe at a time; the rest wait for its verdict
+                    self._changed.wait(1.0)
+                elif now < state.paused_until:
+                    if state.paused_until - now > self.max_pause:
+                        raise ThrottledError(f"{host} asked us to retry in {state.paused_until - now:.0f}s")
+                    self._changed.wait(state.paused_until - now)
+                else:
+                    break
+            if state.circuit == 'half_open':
+                state.probing = True
+            # Token bucket; a negative balance is a reservation further in the future
+            if state.rate:
+                state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+                state.updated = now
+                state.tokens -= 1
+                return -state.tokens / state.rate if state.tokens < 0 else 0.0
+            return 0.0
+
+    @contextmanager
+    def acquire(self, url):
+        host = urlsplit(url).netloc
+        state = self._host_state(host)
+        with state.semaphore:
+            wait = self._admit(host, state)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                yield
+            finally:
+                with self._changed:
+                    # A probe that ended without a verdict (e.g. an exception) frees the slot
+                    if state.circuit == 'half_open' and state.probing:
+                        state.probing = False
+                        self._changed.notify_all()
+
+    def success(self, url, latency):
+        """The host answered normally in ``latency`` seconds"""
+        host = urlsplit(url).netloc
+        state = self._host_state(host)
+        with self._changed:
+            state.failures = 0
+            if state.circuit != 'closed':
+                state.circuit = 'closed'
+                state.trips = 0
+                state.probing = False
+                self._changed.notify_all()
+                self.on_event(host, 'circuit_closed')
+            state.fastest = latency if state.fastest is None else min(state.fastest, latency)
+            state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            if not self.adaptive:
+                return
+            if state.latency > self.latency_factor * max(state.fastest, self.latency_floor):
+                # Responses slowing down: the host is queueing us
+                self._decrease(host, state, 0.9)
+            elif state.slow_start:
+                state.rate = min(self.max_rate, state.rate + self.slow_start)
+            else:
+                state.rate = min(self.max_rate, state.rate + self.increase / state.rate)
+
+    def throttled(self, url, retry_after=None):
+        """The host asked us to slow down: 429/503, or a captcha page"""
+        host = urlsplit(url).netloc
+        state = self._host_state(host)
+        with self._changed:
+            if retry_after:
+                state.paused_until = max(state.paused_until, time.monotonic() + retry_after)
+            self.on_event(host, 'throttled')
+            if self.adaptive:
+                self._decrease(host, state, self.decrease)
+            self._failed(host, state)
+
+    def failure(self, url):
+        """A request to the host failed without a throttling signal (5xx, connection error)"""
+        host = urlsplit(url).netloc
+        state = self._host_state(host)
+        with self._changed:
+            self._failed(host, state)
+
+    def _decrease(self, host, state, factor):
+        now = time.monotonic()
+        # Once per round trip: rejections of requests already in flight are the same signal
+        if now - state.last_decrease < (state.latency or 0.0) + 1.0 / state.rate:
+            return
+        state.last_decrease = now
+        state.slow_start = False
+        state.rate = max(self.min_rate, state.rate * factor)
+        self.on_event(host, 'rate_decrease')
+
+    def _failed(self, host, state):
+        state.failures += 1
+        if state.circuit == 'half_open' or state.failures >= self.failure_threshold:
+            cooldown = min(self.max_cooldown, self.cooldown * 2 ** state.trips)
+            state.circuit = 'open'
+            state.open_until = time.monotonic() + cooldown
+            state.trips += 1
+            state.failures = 0
+            state.probing = False
+            self._changed.notify_all()
+            self.on_event(host, 'circuit_open')
+            print(f"⏸️  {host}: circuit open after repeated failures, pausing for {cooldown:.0f}s")
+
+    def snapshot(self):
+        """{host: {'rate', 'latency', 'circuit', 'trips'}} for summaries and benchmarks"""
+        with self._lock:
+            return {host: {'rate': round(state.rate, 3),
+                           'latency': round(state.latency, 4) if state.latency is not None else None,
+                           'circuit': state.circuit, 'trips': state.trips}
+                    for host, state in self._hosts.items()}
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+HTTP Response Cache
+
+Persistent cache for the scraper's requests.Session, mounted as a transport
+adapter. Response bodies are stored content-addressed (by SHA-256) under
+``<cache_dir>/blobs`` and indexed per URL in a small SQLite database, so
+identical pages served under different URLs are stored once.
+
+- TTLs are chosen per URL class (search pages, product pages, ...); classes
+  with a TTL of 0 (images by default) bypass the cache entirely.
+- Stale entries that carry an ETag or Last-Modified are revalidated with a
+  conditional request; a 304 refreshes the entry without re-downloading it.
+- The total blob size is bounded; least recently used entries are evicted.
+- hits / misses / revalidations / stores / evictions are counted in ``stats``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CACHE_DIR = '.http_cache'
+
+# First matching pattern decides the URL class
+URL_CLASSES = [
+    ('search', re.compile(r'/s(\?|$)')),
+    ('product', re.compile(r'/dp/')),
+    ('image', re.compile(r'\.(jpe?g|png|gif|webp)(\?|$)', re.IGNORECASE)),
+]
+
+# The stored body is already decoded, so these no longer describe it
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+DEFAULT_TTLS = {
+    'search': 24 * 3600,
+    'product': 7 * 24 * 3600,
+    'image': 0,
+    'other': 0,
+}
+
+
+def classify_url(url):
+    for name, pattern in URL_CLASSES:
+        if pattern.search(url):
+            return name
+    return 'other'
+
+
+class ResponseCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=512 * 1024 * 1024, ttls=None):
+        self.cache_dir = Path(cache_dir)
+        self.blobs_dir = self.cache_dir / 'blobs'
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        # WAL and a busy timeout: worker processes (work_queue.py) share one cache
+        self._db = sqlite3.connect(str(self.cache_dir / 'index.sqlite3'), timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode = WAL')
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body_sha TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+        ''')
+        self._db.commit()
+
+    def ttl_for(self, url):
+        return self.ttls.get(classify_url(url), 0)
+
+    def _blob_path(self, sha):
+        return self.blobs_dir / sha[:2] / sha
+
+    def lookup(self, url):
+        """Return the cached entry for a URL (fresh or stale), or None"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT status, headers, body_sha, expires_at, etag, last_modified '
+                'FROM entries WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        status, headers, body_sha, expires_at, etag, last_modified = row
+        try:
+            body = self._blob_path(body_sha).read_bytes()
+        except FileNotFoundError:
+            self.forget(url)
+            return None
+        return {
+            'status': status,
+            'headers': json.loads(headers),
+            'body': body,
+            'fresh': expires_at > time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+        }
+
+    def touch(self, url, refresh_ttl=False):
+        """Record an access (and optionally a successful revalidation)"""
+        now = time.time()
+        with self._lock:
+            if refresh_ttl:
+                self._db.execute('UPDATE entries SET last_access = ?, expires_at = ? WHERE url = ?',
+                                 (now, now + self.ttl_for(url), url))
+            else:
+                self._db.execute('UPDATE entries SET last_access = ? WHERE url = ?', (now, url))
+            self._db.commit()
+
+    def store(self, url, status, headers, body):
+        headers = {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS}
+        validators = CaseInsensitiveDict(headers)
+        sha = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(sha)
+        if not blob_path.exists():
+            blob_path.parent.mkdir(exist_ok=True)
+            tmp_path = blob_path.with_name(f"{sha}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(body)
+            os.replace(tmp_path, blob_path)
+        now = time.time()
+        with self._lock:
+            self._db.execute('INSERT OR IGNORE INTO blobs (sha, size) VALUES (?, ?)', (sha, len(body)))
+            old = self._db.execute('SELECT body_sha FROM entries WHERE url = ?', (url,)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries '
+                '(url, status, headers, body_sha, expires_at, etag, last_modified, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, status, json.dumps(headers), sha, now + self.ttl_for(url),
+                 validators.get('ETag'), validators.get('Last-Modified'), now))
+            if old and old[0] != sha:
+                self._drop_blob_if_unused(old[0])
+            self.stats['stores'] += 1
+            self._evict()
+            self._db.commit()
+
+    def forget(self, url):
+        with self._lock:
+            row = self._db.execute('SELECT body_sha FROM entries WHERE url = ?', (url,)).fetchone()
+            self._db.execute('DELETE FROM entries WHERE url = ?', (url,))
+            if row:
+                self._drop_blob_if_unused(row[0])
+            self._db.commit()
+
+    def _drop_blob_if_unused(self, sha):
+        in_use = self._db.execute('SELECT 1 FROM entries WHERE body_sha = ? LIMIT 1', (sha,)).fetchone()
+        if in_use:
+            return
+        self._db.execute('DELETE FROM blobs WHERE sha = ?', (sha,))
+        try:
+            self._blob_path(sha).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until the blobs fit in max_bytes"""
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        while total > self.max_bytes:
+            row = self._db.execute(
+                'SELECT url, body_sha FROM entries ORDER BY last_access LIMIT 1').fetchone()
+            if row is None:
+                break
+            url, sha = row
+            self._db.execute('DELETE FROM entries WHERE url = ?', (url,))
+            self._drop_blob_if_unused(sha)
+            self.stats['evictions'] += 1
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CachingAdapter(HTTPAdapter):
+    """HTTPAdapter that answers GETs from a ResponseCache when it can"""
+
+    def __init__(self, cache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = request.url
+        if request.method != 'GET' or self.cache.ttl_for(url) <= 0:
+            return super().send(request, **kwargs)
+
+        entry = self.cache.lookup(url)
+        if entry and entry['fresh']:
+            self.cache.count('hits')
+            self.cache.touch(url)
+            return self._build_response(request, entry)
+
+        if entry and (entry['etag'] or entry['last_modified']):
+            if entry['etag']:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.count('revalidated')
+            self.cache.touch(url, refresh_ttl=True)
+            response.close()
+            return self._build_response(request, entry)
+
+        self.cache.count('misses')
+        if response.status_code == 200:
+            self.cache.store(url, response.status_code, response.headers, response.content)
+        return response
+
+    def _build_response(self, request, entry):
+        response = Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body']
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = 'OK'
+        response.from_cache = True
+        return response
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Mapping Report Watcher
+
+Keeps book_cover_mapping.json current while covers/ and book.json change,
+instead of re-running create_mapping_report (one Path.exists() per book)
+after every rename pass:
+
+    python mapping_watch.py                      # inotify on Linux, polling elsewhere
+    python mapping_watch.py --poll --interval 2
+    python mapping_watch.py --debounce 1.0
+
+At start the catalog is streamed once and covers/ listed once. After that the
+mapping lives in memory: a cover created, deleted or renamed in covers/ only
+flips the entries of the titles that use that file name, and a change to
+book.json re-reads the catalog against the in-memory listing (no stats).
+Events are debounced: the report is written once changes have been quiet for
+--debounce seconds (or --max-delay after the first one, during a long burst),
+and it is replaced atomically through catalog_io's writer, so readers never
+see a partial file.
+
+Events come from inotify (through ctypes, no extra dependency). Where it is
+unavailable, or with --poll, covers/ and book.json are compared against the
+previous listing every --interval seconds. An inotify queue overflow falls
+back to a full rescan.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from catalog_io import iter_records, open_writer
+from rename_covers import cover_filename, mapping_entry
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+# Watcher events: ('cover', file name), ('catalog', None) or ('rescan', None)
+
+
+class InotifyWatcher:
+    def __init__(self, covers_dir, catalog_file):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.catalog_name = os.path.basename(catalog_file)
+        # Watch the catalog's directory: editors save by writing a new file and renaming it over
+        self.covers_wd = self._add(covers_dir, IN_CREATE | IN_CLOSE_WRITE | IN_DELETE | IN_MOVED_FROM
+                                   | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF)
+        self.catalog_wd = self._add(os.path.dirname(os.path.abspath(catalog_file)),
+                                    IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+
+    def _add(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def wait(self, timeout):
+        """Events that arrive within ``timeout`` seconds (an empty list when none did)"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, pos = [], 0
+        while pos < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+            pos += length
+            if mask & IN_Q_OVERFLOW or (wd == self.covers_wd and mask & (IN_DELETE_SELF | IN_MOVE_SELF)):
+                events.append(('rescan', None))
+            elif mask & IN_ISDIR:
+                continue
+            elif wd == self.covers_wd:
+                events.append(('cover', name))
+            elif wd == self.catalog_wd and name == self.catalog_name:
+                events.append(('catalog', None))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, covers_dir, catalog_file, interval=1.0):
+        self.covers_dir = covers_dir
+        self.catalog_file = catalog_file
+        self.interval = interval
+        self.listing = self._list_covers()
+        self.catalog_stat = self._catalog_stat()
+
+    def _list_covers(self):
+        listing = {}
+        try:
+            with os.scandir(self.covers_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        listing[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        return listing
+
+    def _catalog_stat(self):
+        try:
+            stat = os.stat(self.catalog_file)
+            return stat.st_size, stat.st_mtime_ns, stat.st_ino
+        except FileNotFoundError:
+            return None
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        events = []
+        listing = self._list_covers()
+        for name in listing.keys() ^ self.listing.keys():
+            events.append(('cover', name))
+        self.listing = listing
+        catalog_stat = self._catalog_stat()
+        if catalog_stat != self.catalog_stat:
+            self.catalog_stat = catalog_stat
+            events.append(('catalog', None))
+        return events
+
+    def close(self):
+        pass
+
+
+def _count_changes(old_entries, new_entries):
+    changed = sum(1 for old, new in zip(old_entries, new_entries) if old != new)
+    return changed + abs(len(new_entries) - len(old_entries))
+
+
+class MappingState:
+    """The mapping report in memory: catalog entries plus the covers/ listing"""
+
+    def __init__(self, catalog_file='book.json', covers_dir='covers'):
+        self.catalog_file = catalog_file
+        self.covers_dir = Path(covers_dir)
+        self.covers = set()
+        self.books = []
+        self.entries = []
+        self.by_filename = {}
+        self.rescan()
+
+    def rescan(self):
+        """List covers/ and re-read the catalog; return the number of entries that changed"""
+        self.covers = set(os.listdir(self.covers_dir)) if self.covers_dir.is_dir() else set()
+        return self.reload_catalog()
+
+    def reload_catalog(self):
+        """Re-read the catalog; return the number of report entries that changed"""
+        try:
+            books = list(iter_records(self.catalog_file, key='books'))
+        except (OSError, ValueError) as e:
+            # Mid-save or malformed: keep the last good catalog until the next change
+            print(f"⚠️  Could not read {self.catalog_file}: {e}")
+            return 0
+        old_entries = self.entries
+        self.books = books
+        self.entries = [mapping_entry(book, cover_filename(book['title']) in self.covers, self.covers_dir)
+                        for book in books]
+        self.by_filename = {}
+        for i, entry in enumerate(self.entries):
+            self.by_filename.setdefault(entry['cover_filename'], []).append(i)
+        return _count_changes(old_entries, self.entries)
+
+    def cover_changed(self, name):
+        """Re-check one file name in covers/; return the number of entries that changed"""
+        exists = (self.covers_dir / name).is_file()
+        if exists:
+            self.covers.add(name)
+        else:
+            self.covers.discard(name)
+        changed = 0
+        for i in self.by_filename.get(name, ()):
+            if self.entries[i]['cover_exists'] != exists:
+                self.entries[i] = mapping_entry(self.books[i], exists, self.covers_dir)
+                changed += 1
+        return changed
+
+    def apply(self, events):
+        changed = 0
+        kinds = {kind for kind, _ in events}
+        if 'rescan' in kinds:
+            return self.rescan()
+        if 'catalog' in kinds:
+            changed += self.reload_catalog()
+        for name in {name for kind, name in events if kind == 'cover'}:
+            changed += self.cover_changed(name)
+        return changed
+
+    def write(self, report_file):
+        with open_writer(report_file) as report:
+            for entry in self.entries:
+                report.write(entry)
+        return sum(entry['cover_exists'] for entry in self.entries)
+
+
+def create_watcher(covers_dir, catalog_file, poll=False, interval=1.0):
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(covers_dir, catalog_file)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify unavailable ({e}), polling instead")
+    return PollingWatcher(covers_dir, catalog_file, interval)
+
+
+def watch(catalog_file='book.json', covers_dir='covers', report_file='book_cover_mapping.json',
+          debounce=0.5, max_delay=5.0, poll=False, interval=1.0):
+    state = MappingState(catalog_file, covers_dir)
+    with_covers = state.write(report_file)
+    print(f"📄 {report_file}: {with_covers}/{len(state.entries)} books with covers")
+    watcher = create_watcher(covers_dir, catalog_file, poll, interval)
+    print(f"👀 Watching {covers_dir}/ and {catalog_file} ({type(watcher).__name__}), Ctrl+C to stop")
+    try:
+        while True:
+            events = watcher.wait(3600)
+            if not events:
+                continue
+            # Debounce: collect until quiet for `debounce` seconds, at most `max_delay`
+            first = time.monotonic()
+            while time.monotonic() - first < max_delay:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                events.extend(more)
+            changed = state.apply(events)
+            if changed:
+                with_covers = state.write(report_file)
+                print(f"📄 {time.strftime('%H:%M:%S')} {changed} entries changed ({len(events)} events): "
+                      f"{with_covers}/{len(state.entries)} books with covers")
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep book_cover_mapping.json up to date as covers change")
+    parser.add_argument('--catalog', default='book.json')
+    parser.add_argument('--covers', default='covers')
+    parser.add_argument('--report', default='book_cover_mapping.json')
+    parser.add_argument('--debounce', type=float, default=0.5, help="quiet seconds before writing the report")
+    parser.add_argument('--max-delay', type=float, default=5.0, help="longest wait during a burst of changes")
+    parser.add_argument('--poll', action='store_true', help="poll instead of using inotify")
+    parser.add_argument('--interval', type=float, default=1.0, help="polling interval in seconds")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.catalog):
+        print(f"Error: {args.catalog} file not found!")
+        sys.exit(1)
+    watch(args.catalog, args.covers, args.report, args.debounce, args.max_delay, args.poll, args.interval)
+
+
+if __name__ == "__main__":
+    main()
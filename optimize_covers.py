@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Cover Optimizer
+
+download_image saves whatever bytes Amazon returns, so covers/ can hold
+truncated JPEGs, HTML error pages saved as .jpg and images carrying bulky
+metadata. This pass checks and shrinks every cover:
+
+1. Validate the JPEG structure by walking its markers (no pixel decode):
+   SOI first, well-formed segment lengths, a frame header before the first
+   scan, entropy-coded data that ends in a marker, and EOI. Files that fail
+   are moved to cover_quarantine/ with the reason recorded.
+2. Strip metadata segments (EXIF/XMP, ICC unless --keep-icc, IPTC, other
+   APPn, comments) by dropping them from the byte stream; APP0 (JFIF) and
+   APP14 (Adobe, needed to decode CMYK/YCCK) stay. An EXIF Orientation other
+   than 1 is kept, as an EXIF segment holding only that tag, so rotated
+   covers still display upright. This is lossless.
+3. Rewrite as an optimized progressive JPEG with jpegtran when it is on
+   PATH (lossless transcoding). Without jpegtran this step is skipped unless
+   --lossy is given: Pillow then re-encodes with quality='keep' (same
+   quantization tables and subsampling), which is only accepted when the
+   decoded pixels stay within MAX_MEAN_PIXEL_DIFF of the original.
+
+A rewrite replaces the cover (atomically) only when it saves at least
+MIN_SAVING_BYTES. Work runs in a process pool, and the pass is incremental:
+the size, mtime and SHA-256 of every cover after its last pass are kept in
+.cover_optimize_state.json, so repeat runs only open new or changed covers.
+
+    python optimize_covers.py
+    python optimize_covers.py --dry-run         # report only, change nothing
+    python optimize_covers.py --workers 8 --keep-icc
+    python optimize_covers.py --lossy           # no jpegtran: let Pillow re-encode
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+STATE_FILE = '.cover_optimize_state.json'
+QUARANTINE_DIR = 'cover_quarantine'
+
+MIN_SAVING_BYTES = 256       # smaller savings are not worth rewriting the file
+MAX_MEAN_PIXEL_DIFF = 0.5    # for the Pillow fallback, mean absolute difference per channel
+
+_FRAME_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}  # SOFn (not DHT, JPG, DAC)
+_PROGRESSIVE_MARKERS = frozenset({0xC2, 0xC6, 0xCA, 0xCE})
+_METADATA_MARKERS = frozenset(range(0xE1, 0xF0)) - {0xEE} | {0xFE}  # APP1-15 but APP14, and COM
+_ICC_MARKER = 0xE2
+_EXIF_MARKER = 0xE1
+_ORIENTATION_TAG = 0x0112
+
+
+def _exif_orientation(payload):
+    """The Orientation tag (1-8) of an APP1 payload, or None when it has none"""
+    if not payload.startswith(b'Exif\x00\x00'):
+        return None
+    tiff = payload[6:]
+    order = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if order is None or len(tiff) < 8:
+        return None
+    ifd = struct.unpack(f"{order}I", tiff[4:8])[0]
+    if ifd + 2 > len(tiff):
+        return None
+    count = struct.unpack(f"{order}H", tiff[ifd:ifd + 2])[0]
+    for entry in range(ifd + 2, min(ifd + 2 + count * 12, len(tiff) - 11), 12):
+        tag, _, _, value = struct.unpack(f"{order}HHIH", tiff[entry:entry + 10])
+        if tag == _ORIENTATION_TAG:
+            return value if 1 <= value <= 8 else None
+    return None
+
+
+def _orientation_segment(orientation):
+    """An APP1 segment whose EXIF holds only the Orientation tag"""
+    # TIFF header, IFD0 with one SHORT entry (value left-justified), no next IFD
+    payload = b'Exif\x00\x00' + struct.pack('>2sHIHHHIHHI', b'MM', 42, 8, 1, _ORIENTATION_TAG, 3, 1,
+                                             orientation, 0, 0)
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def inspect_jpeg(data, keep_icc=False):
+    """Walk the markers of ``data``; return {'error': reason} or {'progressive',
+    'metadata': [(start, end, replacement)] byte ranges that can be replaced (mostly by b'')}"""
+    if not data.startswith(b'\xff\xd8'):
+        if not data:
+            return {'error': 'empty file'}
+        if data.lstrip()[:1] == b'<':
+            return {'error': 'HTML/XML document, not an image'}
+        return {'error': f"not a JPEG (starts with {data[:4].hex()})"}
+
+    size = len(data)
+    pos = 2
+    progressive = seen_frame = seen_scan = oriented = False
+    metadata = []
+    while True:
+        if pos >= size:
+            return {'error': 'truncated: no end-of-image marker'}
+        if data[pos] != 0xFF:
+            return {'error': f"corrupt: expected a marker at byte {pos}"}
+        start = pos
+        while pos < size and data[pos] == 0xFF:  # fill bytes
+            pos += 1
+        if pos >= size:
+            return {'error': 'truncated: no end-of-image marker'}
+        marker = data[pos]
+        pos += 1
+        if marker == 0xD9:
+            if not seen_scan:
+                return {'error': 'corrupt: no image data before end-of-image'}
+            return {'progressive': progressive, 'metadata': metadata, 'trailing_bytes': size - pos}
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # RSTn, TEM: no length
+            continue
+        if pos + 2 > size:
+            return {'error': f"truncated in segment {marker:02X}"}
+        length = int.from_bytes(data[pos:pos + 2], 'big')
+        end = pos + length
+        if length < 2 or end > size:
+            return {'error': f"truncated in segment {marker:02X}"}
+        if marker in _FRAME_MARKERS:
+            seen_frame = True
+            progressive = marker in _PROGRESSIVE_MARKERS
+        elif marker in _METADATA_MARKERS and not (keep_icc and marker == _ICC_MARKER):
+            orientation = _exif_orientation(data[pos + 2:end]) if marker == _EXIF_MARKER else None
+            if orientation and orientation != 1 and not oriented:
+                metadata.append((start, end, _orientation_segment(orientation)))
+                oriented = True
+            else:
+                metadata.append((start, end, b''))
+        pos = end
+
+        if marker == 0xDA:
+            if not seen_frame:
+                return {'error': 'corrupt: scan before frame header'}
+            seen_scan = True
+            # Entropy-coded data runs to the next marker that is not stuffing (FF00) or RSTn
+            while True:
+                pos = data.find(b'\xff', pos)
+                if pos < 0 or pos + 1 >= size:
+                    return {'error': 'truncated in image data'}
+                following = data[pos + 1]
+                if following == 0x00 or 0xD0 <= following <= 0xD7 or following == 0xFF:
+                    pos += 1
+                    continue
+                break
+
+
+def strip_segments(data, ranges):
+    pieces, previous = [], 0
+    for start, end, replacement in ranges:
+        pieces.append(data[previous:start])
+        pieces.append(replacement)
+        previous = end
+    pieces.append(data[previous:])
+    return b''.join(pieces)
+
+
+def _progressive_jpegtran(data, jpegtran):
+    # Only the segments worth keeping are left by now (orientation, ICC with --keep-icc)
+    command = [jpegtran, '-copy', 'all', '-optimize', '-progressive']
+    result = subprocess.run(command, input=data, capture_output=True, timeout=60)
+    return result.stdout if result.returncode == 0 else None
+
+
+def _progressive_pillow(data):
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        buffer = io.BytesIO()
+        options = {'quality': 'keep', 'progressive': True, 'optimize': True}
+        if image.info.get('icc_profile'):
+            options['icc_profile'] = image.info['icc_profile']
+        if image.info.get('exif'):
+            options['exif'] = image.info['exif']
+        image.save(buffer, 'JPEG', **options)
+        original = np.asarray(image, dtype=np.int16)
+    encoded = buffer.getvalue()
+    with Image.open(io.BytesIO(encoded)) as image:
+        difference = np.abs(np.asarray(image, dtype=np.int16) - original).mean()
+    return encoded if difference <= MAX_MEAN_PIXEL_DIFF else None
+
+
+def optimize_cover(path, options):
+    """Worker entry point: check and shrink one cover, return (file name, state entry)"""
+    path = Path(path)
+    data = path.read_bytes()
+    entry = {'original_bytes': len(data), 'bytes': len(data), 'actions': []}
+    report = inspect_jpeg(data, options['keep_icc'])
+    if 'error' in report:
+        entry.update(status='quarantined', reason=report['error'])
+        if not options['dry_run']:
+            target = Path(options['quarantine_dir']) / path.name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+        return path.name, entry
+
+    optimized = data
+    if report['metadata']:
+        optimized = strip_segments(data, report['metadata'])
+        entry['actions'].append(f"stripped {len(data) - len(optimized)} bytes of metadata")
+    try:
+        if options['jpegtran']:
+            candidate = _progressive_jpegtran(optimized, options['jpegtran'])
+            method = 'jpegtran'
+        elif options['lossy']:
+            candidate = _progressive_pillow(optimized)
+            method = 'pillow'
+        else:
+            candidate, method = None, None
+    except Exception as e:
+        candidate, method = None, f"failed ({e})"
+    if candidate and len(candidate) < len(optimized) and 'error' not in inspect_jpeg(candidate):
+        entry['actions'].append(f"progressive re-encode ({method}) saved {len(optimized) - len(candidate)} bytes")
+        optimized = candidate
+
+    if len(data) - len(optimized) >= MIN_SAVING_BYTES:
+        entry['bytes'] = len(optimized)
+        entry['status'] = 'optimized'
+        if not options['dry_run']:
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            tmp_path.write_bytes(optimized)
+            os.replace(tmp_path, path)
+            data = optimized
+    else:
+        entry['status'] = 'unchanged'
+        entry['actions'] = []
+    stat = path.stat() if path.exists() else None
+    entry['sha256'] = hashlib.sha256(data).hexdigest()
+    if stat:
+        entry['size'], entry['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+    return path.name, entry
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_state(path=STATE_FILE):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'files': {}, 'quarantined': {}}
+
+
+def save_state(state, path=STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def optimize_covers(covers_dir='covers', workers=None, dry_run=False, keep_icc=False, force=False,
+                    state_file=STATE_FILE, quarantine_dir=QUARANTINE_DIR, lossy=False):
+    """Validate and optimize new or changed covers; return the run's totals"""
+    covers_dir = Path(covers_dir)
+    if not covers_dir.exists():
+        print("Error: covers directory not found!")
+        return None
+
+    state = {'files': {}, 'quarantined': load_state(state_file).get('quarantined', {})} if force \
+        else load_state(state_file)
+    files = state['files']
+    sources = {}
+    with os.scandir(covers_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith('.jpg'):
+                stat = entry.stat()
+                sources[entry.name] = (entry.path, stat.st_size, stat.st_mtime_ns)
+
+    pending = []
+    for name, (path, size, mtime_ns) in sources.items():
+        entry = files.get(name)
+        if entry and entry.get('size') == size and entry.get('mtime_ns') == mtime_ns:
+            continue
+        # Touched but unchanged content (e.g. copied back from a backup)
+        if entry and entry.get('sha256') == file_sha256(path):
+            entry['size'], entry['mtime_ns'] = size, mtime_ns
+            continue
+        pending.append(path)
+    for name in [name for name in files if name not in sources]:
+        del files[name]
+
+    jpegtran = shutil.which('jpegtran')
+    encoder = 'jpegtran' if jpegtran else 'Pillow, lossy' if lossy else 'no re-encoding: jpegtran not found'
+    print(f"Found {len(sources)} covers: {len(pending)} to check, {len(sources) - len(pending)} up to date "
+          f"({encoder}{', dry run' if dry_run else ''})")
+
+    options = {'dry_run': dry_run, 'keep_icc': keep_icc, 'jpegtran': jpegtran, 'lossy': lossy,
+               'quarantine_dir': quarantine_dir}
+    totals = {'checked': len(pending), 'optimized': 0, 'quarantined': 0, 'bytes_before': 0, 'bytes_after': 0}
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for name, entry in executor.map(optimize_cover, pending, [options] * len(pending), chunksize=16):
+                if entry['status'] == 'quarantined':
+                    totals['quarantined'] += 1
+                    print(f"  🚫 {name}: {entry['reason']}")
+                    if not dry_run:
+                        state['quarantined'][name] = {'reason': entry['reason'],
+                                                      'when': datetime.now().isoformat(timespec='seconds')}
+                        files.pop(name, None)
+                    continue
+                totals['bytes_before'] += entry['original_bytes']
+                totals['bytes_after'] += entry['bytes']
+                if entry['status'] == 'optimized':
+                    totals['optimized'] += 1
+                    print(f"  ✅ {name}: {entry['original_bytes'] / 1024:.1f} → {entry['bytes'] / 1024:.1f} KB "
+                          f"({'; '.join(entry['actions'])})")
+                if not dry_run:
+                    files[name] = entry
+
+    if not dry_run:
+        state['last_run'] = {**totals, 'when': datetime.now().isoformat(timespec='seconds')}
+        save_state(state, state_file)
+
+    saved = totals['bytes_before'] - totals['bytes_after']
+    print(f"\n=== OPTIMIZATION SUMMARY ===")
+    print(f"Covers checked: {totals['checked']}")
+    print(f"Optimized: {totals['optimized']}")
+    print(f"Quarantined: {totals['quarantined']} (in {quarantine_dir}/)")
+    print(f"Bytes saved: {saved / 1024:.1f} KB of {totals['bytes_before'] / 1024:.1f} KB"
+          + (f" ({saved / totals['bytes_before'] * 100:.1f}%)" if totals['bytes_before'] else ''))
+    if not dry_run:
+        print(f"State saved to: {state_file}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate, quarantine and losslessly shrink covers")
+    parser.add_argument('--covers', default='covers')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true', help="report what would change, change nothing")
+    parser.add_argument('--keep-icc', action='store_true', help="keep ICC color profiles")
+    parser.add_argument('--force', action='store_true', help="check every cover, not only new or changed ones")
+    parser.add_argument('--quarantine-dir', default=QUARANTINE_DIR)
+    parser.add_argument('--lossy', action='store_true',
+                        help="without jpegtran, re-encode progressive JPEGs with Pillow (not lossless)")
+    args = parser.parse_args()
+
+    optimize_covers(args.covers, args.workers, args.dry_run, args.keep_icc, args.force,
+                    quarantine_dir=args.quarantine_dir, lossy=args.lossy)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Pipeline Metrics
+
+In-process counters and latency histograms for the cover pipeline, exported
+as a Prometheus text file and a JSON report:
+
+    with METRICS.span('cover_stage', stage='search'):
+        ...
+    METRICS.increment('cover_download_bytes_total', len(chunk))
+    METRICS.write('cover_metrics.prom', 'cover_metrics.json')
+
+Histograms use fixed buckets (Prometheus style), so recording a sample is a
+bisect and two additions under one lock, and memory does not grow with the
+number of samples. The JSON report estimates p50/p95/p99 from the buckets.
+A MetricsExporter thread can rewrite both files on an interval during long
+runs. Files are replaced atomically, so a reader (e.g. node_exporter's
+textfile collector) never sees a half-written report.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# Upper bounds in seconds; everything slower lands in +Inf
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRICS_PROM_FILE = 'cover_metrics.prom'
+METRICS_JSON_FILE = 'cover_metrics.json'
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= target and bucket_count:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.bounds[-1]
+
+
+class _Span:
+    # A plain class instead of @contextmanager: spans sit on every stage call
+    __slots__ = ('registry', 'key', 'start')
+
+    def __init__(self, registry, name, label_key):
+        self.registry = registry
+        self.key = (name, label_key)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by name and labels"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = {}
+        self.started = time.time()
+
+    def increment(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        self._observe((name, _label_key(labels)), value)
+
+    def _observe(self, key, value):
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def span(self, name, **labels):
+        """Context manager timing its block into the <name>_seconds histogram"""
+        return _Span(self, f"{name}_seconds", _label_key(labels))
+
+    def timed(self, name, **labels):
+        """Decorator form of span()"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def timed_iter(self, iterable, name, **labels):
+        """Yield from ``iterable``, recording the total time spent producing items
+        as one <name>_seconds sample once it is exhausted (e.g. a streamed file read)"""
+        iterator = iter(iterable)
+        elapsed = 0.0
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                break
+            elapsed += time.perf_counter() - start
+            yield item
+        self.observe(f"{name}_seconds", elapsed, **labels)
+
+    def register_collector(self, name, collect):
+        """Add (or replace) a callable returning [(metric, labels, value)] read at export time"""
+        with self.lock:
+            self.collectors[name] = collect
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    def _collected(self):
+        values = {}
+        for collect in list(self.collectors.values()):
+            for name, labels, value in collect():
+                values[(name, _label_key(labels))] = value
+        return values
+
+    def _copy(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {}
+            for key, histogram in self.histograms.items():
+                copy = Histogram(histogram.bounds)
+                copy.counts = list(histogram.counts)
+                copy.total, copy.count = histogram.total, histogram.count
+                histograms[key] = copy
+        counters.update(self._collected())
+        return counters, histograms
+
+    def to_prometheus(self):
+        counters, histograms = self._copy()
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, key), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, key), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(list(histogram.bounds) + ['+Inf'], histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.total:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self):
+        counters, histograms = self._copy()
+        report = {'started': self.started, 'generated': time.time(), 'counters': [], 'histograms': []}
+        for (name, key), value in sorted(counters.items()):
+            report['counters'].append({'name': name, 'labels': dict(key), 'value': value})
+        for (name, key), histogram in sorted(histograms.items()):
+            entry = {'name': name, 'labels': dict(key), 'count': histogram.count,
+                     'sum': round(histogram.total, 6)}
+            if histogram.count:
+                entry['mean'] = round(histogram.total / histogram.count, 6)
+                for label, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+                    entry[label] = round(histogram.quantile(q), 6)
+            report['histograms'].append(entry)
+        return report
+
+    def write(self, prom_path=METRICS_PROM_FILE, json_path=METRICS_JSON_FILE):
+        """Atomically (re)write the Prometheus text file and/or JSON report"""
+        if prom_path:
+            _atomic_write(prom_path, self.to_prometheus())
+        if json_path:
+            _atomic_write(json_path, json.dumps(self.to_json(), indent=2, ensure_ascii=False))
+
+
+def _atomic_write(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class MetricsExporter:
+    """Background thread rewriting the metric files every ``interval`` seconds"""
+
+    def __init__(self, registry, interval, prom_path=METRICS_PROM_FILE, json_path=METRICS_JSON_FILE):
+        self.registry = registry
+        self.interval = interval
+        self.prom_path = prom_path
+        self.json_path = json_path
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-exporter', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.registry.write(self.prom_path, self.json_path)
+            except OSError as e:
+                print(f"Warning: could not export metrics: {e}")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and write the final export"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.registry.write(self.prom_path, self.json_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+# Registry shared by the scraper and renamer
+METRICS = MetricsRegistry()
+
+
+@contextmanager
+def exporting(registry=METRICS, prefix='cover_metrics', interval=None):
+    """Export ``registry`` to <prefix>.prom / <prefix>.json at the end of the block
+    (and every ``interval`` seconds while it runs); ``prefix=None`` disables it"""
+    if not prefix:
+        yield
+        return
+    exporter = MetricsExporter(registry, interval or 0, f"{prefix}.prom", f"{prefix}.json")
+    if interval:
+        exporter.start()
+    try:
+        yield
+    finally:
+        exporter.stop()
+        print(f"Metrics saved to: {prefix}.prom, {prefix}.json")
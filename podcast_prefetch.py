@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Podcast Cover Prefetcher
+
+Resolves and downloads the cover of every entry in podcast.json ahead of
+seeding, concurrently, into a local cache:
+
+    podcast_covers/<sha256[:20]>.<ext>   one file per distinct image
+    podcast_covers/manifest.json         name → url, image URL, file, status
+
+so PodcastSeederService only copies files instead of scraping YouTube and
+Amazon one podcast at a time during POST /api/Seed/podcasts.
+
+Images are found the way the seeder finds them: YouTube channel pages via
+<link rel="image_src">, og:image, the avatar <img>; Amazon product pages via
+the cover extractors used by the book scraper, then og:image; other sites via
+og:image. Pages and images are fetched by a thread pool through the same
+per-host limiter as the scraper, with retries on connection errors, 429 and
+5xx. Runs are incremental: entries whose URL is unchanged and whose image is
+cached are skipped (--refresh fetches everything again), and files no longer
+referenced by the manifest are removed.
+
+    python podcast_prefetch.py --workers 8
+    python podcast_prefetch.py --youtube-url http://127.0.0.1:8765 --amazon-url http://127.0.0.1:8765
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from catalog_io import iter_records
+from cover_extractors import FAST_PARSER, ChainedExtractor
+from host_throttle import HostRateLimiter
+from seed_sync import CATALOGS
+
+CACHE_DIR = 'podcast_covers'
+MANIFEST_NAME = 'manifest.json'
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# Same channel URL forms the seeder recognizes
+_YOUTUBE_CHANNEL = re.compile(r'youtube\.com/(?:channel/|c/|user/|@)?([a-zA-Z0-9_-]+)', re.IGNORECASE)
+_EXTENSIONS = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif', 'image/webp': '.webp'}
+_PAGE_TAGS = SoupStrainer(['link', 'meta', 'img'])
+
+
+def classify_source(url):
+    host = urlsplit(url).netloc.lower()
+    if host.endswith('youtube.com') or host.endswith('youtu.be'):
+        return 'youtube'
+    if 'amazon.' in host:
+        return 'amazon'
+    return 'other'
+
+
+def _og_image(soup):
+    tag = soup.find('meta', attrs={'property': 'og:image'})
+    return tag.get('content') if tag else None
+
+
+def youtube_image_url(content):
+    """Channel avatar URL from a channel page, in the seeder's selector order"""
+    soup = BeautifulSoup(content, FAST_PARSER, parse_only=_PAGE_TAGS)
+    link = soup.find('link', rel='image_src')
+    if link and link.get('href'):
+        return link['href']
+    image = _og_image(soup)
+    if image:
+        return image
+    for tag in (soup.find('img', id='img'), soup.find('img', class_=re.compile('avatar'))):
+        if tag and tag.get('src'):
+            return tag['src']
+    return None
+
+
+def amazon_image_url(content, extractor=ChainedExtractor()):
+    return extractor.extract_cover_url(content) or og_image_url(content)
+
+
+def og_image_url(content):
+    return _og_image(BeautifulSoup(content, FAST_PARSER, parse_only=_PAGE_TAGS))
+
+
+class PodcastCoverPrefetcher:
+    def __init__(self, cache_dir=CACHE_DIR, workers=8, max_per_host=4, requests_per_second=4.0,
+                 youtube_url=None, amazon_url=None):
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers
+        self.limiter = HostRateLimiter(max_per_host, requests_per_second)
+        # Base URLs replacing youtube.com / amazon.com, e.g. the stand-in server
+        self.rebase = {'youtube': youtube_url and youtube_url.rstrip('/'),
+                       'amazon': amazon_url and amazon_url.rstrip('/')}
+        self.session = requests.Session()
+        retry = Retry(total=4, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        })
+
+    def _get(self, url, **kwargs):
+        with self.limiter.acquire(url):
+            response = self.session.get(url, timeout=30, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def page_url(self, url, source):
+        """The URL to fetch for a podcast.json URL (rebased onto a stand-in if configured)"""
+        base = self.rebase.get(source)
+        if not base:
+            return url
+        parts = urlsplit(url)
+        return f"{base}{parts.path}" + (f"?{parts.query}" if parts.query else '')
+
+    def resolve_image_url(self, url):
+        """(source, page URL, image URL or None) for one podcast.json URL"""
+        source = classify_source(url)
+        if source == 'youtube' and not _YOUTUBE_CHANNEL.search(url):
+            return source, None, None
+        page_url = self.page_url(url, source)
+        content = self._get(page_url).content
+        if source == 'youtube':
+            image_url = youtube_image_url(content)
+        elif source == 'amazon':
+            image_url = amazon_image_url(content)
+        else:
+            image_url = og_image_url(content)
+        # Protocol-relative and root-relative URLs are resolved against the page
+        return source, page_url, urljoin(page_url, image_url) if image_url else None
+
+    def download(self, image_url):
+        """Store an image in the cache; return (file name, sha256, bytes, content type)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = None
+        try:
+            with self.limiter.acquire(image_url):
+                response = self.session.get(image_url, timeout=30, stream=True)
+            with response:
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', 'image/jpeg').split(';')[0].strip()
+                if not content_type.startswith('image/'):
+                    raise ValueError(f"unexpected content type '{content_type}'")
+                digest = hashlib.sha256()
+                size = 0
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.download-', suffix='.part')
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        size += len(chunk)
+                        if size > MAX_IMAGE_BYTES:
+                            raise ValueError(f"image exceeds {MAX_IMAGE_BYTES} bytes")
+                        digest.update(chunk)
+                        f.write(chunk)
+            if size == 0:
+                raise ValueError("empty response body")
+            sha256 = digest.hexdigest()
+            filename = f"{sha256[:20]}{_EXTENSIONS.get(content_type, '.jpg')}"
+            # Content-addressed: the same image under another podcast is stored once
+            os.replace(tmp_path, self.cache_dir / filename)
+            tmp_path = None
+            return filename, sha256, size, content_type
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def prefetch_one(self, name, url):
+        """Worker: resolve and download one podcast's cover, return its manifest entry"""
+        entry = {'url': url, 'fetched': datetime.now().isoformat(timespec='seconds')}
+        started = time.perf_counter()
+        try:
+            source, page_url, image_url = self.resolve_image_url(url)
+            entry.update(source=source, page_url=page_url, image_url=image_url)
+            if not image_url:
+                entry['status'] = 'no_image'
+            else:
+                filename, sha256, size, content_type = self.download(image_url)
+                entry.update(status='ok', file=filename, sha256=sha256, bytes=size, content_type=content_type)
+        except Exception as e:
+            entry.update(status='error', error=str(e))
+        entry['seconds'] = round(time.perf_counter() - started, 3)
+        return name, entry
+
+    def load_manifest(self):
+        path = self.cache_dir / MANIFEST_NAME
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def save_manifest(self, manifest):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / MANIFEST_NAME
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def run(self, json_file='podcast.json', refresh=False):
+        """Prefetch the covers of every podcast.json entry that needs it; return the manifest"""
+        records = {}
+        for array, key_field in CATALOGS['podcasts'][2]:
+            for record in iter_records(json_file, key=array):
+                if record.get(key_field) and record.get('url'):
+                    records[record[key_field]] = record['url']
+
+        manifest = {} if refresh else self.load_manifest()
+        manifest = {name: entry for name, entry in manifest.items() if name in records}
+        pending = [(name, url) for name, url in records.items()
+                   if not (manifest.get(name, {}).get('status') == 'ok'
+                           and manifest[name]['url'] == url
+                           and (self.cache_dir / manifest[name]['file']).exists())]
+        print(f"Found {len(records)} podcasts: {len(pending)} to fetch, {len(records) - len(pending)} cached")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.prefetch_one, name, url) for name, url in pending]
+            for future in as_completed(futures):
+                name, entry = future.result()
+                manifest[name] = entry
+                if entry['status'] == 'ok':
+                    print(f"  ✅ {name} ({entry['source']}, {entry['bytes'] / 1024:.0f} KB)")
+                elif entry['status'] == 'no_image':
+                    print(f"  ⚠️  {name}: no image found on {entry.get('page_url') or entry['url']}")
+                else:
+                    print(f"  ❌ {name}: {entry['error']}")
+        elapsed = time.perf_counter() - started
+
+        self.save_manifest(manifest)
+        # Drop cached files no entry points at any more
+        referenced = {entry.get('file') for entry in manifest.values()}
+        for path in self.cache_dir.iterdir():
+            if path.is_file() and path.name != MANIFEST_NAME and path.name not in referenced:
+                path.unlink()
+
+        statuses = [entry['status'] for entry in manifest.values()]
+        print(f"\n=== PREFETCH SUMMARY ===")
+        print(f"Podcasts: {len(records)}")
+        print(f"Fetched this run: {len(pending)} in {elapsed:.1f}s")
+        print(f"Covers cached: {statuses.count('ok')} ({len(referenced - {None})} distinct images)")
+        print(f"No image found: {statuses.count('no_image')}")
+        print(f"Errors: {statuses.count('error')}")
+        print(f"Manifest saved to: {self.cache_dir / MANIFEST_NAME}")
+        return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch podcast cover images for seeding")
+    parser.add_argument('--json', default='podcast.json', help="podcast catalog")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--max-per-host', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=4.0, help="requests per second per host")
+    parser.add_argument('--refresh', action='store_true', help="fetch every cover again")
+    parser.add_argument('--youtube-url', help="base URL to use instead of https://www.youtube.com (stand-in)")
+    parser.add_argument('--amazon-url', help="base URL to use instead of https://www.amazon.com (stand-in)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.json):
+        print(f"Error: {args.json} file not found!")
+        return
+    prefetcher = PodcastCoverPrefetcher(args.cache_dir, args.workers, args.max_per_host, args.rate,
+                                        args.youtube_url, args.amazon_url)
+    prefetcher.run(args.json, refresh=args.refresh)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,31 @@
 Book Cover Renamer
 
 This script renames the cover images to match the exact book titles from book.json
+
+The renames are planned first (name collisions are reported and skipped) and
+applied as one transaction through rename_journal.py, which keeps the old
+names as hard links instead of copying every file to a backup directory.
 """
 
-import json
+import argparse
 import os
-import shutil
+from collections import Counter
 from pathlib import Path
 import re
+import unicodedata
+
+from catalog_io import iter_records, open_writer
+from pipeline_metrics import METRICS, exporting
+from rename_journal import JOURNAL_DIR, JournalError, RenameJournal
+
+# Arabic letter variants folded onto one form when matching titles
+ARABIC_LETTER_FOLDS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',  # alef variants
+    'ة': 'ه',  # taa marbuta
+    'ى': 'ي',  # alef maksura
+    'ـ': None,  # tatweel
+})
+ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]')
 
 def sanitize_filename(filename):
     """Sanitize filename for saving (same logic as original scraper)"""
@@ -18,196 +36,417 @@ def sanitize_filename(filename):
         filename = filename.replace(char, '_')
     return filename[:100]  # Limit length
 
-def find_matching_image(title, covers_dir):
+def normalize_title(title):
+    """Normalize a title for matching: NFKC, casefold, Arabic letter/diacritic folding"""
+    text = unicodedata.normalize('NFKC', title).casefold()
+    text = ARABIC_DIACRITICS.sub('', text).translate(ARABIC_LETTER_FOLDS)
+    return ' '.join(text.split())
+
+class CoverIndex:
+    """Snapshot of the covers directory built from a single os.scandir pass.
+
+    Lookups by exact filename or by normalized title are dictionary hits, so
+    matching a whole catalog costs one directory listing instead of one per book.
+    """
+
+    def __init__(self, covers_dir):
+        self.covers_dir = Path(covers_dir)
+        self.filenames = set()
+        self.by_key = {}
+        with os.scandir(self.covers_dir) as entries:
+            names = sorted(entry.name for entry in entries
+                           if entry.is_file() and entry.name.endswith('.jpg'))
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def __contains__(self, filename):
+        return filename in self.filenames
+
+    def add(self, filename):
+        if filename in self.filenames:
+            return
+        self.filenames.add(filename)
+        self.by_key.setdefault(normalize_title(filename[:-len('.jpg')]), []).append(filename)
+
+    def remove(self, filename):
+        if filename not in self.filenames:
+            return
+        self.filenames.discard(filename)
+        key = normalize_title(filename[:-len('.jpg')])
+        self.by_key[key].remove(filename)
+        if not self.by_key[key]:
+            del self.by_key[key]
+
+    def find(self, title):
+        """Filename of the cover for a title, or None"""
+        sanitized_title = sanitize_filename(title)
+        expected_filename = f"{sanitized_title}.jpg"
+        if expected_filename in self.filenames:
+            return expected_filename
+        matches = self.by_key.get(normalize_title(sanitized_title))
+        return matches[0] if matches else None
+
+def find_matching_image(title, covers_dir, index=None):
     """Find the existing cover image that matches the book title"""
-    sanitized_title = sanitize_filename(title)
-    expected_filename = f"{sanitized_title}.jpg"
-    
-    # Check if exact match exists
-    if (covers_dir / expected_filename).exists():
-        return expected_filename
-    
-    # If not found, try to find a close match
-    for image_file in covers_dir.glob("*.jpg"):
-        # Remove file extension and compare
-        image_name = image_file.stem
-        if image_name.lower() == sanitized_title.lower():
-            return image_file.name
+    with METRICS.span('cover_stage', stage='find_matching_image'):
+        if index is None:
+            index = CoverIndex(covers_dir)
+        return index.find(title)
+
+def find_fuzzy_matches(books, results_mapping, cover_index, min_score):
+    """{title: (filename, confidence)} for books only a fuzzy match can place"""
+    from fuzzy_cover_match import FuzzyCoverMatcher
     
-    return None
+    unmatched = []
+    claimed = set()
+    for book in books:
+        filename = results_mapping.get(book['title'])
+        if not (filename and filename in cover_index):
+            filename = cover_index.find(book['title'])
+        if filename:
+            claimed.add(filename)
+        else:
+            unmatched.append(book)
+    orphans = cover_index.filenames - claimed
+    if not unmatched or not orphans:
+        return {}
+    return FuzzyCoverMatcher(orphans).assign(unmatched, min_score)
+
+def load_results_mapping(results_file='cover_extraction_results.json'):
+    """{title: filename} for successful downloads whose file is not named after the title
+
+    The results are streamed, and downloads saved under the expected name are
+    left out: the normalized title match finds those anyway, so the mapping
+    only grows with the exceptions, not with the catalog.
+    """
+    results_mapping = {}
+    results = METRICS.timed_iter(iter_records(results_file), 'cover_json_io', op='read',
+                                 file=os.path.basename(results_file))
+    for result in results:
+        if result.get('status') == 'success' and result.get('cover_image'):
+            # Extract just the filename from the path
+            cover_path = result['cover_image']
+            if '/' in cover_path or '\\' in cover_path:
+                filename = Path(cover_path).name
+            else:
+                filename = cover_path
+            if filename != f"{sanitize_filename(result['title'])}.jpg":
+                results_mapping[result['title']] = filename
+    return results_mapping
+
+def iter_books(catalog_file='book.json'):
+    """Stream the books of a catalog (book.json layout or JSONL)"""
+    return METRICS.timed_iter(iter_records(catalog_file, key='books'), 'cover_json_io', op='read',
+                              file=os.path.basename(catalog_file))
+
+class RenamePlan:
+    """Every rename the catalog asks for, worked out before any file is touched
+
+    ``entries`` has one (title, outcome, source, target) per book, in catalog
+    order; outcome is 'rename', 'already_named', 'not_found', 'duplicate' (the
+    same book again) or 'collision'. ``moves`` are the (source, target) pairs
+    that are safe to apply together, and ``collisions`` explain the rest as
+    (target or source, reason, titles).
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.moves = []
+        self.collisions = []
+        self.fuzzy = {}
+
+    def counts(self):
+        return Counter(outcome for _, outcome, _, _ in self.entries)
+
+def _collision_reason(titles):
+    if len({cover_filename(title) for title in titles}) > 1:
+        return "names differ only by case"
+    if len({title[:100] for title in titles}) == 1:
+        return "same first 100 characters (sanitize_filename truncates)"
+    return "same name once <>:\"/\\|?* are replaced"
+
+def plan_renames(books, cover_index, results_mapping=None, fuzzy_matches=None):
+    """Build the RenamePlan for a catalog
+
+    Target names are compared case-insensitively, so the plan is also safe on
+    Windows and macOS. Moves that would give two books the same file (titles
+    equal after sanitizing, e.g. beyond the 100-character truncation), give
+    one cover to two books, or replace a cover no move takes away are left
+    out as collisions. Chains and cycles among the remaining moves are fine:
+    the journal applies them together.
+    """
+    results_mapping = results_mapping or {}
+    fuzzy_matches = fuzzy_matches or {}
+    plan = RenamePlan()
+    wanted = []  # (entry index, title, source, target)
+    seen = {}
+    for book in books:
+        title = book['title']
+        if title in seen:
+            plan.entries.append((title, 'duplicate', seen[title], cover_filename(title)))
+            continue
+        # First, try to find the image using the results mapping
+        source = results_mapping.get(title)
+        if not (source and source in cover_index):
+            # Fall back to finding by normalized title match, then fuzzy
+            source = find_matching_image(title, cover_index.covers_dir, cover_index)
+            if not source and title in fuzzy_matches:
+                source, plan.fuzzy[title] = fuzzy_matches[title]
+        if not (source and source in cover_index):
+            plan.entries.append((title, 'not_found', None, None))
+            continue
+        seen[title] = source
+        target = cover_filename(title)
+        if source == target:
+            plan.entries.append((title, 'already_named', source, target))
+        else:
+            wanted.append((len(plan.entries), title, source, target))
+            plan.entries.append((title, 'rename', source, target))
 
-def rename_cover_images():
-    """Rename cover images to match book titles from book.json"""
+    def collide(items, key, reason):
+        plan.collisions.append((key, reason, [title for _, title, _, _ in items]))
+        for index, title, source, target in items:
+            plan.entries[index] = (title, 'collision', source, target)
+
+    # Names already in place keep their file
+    in_place = {target.casefold(): title for title, outcome, _, target in plan.entries if outcome == 'already_named'}
+    by_target, by_source = {}, {}
+    for item in wanted:
+        by_target.setdefault(item[3].casefold(), []).append(item)
+        by_source.setdefault(item[2].casefold(), []).append(item)
+    for key, items in by_target.items():
+        if key in in_place:
+            collide(items, items[0][3], f"already the cover of '{in_place[key]}'")
+        elif len(items) > 1:
+            collide(items, items[0][3], _collision_reason([title for _, title, _, _ in items]))
+    for key, items in by_source.items():
+        items = [item for item in items if plan.entries[item[0]][1] == 'rename']
+        if key in in_place and items:
+            collide(items, items[0][2], f"already the cover of '{in_place[key]}'")
+        elif len(items) > 1:
+            collide(items, items[0][2], "one cover matched by several books")
+    moves = wanted
+
+    # A target may only replace a cover that one of the moves takes away
+    existing = {filename.casefold(): filename for filename in cover_index.filenames}
+    while True:
+        moves = [item for item in moves if plan.entries[item[0]][1] == 'rename']
+        moved_away = {source.casefold() for _, _, source, _ in moves}
+        blocked = [item for item in moves
+                   if item[3].casefold() in existing and item[3].casefold() not in moved_away]
+        if not blocked:
+            break
+        for item in blocked:
+            collide([item], item[3], f"would replace {existing[item[3].casefold()]}, which stays where it is")
+    plan.moves = [(source, target) for _, _, source, target in moves]
+    return plan
+
+def rename_cover_images(fuzzy_min_score=None, catalog_file='book.json', dry_run=False, journal_dir=JOURNAL_DIR):
+    """Rename cover images to match book titles from book.json
+
+    The whole rename set is planned first (collisions are reported and left
+    alone), then applied as one journaled transaction: an interrupted run is
+    finished on the next start, and ``python rename_journal.py rollback``
+    restores the previous names. No image is copied; the journal keeps the
+    old names as hard links. With ``fuzzy_min_score`` set, books without an
+    exact or normalized match are matched to otherwise unclaimed covers by
+    trigram similarity.
+    """
     
-    # Read the book.json file
-    try:
-        with open('book.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print("Error: book.json not found!")
-        return
-    except json.JSONDecodeError:
-        print("Error: Invalid JSON in book.json!")
+    # Check the catalog file
+    if not os.path.exists(catalog_file):
+        print(f"Error: {catalog_file} not found!")
         return
     
-    books = data.get('books', [])
     covers_dir = Path('covers')
     
     if not covers_dir.exists():
         print("Error: covers directory not found!")
         return
     
-    print(f"Found {len(books)} books in book.json")
     print(f"Processing cover images in: {covers_dir}")
     
-    # Create backup directory
-    backup_dir = Path('covers_backup')
-    if not backup_dir.exists():
-        backup_dir.mkdir()
-        print(f"Created backup directory: {backup_dir}")
+    journal = RenameJournal(covers_dir, journal_dir)
+    try:
+        recovered = None if dry_run else journal.recover()
+    except JournalError as e:
+        print(f"❌ Could not resolve the interrupted rename: {e}")
+        print(f"   Inspect it with: python rename_journal.py status --journal-dir {journal_dir}")
+        return
+    if recovered:
+        action, tx = recovered
+        print(f"🔁 Interrupted rename {tx.id} ({len(tx.moves)} files) "
+              f"{'replayed' if action == 'replayed' else 'rolled back'}")
     
-    # Get list of existing cover images
-    existing_images = list(covers_dir.glob("*.jpg"))
-    print(f"Found {len(existing_images)} cover images")
+    # Snapshot the existing cover images once
+    cover_index = CoverIndex(covers_dir)
+    print(f"Found {len(cover_index)} cover images")
     
     # Read the extraction results to map successful downloads
     results_mapping = {}
     if os.path.exists('cover_extraction_results.json'):
         try:
-            with open('cover_extraction_results.json', 'r', encoding='utf-8') as f:
-                results = json.load(f)
-                for result in results:
-                    if result.get('status') == 'success' and result.get('cover_image'):
-                        # Extract just the filename from the path
-                        cover_path = result['cover_image']
-                        if '/' in cover_path or '\\' in cover_path:
-                            filename = Path(cover_path).name
-                        else:
-                            filename = cover_path
-                        results_mapping[result['title']] = filename
-        except:
+            results_mapping = load_results_mapping()
+        except (OSError, ValueError, KeyError):
             print("Warning: Could not read cover_extraction_results.json")
     
-    renamed_count = 0
-    not_found_count = 0
+    try:
+        fuzzy_matches = {}
+        if fuzzy_min_score is not None:
+            fuzzy_matches = find_fuzzy_matches(iter_books(catalog_file), results_mapping, cover_index,
+                                               fuzzy_min_score)
+            print(f"Fuzzy matched {len(fuzzy_matches)} books to unclaimed covers")
+        plan = plan_renames(iter_books(catalog_file), cover_index, results_mapping, fuzzy_matches)
+    except ValueError as e:
+        print(f"Error: Invalid JSON in {catalog_file}! ({e})")
+        return
     
-    for i, book in enumerate(books, 1):
-        title = book['title']
-        print(f"\n[{i}/{len(books)}] Processing: {title}")
-        
-        # First, try to find the image using the results mapping
-        current_filename = results_mapping.get(title)
-        if current_filename and (covers_dir / current_filename).exists():
-            current_path = covers_dir / current_filename
+    for i, (title, outcome, source, target) in enumerate(plan.entries, 1):
+        print(f"\n[{i}] Processing: {title}")
+        if title in plan.fuzzy and outcome != 'not_found':
+            print(f"  🔎 Fuzzy match ({plan.fuzzy[title]:.2f}): {source}")
+        if outcome == 'not_found':
+            print(f"  ❌ No cover image found for: {title}")
+        elif outcome == 'already_named':
+            print(f"  ✅ Already correctly named: {target}")
+        elif outcome == 'duplicate':
+            print(f"  ⚠️  Listed again in {catalog_file}; renamed once")
+        elif outcome == 'collision':
+            print(f"  ⚠️  Not renamed: {source} → {target} collides (see below)")
         else:
-            # Fall back to finding by sanitized title match
-            current_filename = find_matching_image(title, covers_dir)
-            if current_filename:
-                current_path = covers_dir / current_filename
-            else:
-                print(f"  ❌ No cover image found for: {title}")
-                not_found_count += 1
-                continue
-        
-        # Generate the new filename based on exact book title
-        new_filename = f"{sanitize_filename(title)}.jpg"
-        new_path = covers_dir / new_filename
-        
-        # Skip if already correctly named
-        if current_path.name == new_filename:
-            print(f"  ✅ Already correctly named: {new_filename}")
-            continue
-        
+            print(f"  {'📝 Would rename' if dry_run else '➡️  Renaming'}: {source} → {target}")
+    
+    if plan.collisions:
+        print(f"\n⚠️  {len(plan.collisions)} collisions, left as they are:")
+        for name, reason, titles in plan.collisions:
+            print(f"  {name}: {reason}")
+            for title in titles:
+                print(f"    - {title}")
+    
+    counts = plan.counts()
+    tx = None
+    if plan.moves and not dry_run:
         try:
-            # Create backup
-            backup_path = backup_dir / current_path.name
-            shutil.copy2(current_path, backup_path)
-            
-            # Rename the file
-            current_path.rename(new_path)
-            print(f"  ✅ Renamed: {current_path.name} → {new_filename}")
-            renamed_count += 1
-            
-        except Exception as e:
-            print(f"  ❌ Error renaming {current_path.name}: {e}")
+            with METRICS.span('cover_disk_write', op='rename'):
+                tx = journal.apply(plan.moves)
+        except (OSError, JournalError) as e:
+            METRICS.increment('cover_renames_total', len(plan.moves), result='error')
+            print(f"\n❌ Renaming failed and was rolled back: {e}")
+            return
+        for source, target in plan.moves:
+            cover_index.remove(source)
+        for source, target in plan.moves:
+            cover_index.add(target)
+        print(f"\n✅ Renamed {len(plan.moves)} files in transaction {tx.id}")
+    for outcome, result in (('rename', 'renamed'), ('already_named', 'already_named'),
+                            ('not_found', 'not_found'), ('collision', 'collision')):
+        if counts[outcome] and not dry_run:
+            METRICS.increment('cover_renames_total', counts[outcome], result=result)
     
     # Summary
     print(f"\n=== RENAMING SUMMARY ===")
-    print(f"Total books processed: {len(books)}")
-    print(f"Successfully renamed: {renamed_count}")
-    print(f"No cover image found: {not_found_count}")
-    print(f"Already correctly named: {len(books) - renamed_count - not_found_count}")
-    print(f"Backup copies saved to: {backup_dir}/")
+    print(f"Total books processed: {len(plan.entries)}")
+    print(f"{'To rename' if dry_run else 'Successfully renamed'}: {counts['rename']}")
+    print(f"No cover image found: {counts['not_found']}")
+    print(f"Already correctly named: {counts['already_named']}")
+    print(f"Collisions (not renamed): {counts['collision']}")
+    if counts['duplicate']:
+        print(f"Listed more than once: {counts['duplicate']}")
+    if tx:
+        labels = {'hardlink': 'hard links', 'reflink': 'reflinks', 'copy': 'copies'}
+        methods = ', '.join(f"{count} {labels[method]}" for method, count in journal.clone_methods.most_common())
+        print(f"Previous names kept in: {tx.path}/ ({methods}; undo with: python rename_journal.py rollback)")
     
     # Show final count of cover images
-    final_images = list(covers_dir.glob("*.jpg"))
-    print(f"Final count of cover images: {len(final_images)}")
+    print(f"Final count of cover images: {len(cover_index)}")
+    return plan
+
+def cover_filename(title):
+    """File name the cover of ``title`` has in covers/ after renaming"""
+    return f"{sanitize_filename(title)}.jpg"
+
+def mapping_entry(book, cover_exists, covers_dir=Path('covers')):
+    """One book_cover_mapping.json entry"""
+    filename = cover_filename(book['title'])
+    return {
+        'title': book['title'],
+        'author': book.get('author', 'Unknown'),
+        'condition': book.get('condition', 'Unknown'),
+        'cover_filename': filename,
+        'cover_exists': cover_exists,
+        'cover_path': str(covers_dir / filename) if cover_exists else None
+    }
 
-def create_mapping_report():
-    """Create a report showing the mapping between book titles and cover images"""
+def create_mapping_report(catalog_file='book.json', report_file='book_cover_mapping.json'):
+    """Create a report showing the mapping between book titles and cover images
+
+    Books are streamed from the catalog and report entries streamed to
+    ``report_file`` (JSON or JSONL by extension), so memory stays flat.
+    """
     
-    try:
-        with open('book.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except:
-        print("Error reading book.json")
+    if not os.path.exists(catalog_file):
+        print(f"Error reading {catalog_file}")
         return
     
-    books = data.get('books', [])
     covers_dir = Path('covers')
     
-    mapping_report = []
-    
-    for book in books:
-        title = book['title']
-        author = book.get('author', 'Unknown')
-        condition = book.get('condition', 'Unknown')
-        
-        # Check if cover exists
-        expected_filename = f"{sanitize_filename(title)}.jpg"
-        cover_path = covers_dir / expected_filename
-        
-        mapping_report.append({
-            'title': title,
-            'author': author,
-            'condition': condition,
-            'cover_filename': expected_filename,
-            'cover_exists': cover_path.exists(),
-            'cover_path': str(cover_path) if cover_path.exists() else None
-        })
-    
-    # Save the mapping report
-    with open('book_cover_mapping.json', 'w', encoding='utf-8') as f:
-        json.dump(mapping_report, f, indent=2, ensure_ascii=False)
+    total_books = 0
+    with_covers = 0
+    try:
+        with open_writer(report_file) as report:
+            for book in iter_books(catalog_file):
+                # Check if cover exists
+                cover_exists = (covers_dir / cover_filename(book['title'])).exists()
+                report.write(mapping_entry(book, cover_exists, covers_dir))
+                total_books += 1
+                with_covers += cover_exists
+    except ValueError as e:
+        print(f"Error reading {catalog_file}: {e}")
+        return
+    METRICS.observe('cover_json_io_seconds', report.seconds, op='write', file=os.path.basename(report_file))
     
     # Print summary
-    total_books = len(mapping_report)
-    with_covers = sum(1 for item in mapping_report if item['cover_exists'])
     without_covers = total_books - with_covers
     
     print(f"\n=== MAPPING REPORT ===")
     print(f"Total books: {total_books}")
     print(f"Books with covers: {with_covers}")
     print(f"Books without covers: {without_covers}")
-    print(f"Coverage: {(with_covers/total_books)*100:.1f}%")
-    print(f"Mapping report saved to: book_cover_mapping.json")
+    print(f"Coverage: {(with_covers / total_books) * 100 if total_books else 0:.1f}%")
+    print(f"Mapping report saved to: {report_file}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Rename cover images to match book.json titles")
+    parser.add_argument('--fuzzy', nargs='?', type=float, const=0.6, default=None, metavar='MIN_SCORE',
+                        help="also match remaining books to unclaimed covers by similarity (default 0.6)")
+    parser.add_argument('--metrics-prefix', default='rename_metrics',
+                        help="write metrics to <prefix>.prom and <prefix>.json")
+    parser.add_argument('--no-metrics', action='store_true', help="do not write metric files")
+    parser.add_argument('--dry-run', action='store_true', help="show the rename plan and collisions only")
+    parser.add_argument('--journal-dir', default=JOURNAL_DIR,
+                        help="where renames are journaled (undo with rename_journal.py rollback)")
+    args = parser.parse_args()
+    
     print("Book Cover Renamer")
     print("=" * 50)
     print("This script will:")
     print("1. Read book titles from book.json")
     print("2. Find matching cover images in covers/ directory")
-    print("3. Rename cover images to match exact book titles")
-    print("4. Create backups of original files")
+    print("3. Plan the renames and report name collisions")
+    print("4. Rename cover images to match exact book titles in one journaled step")
     print("5. Generate a mapping report")
     print("\nStarting process...")
     
-    # Step 1: Rename the cover images
-    rename_cover_images()
-    
-    # Step 2: Create mapping report
-    create_mapping_report()
+    with exporting(METRICS, None if args.no_metrics else args.metrics_prefix):
+        # Step 1: Rename the cover images
+        rename_cover_images(fuzzy_min_score=args.fuzzy, dry_run=args.dry_run, journal_dir=args.journal_dir)
+        
+        # Step 2: Create mapping report
+        if not args.dry_run:
+            create_mapping_report()
     
     print("\n✅ Process completed!")
     print("Check book_cover_mapping.json for the complete mapping report.")
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Rename Journal
+
+Applies a set of cover renames as one transaction that survives crashes,
+without copying any image bytes. Each transaction is a directory
+
+    .rename_journal/<id>/journal.jsonl   intent (every move) + progress markers, fsynced
+    .rename_journal/<id>/staged/<n>      hard link to the original file of move n
+
+and is applied in phases, each recorded in the journal once durable:
+
+    begin     the full list of (source, target) moves is written first
+    staged    every source has a hard link in staged/ (its inode is safe)
+    removed   every source name is unlinked
+    committed every target is linked to its staged inode
+
+Removing all sources before creating any target makes chains and cycles
+(a → b, b → a) safe, and os.link never overwrites, so a target that
+appeared in the meantime stops the transaction instead of being lost. Every
+step checks inodes (os.path.samefile) before touching a name, so a phase
+can be run again after a crash at any point:
+
+    replay()    rolls an interrupted transaction forward to committed
+    rollback()  puts every source back and removes the targets; also undoes
+                the latest committed transaction (repeat to go further back)
+
+recover() replays an interrupted transaction whose sources were all staged
+and rolls back one that was not. Committed transactions keep their staged
+links as the backup of the original names: hard links cost no space until
+the file is replaced, and purge() drops them. Where hard links are not
+possible (another filesystem, FAT), a reflink is tried on Linux and a byte
+copy is the last resort; the counts are reported.
+
+    python rename_journal.py status
+    python rename_journal.py rollback
+    python rename_journal.py purge
+"""
+
+import argparse
+import errno
+import filecmp
+import json
+import os
+import shutil
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+JOURNAL_DIR = '.rename_journal'
+JOURNAL_NAME = 'journal.jsonl'
+# Linux ioctl cloning a file's extents (btrfs, XFS): a copy that shares the bytes
+FICLONE = 0x40049409
+
+
+class JournalError(RuntimeError):
+    """A journaled rename cannot proceed without overwriting or losing a file"""
+
+
+def _fsync_dir(path):
+    # Directory entries are only durable once the directory is synced (not possible on Windows)
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _same(a, b):
+    """Whether ``a`` holds the file ``b`` does: the same inode, or (for copies) the same bytes"""
+    try:
+        return os.path.samefile(a, b) or filecmp.cmp(a, b, shallow=False)
+    except OSError:
+        return False
+
+
+def clone_file(source, target):
+    """Make ``target`` a hard link to ``source``, or a reflink, or a copy; return which"""
+    try:
+        os.link(source, target)
+        return 'hardlink'
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+            raise
+    # Cloned under a temporary name first, so a crash never leaves a partial target
+    tmp_path = f"{target}.part"
+    method = 'copy'
+    try:
+        if sys.platform.startswith('linux'):
+            import fcntl
+            with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+                try:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                    method = 'reflink'
+                except OSError:
+                    pass
+        if method == 'reflink':
+            shutil.copystat(source, tmp_path)
+        else:
+            shutil.copy2(source, tmp_path)
+        os.rename(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return method
+
+
+class Transaction:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.id = self.path.name
+        self.moves = []
+        self.markers = []
+        self.created = None
+        with open(self.path / JOURNAL_NAME, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # a marker torn by a crash was never durable
+                if record['op'] == 'begin':
+                    self.moves = [(move['source'], move['target']) for move in record['moves']]
+                    self.created = record['created']
+                else:
+                    self.markers.append(record['op'])
+
+    @property
+    def state(self):
+        return self.markers[-1] if self.markers else 'begin'
+
+    def staged(self, n):
+        return self.path / 'staged' / str(n)
+
+    def mark(self, op):
+        with open(self.path / JOURNAL_NAME, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'op': op, 'at': datetime.now().isoformat(timespec='seconds')}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.markers.append(op)
+
+
+class RenameJournal:
+    def __init__(self, covers_dir='covers', journal_dir=JOURNAL_DIR):
+        self.covers_dir = Path(covers_dir)
+        self.journal_dir = Path(journal_dir)
+        self.clone_methods = Counter()
+
+    def transactions(self):
+        """Transactions oldest first"""
+        if not self.journal_dir.exists():
+            return []
+        return [Transaction(path) for path in sorted(self.journal_dir.iterdir())
+                if (path / JOURNAL_NAME).exists()]
+
+    def pending(self):
+        """The interrupted transaction, if any (only the latest one can be)"""
+        transactions = self.transactions()
+        if transactions and transactions[-1].state not in ('committed', 'rolled_back'):
+            return transactions[-1]
+        return None
+
+    def _begin(self, moves):
+        tx_id = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        path = self.journal_dir / tx_id
+        (path / 'staged').mkdir(parents=True)
+        record = {'op': 'begin', 'created': datetime.now().isoformat(timespec='seconds'),
+                  'covers_dir': str(self.covers_dir),
+                  'moves': [{'source': source, 'target': target} for source, target in moves]}
+        tmp_path = path / f"{JOURNAL_NAME}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path / JOURNAL_NAME)
+        _fsync_dir(path)
+        _fsync_dir(self.journal_dir)
+        return Transaction(path)
+
+    def apply(self, moves):
+        """Rename ``moves`` [(source, target) file names in covers/] as one transaction
+
+        On any error the transaction is rolled back before the error is raised.
+        """
+        pending = self.pending()
+        if pending:
+            raise JournalError(f"transaction {pending.id} is unfinished; replay or roll it back first")
+        if not moves:
+            return None
+        tx = self._begin(moves)
+        try:
+            self._roll_forward(tx)
+        except BaseException:
+            self._roll_back(tx)
+            raise
+        return tx
+
+    def _roll_forward(self, tx):
+        covers = self.covers_dir
+        if tx.state == 'begin':
+            for n, (source, _) in enumerate(tx.moves):
+                staged = tx.staged(n)
+                if staged.exists():
+                    continue
+                if not (covers / source).exists():
+                    raise JournalError(f"{source} disappeared before it was staged")
+                self.clone_methods[clone_file(covers / source, staged)] += 1
+            _fsync_dir(tx.path / 'staged')
+            tx.mark('staged')
+        if tx.state == 'staged':
+            # No target exists yet, so every source name should still hold its original;
+            # all are checked before any is removed, so a refusal changes nothing
+            for n, (source, _) in enumerate(tx.moves):
+                if (covers / source).exists() and not _same(covers / source, tx.staged(n)):
+                    raise JournalError(f"{source} was replaced since transaction {tx.id}; not removing it")
+            for source, _ in tx.moves:
+                if (covers / source).exists():
+                    os.remove(covers / source)
+            _fsync_dir(covers)
+            tx.mark('removed')
+        if tx.state == 'removed':
+            for n, (_, target) in enumerate(tx.moves):
+                if _same(covers / target, tx.staged(n)):
+                    continue
+                if (covers / target).exists():
+                    raise JournalError(f"{target} already exists; refusing to overwrite it")
+                self.clone_methods[clone_file(tx.staged(n), covers / target)] += 1
+            _fsync_dir(covers)
+            tx.mark('committed')
+
+    def _roll_back(self, tx):
+        covers = self.covers_dir
+        # The phase reached before rolling back (also when a rollback was interrupted)
+        reached = next((op for op in reversed(tx.markers) if op != 'rolling_back'), 'begin')
+        # Targets still holding their staged file are removed first, which frees a target
+        # that is also another move's source
+        created = set()
+        if reached in ('removed', 'committed'):
+            created = {target for n, (_, target) in enumerate(tx.moves) if _same(covers / target, tx.staged(n))}
+        if reached != 'begin':
+            # Check every source name before changing anything, so a refusal leaves the tree as it is
+            for n, (source, _) in enumerate(tx.moves):
+                if ((covers / source).exists() and source not in created
+                        and not _same(covers / source, tx.staged(n))):
+                    raise JournalError(f"{source} was replaced since transaction {tx.id}; not restoring it")
+        tx.mark('rolling_back')
+        for target in created:
+            os.remove(covers / target)
+        if reached != 'begin':
+            for n, (source, _) in enumerate(tx.moves):
+                if not (covers / source).exists():
+                    clone_file(tx.staged(n), covers / source)
+            _fsync_dir(covers)
+        tx.mark('rolled_back')
+        shutil.rmtree(tx.path)
+
+    def replay(self):
+        """Finish the interrupted transaction; return it (None if there is none)"""
+        tx = self.pending()
+        if tx is None:
+            return None
+        if tx.state == 'rolling_back':
+            raise JournalError(f"transaction {tx.id} was being rolled back; roll it back")
+        self._roll_forward(tx)
+        return tx
+
+    def rollback(self):
+        """Undo the interrupted transaction, or else the latest committed one; return it"""
+        transactions = self.transactions()
+        if not transactions:
+            return None
+        tx = transactions[-1]
+        if tx.state == 'committed':
+            # Only undo what is still as the transaction left it
+            for n, (_, target) in enumerate(tx.moves):
+                if not _same(self.covers_dir / target, tx.staged(n)):
+                    raise JournalError(f"{target} changed since transaction {tx.id}; not rolling back")
+        self._roll_back(tx)
+        return tx
+
+    def recover(self):
+        """Resolve an interrupted transaction: ('replayed' | 'rolled_back', tx), or None"""
+        tx = self.pending()
+        if tx is None:
+            return None
+        if tx.state in ('staged', 'removed'):
+            self._roll_forward(tx)
+            return 'replayed', tx
+        self._roll_back(tx)
+        return 'rolled_back', tx
+
+    def purge(self):
+        """Drop committed transactions (and the original names they keep); return how many"""
+        purged = 0
+        for tx in self.transactions():
+            if tx.state == 'committed':
+                shutil.rmtree(tx.path)
+                purged += 1
+        return purged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, replay or roll back journaled cover renames")
+    parser.add_argument('command', choices=('status', 'replay', 'rollback', 'purge'))
+    parser.add_argument('--covers-dir', default='covers')
+    parser.add_argument('--journal-dir', default=JOURNAL_DIR)
+    args = parser.parse_args()
+
+    journal = RenameJournal(args.covers_dir, args.journal_dir)
+    try:
+        if args.command == 'status':
+            transactions = journal.transactions()
+            if not transactions:
+                print("No journaled renames")
+            for tx in transactions:
+                print(f"{tx.id}  {tx.state:<12} {len(tx.moves)} renames  (created {tx.created})")
+        elif args.command == 'replay':
+            tx = journal.replay()
+            print(f"✅ Replayed {tx.id}: {len(tx.moves)} renames committed" if tx else "Nothing to replay")
+        elif args.command == 'rollback':
+            tx = journal.rollback()
+            print(f"↩️  Rolled back {tx.id}: {len(tx.moves)} files have their previous names"
+                  if tx else "Nothing to roll back")
+        else:
+            print(f"🧹 Purged {journal.purge()} committed transactions")
+    except JournalError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
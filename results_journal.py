@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Scrape Results Journal
+
+Append-only JSONL journal of per-book scraper outcomes. Every result is
+written (and flushed) as soon as it is known, with fsync batched every few
+records, so an interrupted run keeps all of its completed network work and a
+resumed run only processes the missing books. Entries carry the hash of the
+book record they answer (seed_sync.record_hash), so a book whose url or author
+was edited is processed again although its title is unchanged.
+"""
+
+import json
+import os
+import threading
+import time
+
+JOURNAL_FILE = 'cover_extraction_journal.jsonl'
+
+# Outcomes that are a definitive answer for a title; anything else is retried on resume
+RESOLVED_STATUSES = ('success', 'not_found', 'no_cover')
+
+
+class ResultsJournal:
+    def __init__(self, path=JOURNAL_FILE, fsync_every=20, fsync_interval=5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._reader = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def resolved_offsets(self):
+        """{title: (byte offset, record hash)} of the latest entry, for titles whose latest outcome
+        is resolved; the hash is None for entries written without one
+
+        Keeps one offset per title instead of every result, so resuming a large
+        catalog reads earlier results back with ``read_at`` as they are needed.
+        """
+        offsets = {}
+        if not os.path.exists(self.path):
+            return offsets
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                start, offset = offset, offset + len(line)
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    # A crash can leave a torn final line; everything before it is intact
+                    continue
+                if result.get('status') in RESOLVED_STATUSES:
+                    offsets[result['title']] = (start, result.get('record_hash'))
+                else:
+                    offsets.pop(result['title'], None)
+        return offsets
+
+    def read_at(self, offset):
+        """The entry starting at ``offset`` (from ``resolved_offsets``)"""
+        if self._reader is None:
+            self._reader = open(self.path, 'rb')
+        self._reader.seek(offset)
+        entry = json.loads(self._reader.readline())
+        entry.pop('record_hash', None)
+        return entry
+
+    def open(self, resume=False):
+        """Open the journal for appending; a fresh run starts an empty journal"""
+        if resume:
+            self._drop_torn_tail()
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        return self
+
+    def _drop_torn_tail(self):
+        """Cut a torn final line back to the last newline, so the next entry starts on its own line"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - 64 * 1024)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b'\n')
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                f.truncate(position)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def append(self, result, record_hash=None):
+        """Write one result (for the book record with ``record_hash``) and fsync once enough
+        records or time have accumulated"""
+        entry = {**result, 'record_hash': record_hash} if record_hash else result
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            if (self._pending >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            if self._file is None:
+                return
+            if self._pending:
+                self._sync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
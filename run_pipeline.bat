@@ -0,0 +1,7 @@
+@echo off
+echo Running the cover pipeline (scrape, rename, mapping report, seed)...
+echo Stages whose inputs did not change since the last run are skipped.
+echo.
+python run_pipeline.py %*
+
+pause
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Cover Pipeline Runner
+
+Runs the cover pipeline without prompts, as stages with declared inputs and
+outputs:
+
+    scrape   book.json                                   → cover_extraction_results.json, covers/
+    rename   book.json, cover_extraction_results.json, covers/ → covers/
+    mapping  book.json, covers/                          → book_cover_mapping.json
+    search   book.json, podcast.json                     → catalog_search.db (search_index.py)
+    seed     book.json, podcast.json                     → (API database, via seed_sync.py)
+
+Before a stage runs, its inputs are fingerprinted and compared with what they
+were right after its last successful run (.pipeline_state.json). A stage is
+skipped when they are unchanged and its outputs still exist; outputs are not
+compared, because later stages rewrite them (rename renames files in covers/).
+A scrape that leaves books unresolved (throttled, error, download_failed) is
+not recorded, so the next run resumes it even when book.json is unchanged.
+Re-running after a one-book edit only resumes the scraper for that book (the
+results journal keeps the rest, by title and record hash, so an edited url or
+author is scraped again), renames, rebuilds the report and sends a one-record
+delta.
+
+Files are fingerprinted by content hash, reusing the stored hash while their
+size and mtime are unchanged; directories by a listing of (name, size,
+mtime).
+
+    python run_pipeline.py
+    python run_pipeline.py --workers 8 --api-url https://localhost:7140
+    python run_pipeline.py --stages rename mapping --force
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from pipeline_metrics import METRICS, exporting
+from results_journal import RESOLVED_STATUSES
+
+STATE_FILE = '.pipeline_state.json'
+# A stage result: later stages may run, but this one is not recorded as done
+INCOMPLETE = 'incomplete'
+
+
+class FingerprintCache:
+    """Content hashes of files, keyed by path and reused while size/mtime hold"""
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    def file(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        cached = self.entries.get(path)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        self.entries[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                              'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def directory(self, path):
+        if not os.path.isdir(path):
+            return None
+        listing = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    listing.append(f"{entry.name}\0{stat.st_size}\0{stat.st_mtime_ns}")
+        listing.sort()
+        return hashlib.sha256('\n'.join(listing).encode('utf-8')).hexdigest()
+
+    def path(self, path):
+        return self.directory(path) if path.endswith('/') else self.file(path)
+
+
+class Stage:
+    """A pipeline step; paths ending in '/' are directories"""
+
+    def __init__(self, name, inputs, outputs, run, params=None):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.run = run
+        self.params = params or {}
+
+    def fingerprint(self, cache):
+        return {
+            'inputs': {path: cache.path(path) for path in self.inputs},
+            'params': self.params,
+        }
+
+    def outputs_exist(self):
+        return all(os.path.exists(path) for path in self.outputs)
+
+
+def run_scrape(args):
+    from amazon_book_cover_scraper import AmazonBookCoverScraper
+    scraper = AmazonBookCoverScraper(args.amazon_url, args.max_per_host, args.rate,
+                                     source_urls={'openlibrary': args.openlibrary_url,
+                                                  'googlebooks': args.googlebooks_url})
+    # The results journal keeps every resolved title, so only new or edited books hit the network
+    statuses = scraper.process_books(workers=args.workers, resume=True)
+    if statuses is None:
+        return False
+    unresolved = {status: count for status, count in statuses.items() if status not in RESOLVED_STATUSES}
+    if unresolved:
+        print(f"Unresolved books: {unresolved}")
+        return INCOMPLETE
+    return True
+
+
+def run_rename(args):
+    from rename_covers import rename_cover_images
+    # None when the renames could not be planned or applied (and were rolled back)
+    return rename_cover_images(fuzzy_min_score=args.fuzzy) is not None
+
+
+def run_mapping(args):
+    from rename_covers import create_mapping_report
+    create_mapping_report()
+    return os.path.exists('book_cover_mapping.json')
+
+
+def run_search(args):
+    from search_index import SearchIndex
+    with SearchIndex() as index:
+        summary = index.build()
+    print(f"Search index: {summary['added']} added, {summary['updated']} updated, {summary['removed']} removed")
+    return True
+
+
+def run_seed(args):
+    import urllib3
+    from seed_sync import SyncState, create_session, sync_catalog
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    state = SyncState()
+    session = create_session(workers=4)
+    summaries = [sync_catalog(catalog, args.api_url, state, session) for catalog in ('books', 'podcasts')]
+    return not any(summary['failed_batches'] for summary in summaries)
+
+
+def build_stages(args):
+    stages = [
+        Stage('scrape', ['book.json'], ['cover_extraction_results.json', 'covers/'], run_scrape),
+        Stage('rename', ['book.json', 'cover_extraction_results.json', 'covers/'], ['covers/'], run_rename,
+              {'fuzzy': args.fuzzy}),
+        Stage('mapping', ['book.json', 'covers/'], ['book_cover_mapping.json'], run_mapping),
+        Stage('search', ['book.json', 'podcast.json'], ['catalog_search.db'], run_search),
+    ]
+    if args.api_url:
+        stages.append(Stage('seed', ['book.json', 'podcast.json'], [], run_seed, {'api_url': args.api_url}))
+    return stages
+
+
+def load_state(path=STATE_FILE):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'stages': {}, 'files': {}}
+
+
+def save_state(state, path=STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def run_pipeline(args):
+    """Run the selected stages in order; return True when all succeeded or were skipped"""
+    state = load_state(args.state_file)
+    cache = FingerprintCache(state.get('files'))
+    stages = [stage for stage in build_stages(args) if not args.stages or stage.name in args.stages]
+
+    for stage in stages:
+        current = stage.fingerprint(cache)
+        if not args.force and state['stages'].get(stage.name) == current and stage.outputs_exist():
+            print(f"⏭️  {stage.name}: inputs unchanged, skipped")
+            METRICS.increment('pipeline_stages_total', stage=stage.name, result='skipped')
+            continue
+        if args.dry_run:
+            print(f"▶️  {stage.name}: would run")
+            continue
+
+        print(f"\n▶️  {stage.name}")
+        started = time.perf_counter()
+        try:
+            with METRICS.span('pipeline_stage', stage=stage.name):
+                ok = stage.run(args)
+        except Exception as e:
+            print(f"❌ {stage.name} failed: {e}")
+            ok = False
+        if not ok:
+            METRICS.increment('pipeline_stages_total', stage=stage.name, result='failed')
+            print(f"❌ {stage.name} did not complete; later stages were not run")
+            save_state({'stages': state['stages'], 'files': cache.entries}, args.state_file)
+            return False
+        if ok == INCOMPLETE:
+            # Not fingerprinted, so the next run retries it even with unchanged inputs
+            state['stages'].pop(stage.name, None)
+            METRICS.increment('pipeline_stages_total', stage=stage.name, result='incomplete')
+            print(f"⚠️  {stage.name} left work unresolved; it will run again next time")
+            save_state({'stages': state['stages'], 'files': cache.entries}, args.state_file)
+            continue
+
+        # Record the inputs as they are now, including the stage's own writes
+        state['stages'][stage.name] = stage.fingerprint(cache)
+        save_state({'stages': state['stages'], 'files': cache.entries}, args.state_file)
+        METRICS.increment('pipeline_stages_total', stage=stage.name, result='ran')
+        print(f"✅ {stage.name} finished in {time.perf_counter() - started:.1f}s")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the cover pipeline, skipping unchanged stages")
+    parser.add_argument('--stages', nargs='+', choices=['scrape', 'rename', 'mapping', 'search', 'seed'],
+                        help="only consider these stages (default: all)")
+    parser.add_argument('--force', action='store_true', help="run stages even when their inputs are unchanged")
+    parser.add_argument('--dry-run', action='store_true', help="only report which stages would run")
+    parser.add_argument('--state-file', default=STATE_FILE)
+    parser.add_argument('--workers', type=int, default=1, help="scraper workers")
+    parser.add_argument('--max-per-host', type=int, default=2)
+    parser.add_argument('--rate', type=float, default=1.0, help="scraper requests per second per host")
+    parser.add_argument('--amazon-url', default='https://www.amazon.com', help="Amazon base URL (or a stand-in)")
+    parser.add_argument('--openlibrary-url', help="Open Library base URL (or a stand-in)")
+    parser.add_argument('--googlebooks-url', help="Google Books API base URL (or a stand-in)")
+    parser.add_argument('--fuzzy', nargs='?', type=float, const=0.6, default=None, metavar='MIN_SCORE',
+                        help="let the renamer fuzzy-match remaining books")
+    parser.add_argument('--api-url', help="seed this API with the catalog delta (seed stage runs only when set)")
+    parser.add_argument('--metrics-prefix', default='cover_metrics')
+    args = parser.parse_args()
+
+    if not os.path.exists('book.json'):
+        print("Error: book.json file not found!")
+        sys.exit(1)
+
+    with exporting(METRICS, args.metrics_prefix):
+        ok = run_pipeline(args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
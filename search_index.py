@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Catalog Search Index
+
+Compiles book.json and podcast.json into an SQLite FTS5 database so titles,
+authors/hosts and descriptions can be searched without scanning the JSON:
+
+    python search_index.py build                          # (re)build catalog_search.db
+    python search_index.py search "الاكتئاب"
+    python search_index.py search "anxiety workbook" --kind book --condition stress
+
+    index = SearchIndex()
+    index.search('mindfulness', conditions=['anxiety', 'stress'], match_all=True)
+
+Mixed Arabic/English text is normalized in Python before it is indexed, and
+queries go through the same normalize_text(), so both sides agree:
+case folding, NFKC, Arabic diacritics and tatweel removed, alef/yeh/teh
+marbuta/hamza carrier variants unified, Arabic-Indic digits mapped to ASCII
+and the definite article (with attached و ف ب ك ل) stripped, so "اكتئاب"
+matches "الاكتئاب" and "بالقلق" matches "قلق". FTS5's unicode61 tokenizer
+then splits words and drops Latin diacritics ("Brene" finds "Brené").
+
+Records that match in the title or author rank above records that match
+only through their description (or across columns); within each tier, BM25
+orders them, weighting title above author above description. Every query
+term is a prefix match. Ranking the title/author tier first keeps queries
+for common words fast(er): the far larger description-only set is only scored
+when the first tier cannot fill the page. Conditions live in
+their own indexed table, so condition filters (any or all of a list) apply
+inside the query.
+
+Builds are incremental: each record's hash is stored next to it and only
+added, changed or removed records touch the index, in one transaction.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+
+from catalog import parse_conditions
+from catalog_io import iter_records
+from seed_sync import CATALOGS, record_hash
+
+INDEX_FILE = 'catalog_search.db'
+
+# catalog name in seed_sync.CATALOGS: record kind stored in the index
+KINDS = {'books': 'book', 'podcasts': 'podcast'}
+
+# Title, author, description weights for bm25()
+RANK_WEIGHTS = (10.0, 4.0, 1.0)
+
+_ARABIC_MARKS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_ARABIC_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',  # alef with hamza/madda/wasla → alef
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',  # alef maqsura, hamza carriers, teh marbuta
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    **{chr(0x06f0 + i): str(i) for i in range(10)},
+})
+# Definite article, optionally after a conjunction/preposition, before a word of 2+ letters
+_ARABIC_ARTICLE = re.compile(r'(?<![\w])(?:[\u0648\u0641\u0628\u0643\u0644]?\u0627\u0644|\u0644\u0644)(?=[\u0621-\u064a]{2})')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT,
+    author TEXT,
+    description TEXT,
+    url TEXT,
+    conditions TEXT,
+    UNIQUE (kind, key)
+);
+CREATE TABLE IF NOT EXISTS record_conditions (
+    record_id INTEGER NOT NULL REFERENCES records(id) ON DELETE CASCADE,
+    condition TEXT NOT NULL,
+    PRIMARY KEY (condition, record_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS record_conditions_record ON record_conditions(record_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+    title, author, description,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '3'
+);
+"""
+
+
+def normalize_text(text):
+    """Search form of a title/author/description or a query"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _ARABIC_MARKS.sub('', text).translate(_ARABIC_LETTERS)
+    return _ARABIC_ARTICLE.sub('', text)
+
+
+def _match_expression(query):
+    """FTS5 MATCH expression: every normalized term as a quoted prefix, ANDed"""
+    terms = re.findall(r'\w+', normalize_text(query))
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+class SearchIndex:
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _records(self, catalog, json_file):
+        """(key, record) pairs of one catalog file, streamed"""
+        for array, key_field in CATALOGS[catalog][2]:
+            for record in iter_records(json_file, key=array):
+                key = record.get(key_field)
+                if key:
+                    yield key, record
+
+    def build(self, books_path=None, podcasts_path=None):
+        """Bring the index in line with the catalogs; return {added, updated, removed, unchanged}"""
+        paths = {'books': books_path or CATALOGS['books'][0],
+                 'podcasts': podcasts_path or CATALOGS['podcasts'][0]}
+        summary = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        with self.conn:
+            for catalog, json_file in paths.items():
+                if not os.path.exists(json_file):
+                    print(f"⚠️  {json_file} not found, {catalog} left as indexed")
+                    continue
+                kind = KINDS[catalog]
+                indexed = dict(self.conn.execute('SELECT key, hash FROM records WHERE kind = ?', (kind,)))
+                seen = set()
+                for key, record in self._records(catalog, json_file):
+                    seen.add(key)
+                    digest = record_hash(record)
+                    previous = indexed.get(key)
+                    if previous == digest:
+                        summary['unchanged'] += 1
+                        continue
+                    if previous:
+                        self._delete(kind, key)
+                    self._insert(kind, key, digest, record)
+                    indexed[key] = digest
+                    summary['updated' if previous else 'added'] += 1
+                removed = [key for key in indexed if key not in seen]
+                for key in removed:
+                    self._delete(kind, key)
+                summary['removed'] += len(removed)
+        return summary
+
+    def _insert(self, kind, key, digest, record):
+        # Podcasts use name/host; the books inside podcast.json use title/author
+        title = record.get('title') or record.get('name')
+        author = record.get('author') or record.get('host')
+        conditions = parse_conditions(record.get('condition'))
+        cursor = self.conn.execute(
+            'INSERT INTO records (kind, key, hash, title, author, description, url, conditions) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (kind, key, digest, title, author, record.get('description'), record.get('url'),
+             ', '.join(conditions)))
+        record_id = cursor.lastrowid
+        self.conn.execute('INSERT INTO records_fts (rowid, title, author, description) VALUES (?, ?, ?, ?)',
+                          (record_id, normalize_text(title), normalize_text(author),
+                           normalize_text(record.get('description'))))
+        self.conn.executemany('INSERT INTO record_conditions (record_id, condition) VALUES (?, ?)',
+                              [(record_id, condition) for condition in conditions])
+
+    def _delete(self, kind, key):
+        row = self.conn.execute('SELECT id FROM records WHERE kind = ? AND key = ?', (kind, key)).fetchone()
+        if row:
+            self.conn.execute('DELETE FROM records_fts WHERE rowid = ?', row)
+            self.conn.execute('DELETE FROM records WHERE id = ?', row)
+
+    def search(self, query, kind=None, conditions=(), match_all=False, limit=20, offset=0):
+        """Best matches for ``query`` as dicts, optionally only one kind ('book'/'podcast')
+        and records with any (or, with match_all, all) of ``conditions``"""
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        # Records matching in title/author come first, so the common case ranks only
+        # those; the rest are ranked only when they are needed to fill the page
+        wanted = limit + offset
+        results = self._ranked(f'{{title author}} : ({expression})', kind, conditions, match_all, wanted)
+        if len(results) < wanted:
+            rest = f'({expression}) NOT {{title author}} : ({expression})'
+            results += self._ranked(rest, kind, conditions, match_all, wanted - len(results))
+        return results[offset:]
+
+    def _ranked(self, expression, kind, conditions, match_all, limit):
+        # Rank inside the FTS query and join only the top rows with their records;
+        # filters are checked per match, so bm25() only runs for rows that pass them
+        joins, filters, params = '', [], [expression]
+        if kind:
+            joins = 'JOIN records k ON k.id = records_fts.rowid'
+            filters.append('AND k.kind = ?')
+            params.append(kind)
+        wanted = parse_conditions(list(conditions))
+        if wanted:
+            placeholders = ', '.join('?' * len(wanted))
+            filters.append(f'AND (SELECT COUNT(*) FROM record_conditions c WHERE c.record_id = records_fts.rowid '
+                           f'AND c.condition IN ({placeholders})) >= ?')
+            params.extend(wanted)
+            params.append(len(wanted) if match_all else 1)
+        params.append(limit)
+        sql = (f'SELECT r.kind, r.key, r.title, r.author, r.description, r.url, r.conditions, top.score '
+               f'FROM (SELECT records_fts.rowid AS id, '
+               f'bm25(records_fts, {", ".join(map(str, RANK_WEIGHTS))}) AS score '
+               f'FROM records_fts {joins} WHERE records_fts MATCH ? {" ".join(filters)} '
+               f'ORDER BY score LIMIT ?) top '
+               f'JOIN records r ON r.id = top.id ORDER BY top.score')
+
+        columns = ('kind', 'key', 'title', 'author', 'description', 'url', 'conditions', 'score')
+        results = []
+        for row in self.conn.execute(sql, params):
+            result = dict(zip(columns, row))
+            result['conditions'] = result['conditions'].split(', ') if result['conditions'] else []
+            # bm25() is lower-is-better; report higher-is-better
+            result['score'] = round(-result['score'], 4)
+            results.append(result)
+        return results
+
+    def stats(self):
+        counts = dict(self.conn.execute('SELECT kind, COUNT(*) FROM records GROUP BY kind'))
+        return {'records': counts, 'bytes': os.path.getsize(self.path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the catalog search index")
+    parser.add_argument('--index', default=INDEX_FILE, help="index database path")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="index book.json and podcast.json (incremental)")
+    build.add_argument('--books', help="books catalog (default: book.json)")
+    build.add_argument('--podcasts', help="podcasts catalog (default: podcast.json)")
+
+    search = subparsers.add_parser('search', help="query the index")
+    search.add_argument('query')
+    search.add_argument('--kind', choices=['book', 'podcast'])
+    search.add_argument('--condition', action='append', default=[], help="filter by condition (repeatable)")
+    search.add_argument('--all', action='store_true', help="require every --condition instead of any")
+    search.add_argument('--limit', type=int, default=10)
+    search.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    with SearchIndex(args.index) as index:
+        if args.command == 'build':
+            start = time.perf_counter()
+            summary = index.build(args.books, args.podcasts)
+            print(f"✅ Index updated in {time.perf_counter() - start:.2f}s: {summary['added']} added, "
+                  f"{summary['updated']} updated, {summary['removed']} removed, {summary['unchanged']} unchanged")
+            print(f"   {index.stats()['records']} in {args.index}")
+            return
+
+        start = time.perf_counter()
+        results = index.search(args.query, kind=args.kind, conditions=args.condition,
+                               match_all=args.all, limit=args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+            return
+        print(f"{len(results)} results in {elapsed:.1f} ms")
+        for result in results:
+            print(f"  [{result['kind']}] {result['title']} — {result['author']}  ({result['score']})")
+            if result['conditions']:
+                print(f"      {', '.join(result['conditions'])}")
+
+
+if __name__ == "__main__":
+    main()
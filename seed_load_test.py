@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""
+Seed API Load Tester
+
+Drives the endpoints the seeding scripts call (seed_books.py,
+seed_podcasts.py) and the book cover endpoint with concurrent asyncio
+traffic, and reports latency percentiles, throughput and error rates:
+
+    GET  /api/Seed/books/count        books_count       (totalBooks in the response)
+    GET  /api/Seed/podcasts/count     podcasts_count    (totalPodcasts)
+    POST /api/Seed/books/refresh      books_refresh     (totalBooks)
+    POST /api/Seed/podcasts/refresh   podcasts_refresh  (totalPodcasts)
+    GET  /api/Book/cover/{title}      book_cover        (an image; titles from book.json)
+
+Two workload models:
+
+    python seed_load_test.py --concurrency 32 --duration 30          # closed: 32 users, back to back
+    python seed_load_test.py --rate 200 --duration 30                # open: 200 req/s Poisson arrivals
+    python seed_load_test.py --rate 50 --mix books_count=9,books_refresh=1 --allow-refresh --output load.json
+
+In the closed model each of --concurrency users sends a request, waits for
+the answer (and --think seconds), then sends the next, so a slow server gets
+fewer requests. In the open model requests arrive at --rate per second
+(Poisson, or evenly spaced with --arrivals uniform) whether or not earlier
+ones have finished, like independent clients do; latency is measured from a
+request's scheduled time, so time spent waiting for a connection counts
+(no coordinated omission). --mix picks each request's operation by weight.
+The refresh operations delete and re-seed the API's whole catalog, so they
+are not in the default mix and are only sent with --allow-refresh.
+
+Latencies go into HDR-style histograms (log buckets with linear sub-buckets,
+3 significant digits) per operation. Requests that started during --warmup
+are not recorded. A response is an error if it is not a 200 with the field
+(or image) listed above; timeouts, connection errors and requests dropped
+beyond --max-in-flight are errors too. --hgrm writes the full percentile
+distribution in HdrHistogram's text format for plotting.
+
+The client is plain asyncio streams with keep-alive connections (at most
+--connections), so nothing beyond the standard library is needed; https is
+not verified, like the seeding scripts (the API's dev certificate). Use
+benchmarks/seed_standin.py to try it without the ASP.NET app:
+
+    python benchmarks/seed_standin.py --port 8766 --write-latency 0.2
+    python seed_load_test.py --base-url http://127.0.0.1:8766 --rate 300 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import ssl
+from collections import Counter
+from datetime import datetime
+from urllib.parse import quote, urlsplit
+
+from catalog_io import iter_records
+
+DEFAULT_BASE_URL = "https://localhost:7140"
+DEFAULT_MIX = 'books_count=40,podcasts_count=20,book_cover=40'
+# Operations that clear and re-seed the catalog: never sent without --allow-refresh
+DESTRUCTIVE_OPERATIONS = ('books_refresh', 'podcasts_refresh')
+REPORTED_PERCENTILES = (50, 75, 90, 95, 99, 99.9, 99.99)
+
+
+def _json_field(field):
+    def check(headers, body):
+        try:
+            return field in json.loads(body)
+        except ValueError:
+            return False
+    return check
+
+
+def _image(headers, body):
+    return headers.get('content-type', '').startswith('image/') and len(body) > 0
+
+
+# operation: (method, path, response check)
+OPERATIONS = {
+    'books_count': ('GET', '/api/Seed/books/count', _json_field('totalBooks')),
+    'podcasts_count': ('GET', '/api/Seed/podcasts/count', _json_field('totalPodcasts')),
+    'books_refresh': ('POST', '/api/Seed/books/refresh', _json_field('totalBooks')),
+    'podcasts_refresh': ('POST', '/api/Seed/podcasts/refresh', _json_field('totalPodcasts')),
+    'book_cover': ('GET', '/api/Book/cover/{title}', _image),
+}
+
+
+def parse_mix(spec):
+    """'books_count=40,book_cover=60' → {'books_count': 40.0, 'book_cover': 60.0}"""
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation '{name}' (known: {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("the mix needs at least one operation with a positive weight")
+    return mix
+
+
+class LatencyHistogram:
+    """HDR-style latency histogram in microseconds
+
+    A value v is counted in the bucket of width 2**shift that holds it, where
+    shift keeps v >> shift below 2**sub_bits: fixed relative precision
+    (significant_digits) at any magnitude, in memory that grows with the
+    range of values rather than their number. Exact count, min, max and mean.
+    """
+
+    def __init__(self, significant_digits=3):
+        self.sub_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.counts = Counter()
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, seconds):
+        value = max(1, round(seconds * 1e6))
+        shift = max(0, value.bit_length() - self.sub_bits)
+        self.counts[(value >> shift) << shift] += 1
+        self.total += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _highest_equivalent(self, lowest):
+        return lowest + (1 << max(0, lowest.bit_length() - self.sub_bits)) - 1
+
+    def percentile(self, percentile):
+        """Latency (seconds) that ``percentile`` % of the values do not exceed"""
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(round(percentile / 100 * self.total, 6)))
+        seen = 0
+        for lowest in sorted(self.counts):
+            seen += self.counts[lowest]
+            if seen >= rank:
+                return min(self._highest_equivalent(lowest), self.max) / 1e6
+        return self.max / 1e6
+
+    def mean(self):
+        return self.sum / self.total / 1e6 if self.total else None
+
+    def percentiles(self, percentiles=REPORTED_PERCENTILES):
+        return {f"p{p:g}": self.percentile(p) for p in percentiles}
+
+    def distribution(self, ticks_per_half=5):
+        """[(value seconds, percentile, count at or below)], spaced like HdrHistogram's
+        percentile output: finer and finer towards the tail"""
+        if not self.total:
+            return []
+        buckets = sorted(self.counts.items())
+        rows = []
+        percentile, seen, index = 0.0, 0, 0
+        while True:
+            rank = max(1, math.ceil(round(percentile / 100 * self.total, 6)))
+            while seen < rank:
+                seen += buckets[index][1]
+                index += 1
+            if seen >= self.total:
+                break
+            rows.append((self._highest_equivalent(buckets[index - 1][0]) / 1e6, percentile, seen))
+            half_distance = 2 ** (math.floor(math.log2(100 / (100 - percentile))) + 1)
+            percentile += 100 / (ticks_per_half * half_distance)
+        rows.append((self.max / 1e6, 100.0, self.total))
+        return rows
+
+    def write_hgrm(self, f, unit_ratio=1e3):
+        """HdrHistogram percentile distribution text (values in ms by default)"""
+        f.write(f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}\n\n")
+        for value, percentile, count in self.distribution():
+            inverse = 1 / (1 - percentile / 100) if percentile < 100 else float('inf')
+            f.write(f"{value * unit_ratio:12.3f} {percentile / 100:14.12f} {count:10d} {inverse:14.2f}\n")
+        mean = self.mean() or 0.0
+        f.write(f"#[Mean    = {mean * unit_ratio:12.3f}, Max   = {self.max / 1e6 * unit_ratio:12.3f}]\n")
+        f.write(f"#[Total count    = {self.total:12d}]\n")
+
+
+class AsyncHttpClient:
+    """Minimal HTTP/1.1 client over asyncio streams with a pool of keep-alive connections"""
+
+    def __init__(self, base_url, max_connections=64, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.host_header = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.ssl = None
+        if self.https:
+            self.ssl = ssl.create_default_context()
+            self.ssl.check_hostname = False
+            self.ssl.verify_mode = ssl.CERT_NONE
+        self.connections_opened = 0
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _connect(self):
+        connection = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        self.connections_opened += 1
+        return connection
+
+    async def request(self, method, path, body=b''):
+        """(status, headers with lowercase names, body); raises on timeouts and connection errors"""
+        async with self._slots:
+            return await asyncio.wait_for(self._request(method, path, body), self.timeout)
+
+    async def _request(self, method, path, body):
+        for attempt in range(2):
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else await self._connect()
+            try:
+                status, headers, content, keep_alive = await self._exchange(reader, writer, method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                # The server may close an idle keep-alive connection as we reuse it
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, headers, content
+
+    async def _exchange(self, reader, writer, method, path, body):
+        head = (f"{method} {self.prefix}{path} HTTP/1.1\r\nHost: {self.host_header}\r\n"
+                f"Accept: */*\r\nContent-Length: {len(body)}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed before the response")
+        version, status = status_line.split(b' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            content = b''.join(chunks)
+        elif 'content-length' in headers:
+            content = await reader.readexactly(int(headers['content-length']))
+        elif int(status) in (204, 304):
+            content = b''
+        else:
+            content = await reader.read()
+            keep_alive = False
+        return int(status), headers, content, keep_alive
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class Recorder:
+    """Per-operation histograms and outcome counts, overall and per reporting interval"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.outcomes = {}
+        self.interval = LatencyHistogram()
+        self.interval_errors = 0
+        self.timeline = []
+
+    def record(self, operation, latency, outcome):
+        self.outcomes.setdefault(operation, Counter())[outcome] += 1
+        if outcome == 'ok':
+            self.histograms.setdefault(operation, LatencyHistogram()).record(latency)
+            self.interval.record(latency)
+        else:
+            self.interval_errors += 1
+
+    def tick(self, elapsed, interval):
+        """Close the current interval; return its timeline entry"""
+        entry = {'elapsed': round(elapsed, 1),
+                 'throughput': round((self.interval.total + self.interval_errors) / interval, 1),
+                 'errors': self.interval_errors, 'p50': self.interval.percentile(50),
+                 'p99': self.interval.percentile(99), 'max': self.interval.max / 1e6}
+        self.timeline.append(entry)
+        self.interval = LatencyHistogram()
+        self.interval_errors = 0
+        return entry
+
+    def total(self):
+        histogram = LatencyHistogram()
+        for operation_histogram in self.histograms.values():
+            histogram.merge(operation_histogram)
+        outcomes = Counter()
+        for operation_outcomes in self.outcomes.values():
+            outcomes.update(operation_outcomes)
+        return histogram, outcomes
+
+
+class LoadGenerator:
+    def __init__(self, base_url, mix, titles=(), variant=None, timeout=30.0, connections=64, max_in_flight=10000):
+        self.base_url = base_url
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.titles = [quote(title, safe='') for title in titles]
+        if 'book_cover' in mix and not self.titles:
+            raise ValueError("book_cover needs titles (book.json)")
+        self.variant = variant
+        self.timeout = timeout
+        self.connections = connections
+        self.max_in_flight = max_in_flight
+        self.recorder = Recorder()
+        self.in_flight = 0
+
+    def _request_for(self, operation):
+        method, path, check = OPERATIONS[operation]
+        if operation == 'book_cover':
+            path = path.format(title=random.choice(self.titles))
+            if self.variant:
+                path += f"?variant={self.variant}"
+        return method, path, check
+
+    async def issue(self, client, scheduled, measured_from):
+        """Send one request scheduled at ``scheduled`` (loop time) and record it"""
+        operation = random.choices(self.operations, self.weights)[0]
+        method, path, check = self._request_for(operation)
+        if self.in_flight >= self.max_in_flight:
+            if scheduled >= measured_from:
+                self.recorder.record(operation, 0.0, 'dropped')
+            return
+        self.in_flight += 1
+        try:
+            status, headers, body = await client.request(method, path)
+            outcome = 'ok' if status == 200 and check(headers, body) else (
+                f"http_{status}" if status != 200 else 'invalid_response')
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            outcome = 'connection'
+        finally:
+            self.in_flight -= 1
+        if scheduled >= measured_from:
+            self.recorder.record(operation, asyncio.get_running_loop().time() - scheduled, outcome)
+
+    async def _closed(self, client, concurrency, think, measured_from, end):
+        loop = asyncio.get_running_loop()
+
+        async def user():
+            while loop.time() < end:
+                await self.issue(client, loop.time(), measured_from)
+                if think:
+                    await asyncio.sleep(think)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+
+    async def _open(self, client, rate, arrivals, measured_from, end):
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        scheduled = loop.time()
+        while scheduled < end:
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self.issue(client, scheduled, measured_from))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            scheduled += random.expovariate(rate) if arrivals == 'poisson' else 1.0 / rate
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def _report(self, started, interval):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            entry = self.recorder.tick(loop.time() - started, interval)
+            p99 = f"{entry['p99'] * 1000:.1f} ms" if entry['p99'] is not None else '-'
+            print(f"⏱️  {entry['elapsed']:>5.0f}s  {entry['throughput']:>7.1f} req/s  p99 {p99}  "
+                  f"errors {entry['errors']}  in flight {self.in_flight}")
+
+    async def run(self, duration, warmup=0.0, concurrency=None, rate=None, arrivals='poisson', think=0.0,
+                  interval=5.0):
+        """Run one closed (concurrency) or open (rate) test; return the measured seconds"""
+        client = AsyncHttpClient(self.base_url, self.connections, self.timeout)
+        self.client = client
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        measured_from, end = started + warmup, started + warmup + duration
+        reporter = asyncio.create_task(self._report(started, interval)) if interval else None
+        try:
+            if rate:
+                await self._open(client, rate, arrivals, measured_from, end)
+            else:
+                await self._closed(client, concurrency, think, measured_from, end)
+        finally:
+            if reporter:
+                reporter.cancel()
+            client.close()
+        # Requests still in flight at the end are included, so measure until the last one finished
+        return max(duration, loop.time() - measured_from)
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.1f}" if seconds is not None else '-'
+
+
+def summarize(generator, measured, args):
+    """Print the summary table; return the report dict"""
+    recorder = generator.recorder
+    total_histogram, total_outcomes = recorder.total()
+    rows = [(name, recorder.histograms.get(name, LatencyHistogram()), recorder.outcomes.get(name, Counter()))
+            for name in generator.operations if name in recorder.outcomes]
+    rows.append(('all', total_histogram, total_outcomes))
+
+    model = (f"open, {args.rate:g} req/s ({args.arrivals} arrivals)" if args.rate
+             else f"closed, {args.concurrency} users" + (f", {args.think:g}s think time" if args.think else ''))
+    requests_total = sum(total_outcomes.values())
+    errors = requests_total - total_outcomes['ok']
+    print(f"\n=== LOAD TEST SUMMARY ===")
+    print(f"Target: {args.base_url}")
+    print(f"Model: {model}, {measured:.1f}s measured after {args.warmup:g}s warmup")
+    print(f"Requests: {requests_total} ({total_outcomes['ok']} ok, {errors} errors"
+          f"{f', {errors / requests_total:.2%}' if requests_total else ''})")
+    print(f"Throughput: {requests_total / measured:.1f} req/s ({total_outcomes['ok'] / measured:.1f} ok/s)")
+    print(f"Connections opened: {generator.client.connections_opened}")
+    print(f"\n{'operation':<18}{'count':>8}{'errors':>8}{'req/s':>9}{'mean':>9}{'p50':>9}{'p90':>9}"
+          f"{'p99':>9}{'p99.9':>9}{'max':>9}   (ms)")
+    report_operations = {}
+    for name, histogram, outcomes in rows:
+        count = sum(outcomes.values())
+        failed = count - outcomes['ok']
+        percentiles = histogram.percentiles()
+        print(f"{name:<18}{count:>8}{failed:>8}{count / measured:>9.1f}{_ms(histogram.mean()):>9}"
+              f"{_ms(percentiles['p50']):>9}{_ms(percentiles['p90']):>9}{_ms(percentiles['p99']):>9}"
+              f"{_ms(percentiles['p99.9']):>9}{_ms(histogram.max / 1e6 if histogram.total else None):>9}")
+        report_operations[name] = {
+            'count': count, 'ok': outcomes['ok'], 'errors': failed,
+            'error_rate': round(failed / count, 4) if count else 0.0,
+            'throughput': round(count / measured, 2),
+            'outcomes': dict(outcomes),
+            'latency': {'mean': histogram.mean(), 'min': histogram.min / 1e6 if histogram.min else None,
+                        'max': histogram.max / 1e6 if histogram.total else None, **percentiles},
+            'distribution': [{'value': value, 'percentile': percentile, 'count': count_below}
+                             for value, percentile, count_below in histogram.distribution()],
+        }
+    error_kinds = Counter({(name, outcome): count for name, _, outcomes in rows[:-1]
+                           for outcome, count in outcomes.items() if outcome != 'ok'})
+    if error_kinds:
+        print("Errors: " + ', '.join(f"{name} {outcome} × {count}"
+                                     for (name, outcome), count in error_kinds.most_common()))
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'hgrm')},
+        'measured_sec': round(measured, 3),
+        'operations': report_operations,
+        'timeline': recorder.timeline,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Seed and Book cover endpoints")
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL)
+    model = parser.add_mutually_exclusive_group()
+    model.add_argument('--concurrency', type=int, default=16, help="closed model: users sending back to back")
+    model.add_argument('--rate', type=float, help="open model: requests per second, independent of responses")
+    parser.add_argument('--arrivals', choices=('poisson', 'uniform'), default='poisson',
+                        help="open model: arrival process")
+    parser.add_argument('--think', type=float, default=0.0, help="closed model: seconds between a user's requests")
+    parser.add_argument('--duration', type=float, default=30.0, help="measured seconds")
+    parser.add_argument('--warmup', type=float, default=5.0, help="seconds before measuring starts")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="operation=weight,... (default: %(default)s)")
+    parser.add_argument('--allow-refresh', action='store_true',
+                        help="allow refresh operations in --mix (they clear and re-seed the API's catalog)")
+    parser.add_argument('--books', default='book.json', help="titles for book_cover requests")
+    parser.add_argument('--variant', help="cover variant to request (list, list_webp, detail, detail_webp)")
+    parser.add_argument('--connections', type=int, default=64, help="most connections open at once")
+    parser.add_argument('--max-in-flight', type=int, default=10000,
+                        help="open model: drop (and count as errors) arrivals beyond this many in flight")
+    parser.add_argument('--timeout', type=float, default=30.0, help="seconds per request, including connecting")
+    parser.add_argument('--interval', type=float, default=5.0, help="seconds between progress lines (0: none)")
+    parser.add_argument('--output', help="write the report as JSON")
+    parser.add_argument('--hgrm', help="write the overall latency distribution in HdrHistogram format")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    destructive = [name for name in DESTRUCTIVE_OPERATIONS if mix.get(name)]
+    if destructive and not args.allow_refresh:
+        parser.error(f"{', '.join(destructive)} clear and re-seed the API's catalog; pass --allow-refresh to send them")
+    titles = []
+    if 'book_cover' in mix:
+        if not os.path.exists(args.books):
+            print(f"Error: {args.books} file not found!")
+            return
+        titles = [book['title'] for book in iter_records(args.books, key='books') if book.get('title')]
+
+    generator = LoadGenerator(args.base_url, mix, titles, args.variant, args.timeout, args.connections,
+                              args.max_in_flight)
+    target = f"{args.rate:g} req/s" if args.rate else f"{args.concurrency} users"
+    print(f"🚦 Load testing {args.base_url}: {target} for {args.duration:g}s (+{args.warmup:g}s warmup)")
+    print(f"   Mix: " + ', '.join(f"{name} {weight:g}" for name, weight in mix.items()))
+    try:
+        measured = asyncio.run(generator.run(args.duration, args.warmup, args.concurrency, args.rate,
+                                             args.arrivals, args.think, args.interval))
+    except KeyboardInterrupt:
+        print("\nInterrupted")
+        return
+
+    report = summarize(generator, measured, args)
+    if args.output:
+        tmp_path = f"{args.output}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, args.output)
+        print(f"Report saved to: {args.output}")
+    if args.hgrm:
+        total_histogram, _ = generator.recorder.total()
+        with open(args.hgrm, 'w', encoding='utf-8') as f:
+            total_histogram.write_hgrm(f)
+        print(f"Latency distribution saved to: {args.hgrm}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Delta Seeder
+
+Keeps the API database in step with book.json / podcast.json without the
+clear-and-reseed of /refresh. Every record is hashed (SHA-256 of its canonical
+JSON) and the hashes that were last synced to each API are kept in
+.seed_sync_state.json. A run only sends the records that were added, changed
+or removed since then, to the batch endpoints:
+
+    POST /api/Seed/books/batch      {"upsert": [...records], "remove": [...titles]}
+    POST /api/Seed/podcasts/batch   {"upsert": [...records], "remove": [...names]}
+
+Batches are sent in parallel over one pooled session that retries with
+exponential backoff on connection errors, 429 and 5xx responses (a batch is
+idempotent, so retrying a POST is safe). The state is saved after every
+successful batch, so an interrupted run only resends what did not get through.
+
+Records are keyed by (array, name): podcast.json seeds its "books" array as
+podcasts too, under their titles. As in the seeder, the first record with a
+name wins and later ones are skipped, and a name is only removed from the API
+once no array lists it.
+
+    python seed_sync.py                      # books and podcasts
+    python seed_sync.py books --dry-run      # show what would be sent
+    python seed_sync.py --base-url http://127.0.0.1:8766 --workers 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = "https://localhost:7140"
+STATE_FILE = '.seed_sync_state.json'
+
+# catalog: (json file, batch endpoint, [(array name, key field)])
+CATALOGS = {
+    'books': ('book.json', '/api/Seed/books/batch', [('books', 'title')]),
+    # podcast.json also carries a "books" array that is seeded as podcasts
+    'podcasts': ('podcast.json', '/api/Seed/podcasts/batch', [('podcasts', 'name'), ('books', 'title')]),
+}
+
+
+def record_hash(record):
+    canonical = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def load_catalog(catalog):
+    """{(array, name): record} for one catalog; the first record with a name wins, like the seeder"""
+    json_file, _, arrays = CATALOGS[catalog]
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    records = {}
+    names = set()
+    for array, key_field in arrays:
+        for record in data.get(array, []):
+            name = record.get(key_field)
+            if name and name not in names:
+                names.add(name)
+                records[(array, name)] = record
+    return records
+
+
+def diff_catalog(records, synced):
+    """(upserts [(key, record, hash)], removals [key], moved [key]) against the synced hashes
+
+    A synced key whose name is still in the catalog under another array is
+    ``moved``: it is forgotten, but not removed from the API.
+    """
+    upserts = []
+    for key, record in records.items():
+        digest = record_hash(record)
+        if synced.get(key) != digest:
+            upserts.append((key, record, digest))
+    names = {name for _, name in records}
+    gone = [key for key in synced if key not in records]
+    removals = [key for key in gone if key[1] not in names]
+    moved = [key for key in gone if key[1] in names]
+    return upserts, removals, moved
+
+
+def create_session(workers, retries=5, backoff=0.5):
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'POST']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.verify = False
+    return session
+
+
+def _namespaces(catalog):
+    """{array: state section}; the first array keeps the catalog's own section"""
+    arrays = [array for array, _ in CATALOGS[catalog][2]]
+    return {array: catalog if i == 0 else f"{catalog}.{array}" for i, array in enumerate(arrays)}
+
+
+class SyncState:
+    """Last-synced record hashes per API base URL and catalog, keyed by (array, name)"""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def synced(self, base_url, catalog):
+        sections = self.data.get(base_url, {})
+        return {(array, name): digest for array, section in _namespaces(catalog).items()
+                for name, digest in sections.get(section, {}).items()}
+
+    def reset(self, base_url, catalog):
+        with self.lock:
+            for section in _namespaces(catalog).values():
+                self.data.setdefault(base_url, {})[section] = {}
+            self._save()
+
+    def record_batch(self, base_url, catalog, upserts, removals):
+        sections = _namespaces(catalog)
+        with self.lock:
+            api = self.data.setdefault(base_url, {})
+            for (array, name), _, digest in upserts:
+                api.setdefault(sections[array], {})[name] = digest
+            for array, name in removals:
+                api.get(sections[array], {}).pop(name, None)
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def make_batches(upserts, removals, chunk_size):
+    """Split the delta into request bodies of at most chunk_size entries"""
+    entries = [('upsert', item) for item in upserts] + [('remove', key) for key in removals]
+    for start in range(0, len(entries), chunk_size):
+        chunk = entries[start:start + chunk_size]
+        yield ([item for kind, item in chunk if kind == 'upsert'],
+               [item for kind, item in chunk if kind == 'remove'])
+
+
+def sync_catalog(catalog, base_url=DEFAULT_BASE_URL, state=None, session=None,
+                 chunk_size=50, workers=4, full=False, dry_run=False):
+    """Send the delta of one catalog; return a summary dict"""
+    base_url = base_url.rstrip('/')
+    state = state or SyncState()
+    _, endpoint, _ = CATALOGS[catalog]
+
+    records = load_catalog(catalog)
+    if full and not dry_run:
+        state.reset(base_url, catalog)
+    synced = {} if full else state.synced(base_url, catalog)
+    upserts, removals, moved = diff_catalog(records, synced)
+    if moved and not dry_run:
+        state.record_batch(base_url, catalog, [], moved)
+    summary = {'catalog': catalog, 'records': len(records), 'changed': len(upserts),
+               'removed': len(removals), 'batches': 0, 'failed_batches': 0,
+               'added': 0, 'updated': 0, 'deleted': 0, 'skipped': 0}
+
+    print(f"📚 {catalog}: {len(records)} records, {len(upserts)} added/changed, {len(removals)} removed")
+    if dry_run or not (upserts or removals):
+        return summary
+
+    session = session or create_session(workers)
+    url = f"{base_url}{endpoint}"
+
+    def send(batch):
+        batch_upserts, batch_removals = batch
+        body = {'upsert': [record for _, record, _ in batch_upserts],
+                'remove': [name for _, name in batch_removals]}
+        response = session.post(url, json=body, timeout=300)
+        response.raise_for_status()
+        state.record_batch(base_url, catalog, batch_upserts, batch_removals)
+        return response.json()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(send, batch) for batch in make_batches(upserts, removals, chunk_size)]
+        for future in as_completed(futures):
+            summary['batches'] += 1
+            try:
+                result = future.result()
+            except Exception as e:
+                summary['failed_batches'] += 1
+                print(f"❌ Batch failed: {e}")
+                continue
+            summary['added'] += result.get('added', 0)
+            summary['updated'] += result.get('updated', 0)
+            summary['deleted'] += result.get('removed', 0)
+            summary['skipped'] += result.get('skipped', 0)
+
+    print(f"✅ {catalog}: {summary['added']} added, {summary['updated']} updated, "
+          f"{summary['deleted']} removed, {summary['skipped']} skipped "
+          f"({summary['batches'] - summary['failed_batches']}/{summary['batches']} batches)")
+    if summary['failed_batches']:
+        print("   Failed batches were not recorded and will be resent on the next run.")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send only changed catalog records to the Seed API")
+    parser.add_argument('catalogs', nargs='*', metavar='catalog', help="books and/or podcasts (default: both)")
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL)
+    parser.add_argument('--chunk-size', type=int, default=50, help="records per batch request")
+    parser.add_argument('--workers', type=int, default=4, help="batch requests in flight")
+    parser.add_argument('--state-file', default=STATE_FILE)
+    parser.add_argument('--full', action='store_true', help="ignore the saved state and resend every record")
+    parser.add_argument('--dry-run', action='store_true', help="only report the delta")
+    args = parser.parse_args()
+    unknown = set(args.catalogs) - set(CATALOGS)
+    if unknown:
+        parser.error(f"unknown catalog: {', '.join(sorted(unknown))}")
+
+    # Disable SSL warnings for localhost
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    state = SyncState(args.state_file)
+    session = create_session(args.workers)
+    try:
+        for catalog in args.catalogs or CATALOGS:
+            sync_catalog(catalog, args.base_url, state, session, args.chunk_size,
+                         args.workers, args.full, args.dry_run)
+    except requests.exceptions.ConnectionError:
+        print("❌ Could not connect to the API. Make sure the server is running.")
+        print(f"   URL: {args.base_url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Cover Scraping Work Queue
+
+Runs the cover scraper as several processes sharing one SQLite job table, so
+HTML parsing is spread over cores and (with --proxies) requests over several
+network identities:
+
+    python work_queue.py run --processes 4                 # load book.json, scrape, export results
+    python work_queue.py run --processes 4 --proxies http://proxy-a:3128 http://proxy-b:3128
+    python work_queue.py worker                            # join a running queue from another shell
+    python work_queue.py status
+    python work_queue.py export                            # cover_extraction_results.json from the table
+
+Loading is incremental: each book's hash is stored with its job, so new or
+edited books become pending again and unchanged ones keep their results.
+
+A worker claims jobs in one IMMEDIATE transaction, which marks them leased
+to it until now + --lease seconds; a heartbeat thread keeps extending the
+leases of the jobs it is working on. The result is written back in one
+transaction, and only while the worker still holds the lease, so a worker
+that lost its lease cannot overwrite a newer result. Books that got an
+answer (success, not_found, no_cover; the journal's resolved statuses) are
+done. Other outcomes (throttled, error, download_failed) go back to pending
+with a backoff, until --max-attempts. A worker that is killed loses only its
+leased jobs: their leases expire and other workers claim them again. A job
+whose lease expired --max-attempts times is marked failed, so one book
+cannot take every worker down.
+
+Every process paces itself with its own throttle. Processes that share a
+network identity split --rate and --max-rate between them, so the queue does
+not hit a host harder than a single scraper would.
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+
+from catalog_io import iter_records, open_writer
+from host_throttle import backoff_delay
+from results_journal import RESOLVED_STATUSES
+from seed_sync import record_hash
+
+QUEUE_FILE = 'cover_queue.db'
+RESULTS_FILE = 'cover_extraction_results.json'
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL UNIQUE,
+        position INTEGER NOT NULL,          -- order in the catalog, for export
+        book TEXT NOT NULL,
+        hash TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',   -- pending, leased, done, failed
+        attempts INTEGER NOT NULL DEFAULT 0,
+        available_at REAL NOT NULL DEFAULT 0,      -- pending jobs wait until then (retry backoff)
+        lease_owner TEXT,
+        lease_expires REAL,
+        result TEXT,
+        updated REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, available_at, position);
+    CREATE INDEX IF NOT EXISTS jobs_leases ON jobs (status, lease_expires);
+'''
+
+
+class WorkQueue:
+    """One connection to the job table; use one per thread"""
+
+    def __init__(self, path=QUEUE_FILE, max_attempts=5):
+        self.path = path
+        self.max_attempts = max_attempts
+        # Autocommit mode: every transaction below is explicit
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so two claimers never pick the same rows
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def load(self, json_file='book.json'):
+        """Sync the job table with the catalog; return added/changed/removed/unchanged counts"""
+        counts = Counter()
+        now = time.time()
+        with self._transaction():
+            existing = dict(self.conn.execute('SELECT title, hash FROM jobs'))
+            seen = set()
+            for position, book in enumerate(iter_records(json_file, key='books')):
+                title, digest = book['title'], record_hash(book)
+                seen.add(title)
+                if title not in existing:
+                    self.conn.execute('INSERT INTO jobs (title, position, book, hash, updated) VALUES (?, ?, ?, ?, ?)',
+                                      (title, position, json.dumps(book, ensure_ascii=False), digest, now))
+                    existing[title] = digest
+                    counts['added'] += 1
+                elif existing[title] != digest:
+                    self.conn.execute(
+                        "UPDATE jobs SET position = ?, book = ?, hash = ?, status = 'pending', attempts = 0, "
+                        "available_at = 0, lease_owner = NULL, lease_expires = NULL, result = NULL, updated = ? "
+                        "WHERE title = ?",
+                        (position, json.dumps(book, ensure_ascii=False), digest, now, title))
+                    existing[title] = digest
+                    counts['changed'] += 1
+                else:
+                    self.conn.execute('UPDATE jobs SET position = ? WHERE title = ?', (position, title))
+                    counts['unchanged'] += 1
+            for title in existing.keys() - seen:
+                self.conn.execute('DELETE FROM jobs WHERE title = ?', (title,))
+                counts['removed'] += 1
+        return counts
+
+    def claim(self, owner, lease_seconds=60.0, limit=1):
+        """Lease up to ``limit`` jobs to ``owner``; return [(id, book)]"""
+        now = time.time()
+        with self._transaction():
+            # Leases that expired too often: the job keeps killing its worker
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', lease_owner = NULL, updated = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts))
+            rows = self.conn.execute(
+                "SELECT id, book FROM jobs WHERE (status = 'pending' AND available_at <= ?) "
+                "OR (status = 'leased' AND lease_expires < ?) ORDER BY position LIMIT ?",
+                (now, now, limit)).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                [(owner, now + lease_seconds, now, job_id) for job_id, _ in rows])
+        return [(job_id, json.loads(book)) for job_id, book in rows]
+
+    def heartbeat(self, owner, job_ids, lease_seconds=60.0):
+        """Extend the leases ``owner`` still holds; return how many it holds"""
+        if not job_ids:
+            return 0
+        now = time.time()
+        placeholders = ','.join('?' * len(job_ids))
+        cursor = self.conn.execute(
+            f"UPDATE jobs SET lease_expires = ? WHERE status = 'leased' AND lease_owner = ? "
+            f"AND id IN ({placeholders})", (now + lease_seconds, owner, *job_ids))
+        return cursor.rowcount
+
+    def complete(self, owner, job_id, result):
+        """Store a job's result if ``owner`` still holds its lease; return whether it did"""
+        now = time.time()
+        with self._transaction():
+            row = self.conn.execute("SELECT attempts FROM jobs WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                    (job_id, owner)).fetchone()
+            if row is None:
+                return False
+            attempts = row[0]
+            if result['status'] in RESOLVED_STATUSES:
+                status, available_at = 'done', 0
+            elif attempts >= self.max_attempts:
+                status, available_at = 'failed', 0
+            else:
+                status, available_at = 'pending', now + backoff_delay(attempts, base=5.0, cap=300.0)
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, result = ?, lease_owner = NULL, "
+                "lease_expires = NULL, updated = ? WHERE id = ?",
+                (status, available_at, json.dumps(result, ensure_ascii=False), now, job_id))
+        return True
+
+    def release(self, owner):
+        """Hand an exiting worker's unfinished jobs back without counting the attempt"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+            "lease_expires = NULL WHERE status = 'leased' AND lease_owner = ?", (owner,))
+        return cursor.rowcount
+
+    def counts(self):
+        counts = Counter({'pending': 0, 'leased': 0, 'done': 0, 'failed': 0})
+        counts.update(dict(self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status')))
+        return counts
+
+    def unfinished(self):
+        """Jobs that are pending or leased (possibly to a dead worker whose lease will expire)"""
+        return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def export(self, results_file=RESULTS_FILE):
+        """Write every stored result in catalog order; return a Counter of result statuses"""
+        statuses = Counter()
+        with open_writer(results_file) as out:
+            for (result,) in self.conn.execute('SELECT result FROM jobs WHERE result IS NOT NULL ORDER BY position'):
+                result = json.loads(result)
+                statuses[result['status']] += 1
+                out.write(result)
+        return statuses
+
+    def close(self):
+        self.conn.close()
+
+
+def _heartbeat_loop(path, leased, lock, lease_seconds, stop):
+    queue = WorkQueue(path)
+    try:
+        while not stop.wait(lease_seconds / 3):
+            with lock:
+                held = {}
+                for job_id, owner in leased.items():
+                    held.setdefault(owner, []).append(job_id)
+            for owner, job_ids in held.items():
+                queue.heartbeat(owner, job_ids, lease_seconds)
+    finally:
+        queue.close()
+
+
+def _work_loop(path, owner, scraper, leased, lock, options):
+    queue = WorkQueue(path, options['max_attempts'])
+    processed = 0
+    try:
+        while True:
+            jobs = queue.claim(owner, options['lease'], options['batch'])
+            if not jobs:
+                # Others' jobs may still come back (expired leases, retry backoff)
+                if queue.unfinished():
+                    time.sleep(options['poll'])
+                    continue
+                return processed
+            with lock:
+                leased.update((job_id, owner) for job_id, _ in jobs)
+            for job_id, book in jobs:
+                result = scraper.process_book(book)
+                if not queue.complete(owner, job_id, result):
+                    print(f"⚠️  Lost the lease on '{book['title']}', result discarded")
+                with lock:
+                    leased.pop(job_id, None)
+                processed += 1
+    finally:
+        queue.release(owner)
+        queue.close()
+
+
+def worker_main(path, options, proxy=None, log_file=None):
+    """One worker process: a scraper, ``threads`` claim loops and a heartbeat thread"""
+    from amazon_book_cover_scraper import AmazonBookCoverScraper
+
+    with contextlib.ExitStack() as stack:
+        if log_file:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(log_file, 'a', encoding='utf-8'))))
+        scraper = AmazonBookCoverScraper(**options['scraper'])
+        if proxy:
+            scraper.session.proxies.update({'http': proxy, 'https': proxy})
+        if options['threads'] > 1:
+            scraper._mount_adapters(pool_size=options['threads'])
+        owner = f"{os.uname().nodename if hasattr(os, 'uname') else 'host'}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Job id → the claim loop holding it; each loop claims under its own owner name
+        leased, lock, stop = {}, threading.Lock(), threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat_loop, daemon=True,
+                                     args=(path, leased, lock, options['lease'], stop))
+        heartbeat.start()
+        try:
+            loops = [threading.Thread(target=_work_loop, args=(path, f"{owner}/{i}", scraper, leased, lock, options))
+                     for i in range(options['threads'])]
+            for loop in loops:
+                loop.start()
+            for loop in loops:
+                loop.join()
+        finally:
+            stop.set()
+            scraper.resolver.save()
+            scraper.resolver.close()
+
+
+def run(path, json_file, processes, options, proxies=(), results_file=RESULTS_FILE, log_dir=None, interval=2.0):
+    """Load the catalog, run the worker processes until the queue is drained, export the results"""
+    queue = WorkQueue(path, options['max_attempts'])
+    loaded = queue.load(json_file)
+    print(f"📥 {json_file}: {loaded['added']} added, {loaded['changed']} changed, "
+          f"{loaded['removed']} removed, {loaded['unchanged']} unchanged")
+    counts = queue.counts()
+    print(f"Queue: {counts['pending']} pending, {counts['leased']} leased, {counts['done']} done, {counts['failed']} failed")
+
+    context = multiprocessing.get_context('spawn')
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    workers = []
+    for i in range(processes):
+        proxy = proxies[i % len(proxies)] if proxies else None
+        log_file = os.path.join(log_dir, f"worker-{i}.log") if log_dir else os.devnull
+        process = context.Process(target=worker_main, args=(path, options, proxy, log_file), name=f"cover-worker-{i}")
+        process.start()
+        workers.append(process)
+    print(f"🚀 {processes} worker processes × {options['threads']} threads (lease {options['lease']:g}s)")
+
+    started = time.perf_counter()
+    done_before = counts['done'] + counts['failed']
+    reported_dead = set()
+    try:
+        while any(process.is_alive() for process in workers):
+            time.sleep(interval)
+            counts = queue.counts()
+            finished = counts['done'] + counts['failed'] - done_before
+            rate = finished / (time.perf_counter() - started)
+            print(f"📊 {counts['done']} done, {counts['failed']} failed, {counts['leased']} leased, "
+                  f"{counts['pending']} pending ({rate:.2f} books/sec)")
+            for process in workers:
+                if process.exitcode not in (None, 0) and process.name not in reported_dead:
+                    reported_dead.add(process.name)
+                    print(f"⚠️  {process.name} exited with {process.exitcode}; "
+                          f"its leased jobs return to the queue within {options['lease']:g}s")
+    except KeyboardInterrupt:
+        print("\nStopping workers (leased jobs return to the queue)")
+        for process in workers:
+            process.terminate()
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    counts = queue.counts()
+    statuses = queue.export(results_file)
+    queue.close()
+    finished = counts['done'] + counts['failed'] - done_before
+    print(f"\n=== WORK QUEUE SUMMARY ===")
+    print(f"Processes: {processes} × {options['threads']} threads")
+    print(f"Jobs finished this run: {finished} in {elapsed:.1f}s ({finished / elapsed:.2f} books/sec)")
+    print(f"Queue: {counts['done']} done, {counts['failed']} failed, {counts['pending']} pending, {counts['leased']} leased")
+    print(f"Results: " + ', '.join(f"{status} {count}" for status, count in statuses.most_common()))
+    print(f"Results saved to: {results_file}")
+    return counts
+
+
+def scraper_options(args, identities=1):
+    """Scraper keyword arguments for each worker process; rates are split across a shared identity"""
+    share = math.ceil(args.processes / identities) if args.command == 'run' else 1
+    return {
+        'base_url': args.base_url,
+        'max_per_host': args.max_per_host,
+        'requests_per_second': args.rate / share,
+        'max_rate': args.max_rate / share,
+        'cache_dir': None if args.no_cache else args.cache_dir,
+        'source_urls': {'openlibrary': args.openlibrary_url, 'googlebooks': args.googlebooks_url},
+    }
+
+
+def main():
+    from amazon_book_cover_scraper import AMAZON_BASE_URL
+    from http_cache import CACHE_DIR
+
+    parser = argparse.ArgumentParser(description="Scrape covers with several processes sharing a job queue")
+    parser.add_argument('--queue', default=QUEUE_FILE, help="SQLite job table")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help="load the catalog, start workers, export results")
+    run_parser.add_argument('--books', default='book.json')
+    run_parser.add_argument('--processes', type=int, default=os.cpu_count() or 2)
+    run_parser.add_argument('--proxies', nargs='+', default=[], help="one network identity per proxy, "
+                            "assigned to the worker processes round-robin")
+    run_parser.add_argument('--results', default=RESULTS_FILE)
+    run_parser.add_argument('--log-dir', help="write each worker's output to <dir>/worker-N.log")
+    worker_parser = subparsers.add_parser('worker', help="run one worker against an existing queue")
+    worker_parser.add_argument('--proxy')
+    for sub in (run_parser, worker_parser):
+        sub.add_argument('--threads', type=int, default=1, help="books in flight per process")
+        sub.add_argument('--batch', type=int, default=1, help="jobs claimed per transaction")
+        sub.add_argument('--lease', type=float, default=60.0, help="seconds a claim lasts without a heartbeat")
+        sub.add_argument('--max-attempts', type=int, default=5)
+        sub.add_argument('--poll', type=float, default=1.0, help="seconds between claims while others finish")
+        sub.add_argument('--base-url', default=AMAZON_BASE_URL)
+        sub.add_argument('--max-per-host', type=int, default=2)
+        sub.add_argument('--rate', type=float, default=1.0, help="starting requests/sec per host, for all processes")
+        sub.add_argument('--max-rate', type=float, default=5.0, help="highest requests/sec per host, for all processes")
+        sub.add_argument('--cache-dir', default=CACHE_DIR)
+        sub.add_argument('--no-cache', action='store_true')
+        sub.add_argument('--openlibrary-url')
+        sub.add_argument('--googlebooks-url')
+    subparsers.add_parser('status', help="job counts")
+    export_parser = subparsers.add_parser('export', help="write the stored results")
+    export_parser.add_argument('--results', default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    if args.command in ('run', 'worker'):
+        options = {'threads': args.threads, 'batch': args.batch, 'lease': args.lease, 'poll': args.poll,
+                   'max_attempts': args.max_attempts}
+    if args.command == 'run':
+        if not os.path.exists(args.books):
+            print(f"Error: {args.books} file not found!")
+            return
+        options['scraper'] = scraper_options(args, len(args.proxies) or 1)
+        run(args.queue, args.books, args.processes, options, args.proxies, args.results, args.log_dir)
+    elif args.command == 'worker':
+        options['scraper'] = scraper_options(args)
+        worker_main(args.queue, options, args.proxy)
+    elif args.command == 'status':
+        queue = WorkQueue(args.queue)
+        counts = queue.counts()
+        print(f"{counts['done']} done, {counts['failed']} failed, {counts['leased']} leased, {counts['pending']} pending")
+        queue.close()
+    else:
+        queue = WorkQueue(args.queue)
+        statuses = queue.export(args.results)
+        queue.close()
+        print(f"✅ {sum(statuses.values())} results → {args.results}")
+
+
+if __name__ == "__main__":
+    main()